@@ -1,25 +1,206 @@
-from asyncio import sleep
-import asyncio
-import nonebot
-from nonebot.adapters.qq import Adapter as QQAdapter
-from nonebot.adapters.console import Adapter as ConsoleAdapter
-from nonebot.adapters.onebot.v11 import Adapter as OneBotV11Adapter
+import time
+
+_process_begin = time.perf_counter()
+
+import asyncio  # noqa: E402
+import importlib  # noqa: E402
+import os  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+import nonebot  # noqa: E402
+from nonebot.message import event_preprocessor  # noqa: E402
+
+from common.async_storage import AsyncStorage, set_async_storage  # noqa: E402
+from common.browser_pool import BrowserPool, set_browser_pool  # noqa: E402
+from common.member_cache import MemberListCache, set_member_cache  # noqa: E402
+from common.migrations import MigrationRunner  # noqa: E402
+from common.perf import perf  # noqa: E402
+from common.pic_cache import PicCacheIndex, set_pic_cache  # noqa: E402
+from common.render_cache import RenderCache, set_render_cache  # noqa: E402
+from common.render_service import RenderService, set_render_service  # noqa: E402
+from common.seed import overlay_seed  # noqa: E402
+from common.stats_rollup import StatsRollup, set_stats_rollup  # noqa: E402
+from common.stats_store import StatsStore, set_stats_store  # noqa: E402
+
+# 按 ENVIRONMENT 选择需要注册的 Adapter 与加载的插件，SCF 冷启动只为用得到的部分付出导入成本
+ADAPTERS = {
+    "qq": "nonebot.adapters.qq",
+    "onebot.v11": "nonebot.adapters.onebot.v11",
+    "console": "nonebot.adapters.console",
+}
+PROFILES = {
+    "qqbot": {
+        "adapters": ["qq"],
+        "plugins": ["nonebot_plugin_mbtistats"],
+        "local_plugins": ["timer_plugin", "perf_plugin", "global_stats_plugin"],
+    },
+    "onebotv11": {
+        "adapters": ["onebot.v11"],
+        "plugins": [
+            "nonebot_plugin_mbtistats",
+            "nonebot_plugin_analysis_bilibili",
+            "nonebot_plugin_questionmark",
+        ],
+        "local_plugins": [
+            "recall_plugin", "timer_plugin", "perf_plugin", "global_stats_plugin", "member_cache_plugin",
+        ],
+    },
+    # 本地开发：全部 Adapter 与插件（未知的 ENVIRONMENT 也使用该配置）
+    "dev": {
+        "adapters": ["qq", "onebot.v11", "console"],
+        "plugins": None,        # None 表示按 pyproject.toml 加载全部
+        "local_plugins": None,  # None 表示加载 plugins/ 目录下全部
+    },
+}
+PROFILES["onebotv11-wsRev"] = PROFILES["onebotv11"]
+
+startup_timings: list[tuple[str, float]] = []
+
+
+def timed(name: str, func, *args):
+    """执行 func 并记录耗时（用于启动耗时分解）"""
+    begin = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - begin
+    startup_timings.append((name, elapsed))
+    perf.record(f"startup.{name}", elapsed)
+    return result
+
+
+def report_startup():
+    total = time.perf_counter() - _process_begin
+    perf.record("startup.total", total)
+    print(f"Startup breakdown ({total:.3f}s since bot.py start, ENVIRONMENT={environment}):")
+    for name, elapsed in sorted(startup_timings, key=lambda item: item[1], reverse=True):
+        print(f"  {elapsed * 1000:8.1f} ms  {name}")
+
+
+startup_timings.append(("import nonebot + common", time.perf_counter() - _process_begin))
 
 # 初始化 NoneBot
-nonebot.init()
+timed("nonebot.init", nonebot.init)
+driver = nonebot.get_driver()
+
+environment = driver.env
+profile = PROFILES.get(environment)
+if profile is None:
+    print(f"Unknown ENVIRONMENT '{environment}', loading all adapters and plugins")
+    profile = PROFILES["dev"]
 
 # 注册 Adapters
-driver = nonebot.get_driver()
-driver.register_adapter(QQAdapter)
-driver.register_adapter(ConsoleAdapter)
-driver.register_adapter(OneBotV11Adapter)
+for name in profile["adapters"]:
+    module = timed(f"adapter {name}", importlib.import_module, ADAPTERS[name])
+    driver.register_adapter(module.Adapter)
+
+# 只读数据种子（镜像构建时打包）：铺设到数据目录，冷启动实例也有历史数据与缓存图片
+seed_dir = getattr(driver.config, "mbtistats_seed_dir", None) or os.environ.get("MBTISTATS_SEED_DIR")
+if seed_dir:
+    data_root = Path(getattr(driver.config, "mbtistats_data_dir", None) or "data/mbtistats")
+    timed("seed overlay", overlay_seed, Path(seed_dir), data_root)
+
+# 数据迁移：mbtistats_migrate_on_startup=true 时启动时执行未完成的迁移步骤（在其他组件读取数据之前）；
+# 默认关闭，插件仍在读写 stats-data.json，迁移应在确认后手动运行 scripts/migrate.py
+if getattr(driver.config, "mbtistats_migrate_on_startup", False):
+    migration_runner = MigrationRunner.from_config(driver.config)
+
+    @driver.on_startup
+    async def run_pending_migrations():
+        await asyncio.to_thread(migration_runner.run)
+
+# 常驻浏览器池：默认在第一次渲染时才导入 Playwright 并启动 Chromium；
+# mbtistats_browser_prewarm=true 时随 Driver 启动预热
+prewarm = getattr(driver.config, "mbtistats_browser_prewarm", False)
+render_workers = int(getattr(driver.config, "mbtistats_render_workers", 0) or 0)
+browser_pool = BrowserPool.from_config(driver.config)
+set_browser_pool(browser_pool)
+if prewarm and render_workers <= 0:
+    driver.on_startup(browser_pool.start)
+driver.on_shutdown(browser_pool.close)
+
+# 进程外渲染（mbtistats_render_workers > 0 时开启）：截图交给独立的渲染进程，Chromium 不占用 Bot 进程；
+# 渲染进程同样在第一次渲染时才启动（预热时随 Driver 启动）
+if render_workers > 0:
+    render_service = RenderService.from_config(driver.config)
+    set_render_service(render_service)
+    if prewarm:
+        driver.on_startup(render_service.start)
+    driver.on_shutdown(render_service.close)
+
+# 内容寻址的渲染缓存：启动时建立内存索引
+render_cache = RenderCache.from_config(driver.config)
+set_render_cache(render_cache)
+driver.on_startup(render_cache.load)
+
+# 群成员列表缓存：/mbti 与自动统计共用（plugins/member_cache_plugin.py 在 API 层接入）
+set_member_cache(MemberListCache.from_config(driver.config))
+
+# 共享的时间序列存储；跨群汇总注册为其写入监听器，启动时每个群只读最新一条记录
+stats_store = StatsStore.from_config(driver.config)
+set_stats_store(stats_store)
+stats_rollup = StatsRollup.from_config(driver.config, stats_store)
+set_stats_rollup(stats_rollup)
+stats_store.add_listener(stats_rollup.on_write)
+
+# 按群缓存图片：启动时建立内存索引，后台任务按单群 / 总字节预算清理旧图片
+pic_cache = PicCacheIndex.from_config(driver.config)
+set_pic_cache(pic_cache)
+
+# 异步存储接口：时间序列、缓存图片与黑名单文件的读写都在专用 I/O 线程池中执行，不阻塞事件循环
+async_storage = AsyncStorage.from_config(driver.config, stats_store, render_cache, pic_cache)
+set_async_storage(async_storage)
+
+
+@driver.on_startup
+async def load_stats_rollup():
+    await async_storage.run(stats_rollup.load)
+
+
+@driver.on_startup
+async def start_pic_cache_gc():
+    await async_storage.run(pic_cache.load)
+    pic_cache.start(stats_store, async_storage.run)
+
+
+@driver.on_shutdown
+async def flush_stats_rollup():
+    await pic_cache.close()
+    await async_storage.run(stats_rollup.flush)
+    await async_storage.close()
+
 
 # 加载插件
-nonebot.load_from_toml("pyproject.toml")
+if profile["plugins"] is None:
+    timed("plugins from pyproject.toml", nonebot.load_from_toml, "pyproject.toml")
+else:
+    for plugin in profile["plugins"]:
+        timed(f"plugin {plugin}", nonebot.load_plugin, plugin)
 nonebot.load_builtin_plugins("single_session", "echo")
 print("Loading plugins from plugins directory...")
-nonebot.load_plugins("plugins")
+if profile["local_plugins"] is None:
+    timed("local plugins", nonebot.load_plugins, "plugins")
+else:
+    for plugin in profile["local_plugins"]:
+        timed(f"plugin plugins.{plugin}", nonebot.load_plugin, f"plugins.{plugin}")
 print("Plugins loaded!")
 
+
+@driver.on_startup
+async def log_startup_time():
+    report_startup()
+
+
+_first_event_seen = False
+
+
+@event_preprocessor
+async def record_first_event():
+    global _first_event_seen
+    if not _first_event_seen:
+        _first_event_seen = True
+        elapsed = time.perf_counter() - _process_begin
+        perf.record("startup.first_event", elapsed)
+        print(f"First event received {elapsed:.3f}s after bot.py start")
+
+
 if __name__ == "__main__":
     nonebot.run()
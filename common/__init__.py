@@ -0,0 +1,6 @@
+"""
+Bot 与脚本共用的运行时组件
+
+这里的模块既会被 bot.py / plugins/ 在 Bot 进程内使用，也会被 scripts/ 下的离线脚本直接导入，
+因此模块顶层不应触发 NoneBot 初始化（不要在顶层调用 nonebot.get_driver() 等）。
+"""
@@ -0,0 +1,251 @@
+"""
+异步存储接口
+
+StatsStore / RenderCache 与 auto_stats_disabled.txt 的读写都是同步文件调用，直接在事件循环中
+执行时，慢盘或很长的历史文件会卡住所有 matcher（包括 recall、timer）。AsyncStorage 把这些操作
+包装成协程：
+
+- 阻塞 I/O 在专用线程池（线程名前缀 mbtistats-io）中执行，不占用默认线程池
+- 同一个群的写操作（追加、重写、写入缓存图片）由该群的 asyncio.Lock 串行化，不同群之间并行
+- 渲染缓存的内存索引不是线程安全的，所有缓存操作由一把锁串行化
+- 整文件写入一律写临时文件后原子替换（stats_store.atomic_write_bytes）；时间序列追加沿用
+  StatsStore 的 O_APPEND 单次写入，崩溃最多留下一行残缺的尾行
+
+写入群缓存图片时同步更新 PicCacheIndex（见 pic_cache.py），latest_pic() 只查内存索引。
+
+其他模块需要在线程池中执行零散的阻塞调用时使用 run_io()。
+
+    storage = get_async_storage()
+    records = await storage.read_records(group_id)
+    await storage.append(group_id, point)
+    path = await storage.save_pic(group_id, timestamp, png)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from .pic_cache import CACHE_PIC_TEMPLATE, PicCacheIndex
+from .render_cache import RenderCache
+from .seed import DISABLED_FILE_NAME, latest_cache_pic
+from .stats_format import StatsPoint, StatsRecord
+from .stats_store import StatsStore, atomic_write_bytes
+
+T = TypeVar("T")
+
+
+def load_disabled_groups(path: Path) -> set[str]:
+    """读取 auto_stats_disabled.txt（每行一个群号，忽略空行与 # 注释）"""
+    if not path.exists():
+        return set()
+    groups = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            groups.add(line)
+    return groups
+
+
+class AsyncStorage:
+    """mbtistats 数据目录的异步访问接口"""
+
+    def __init__(
+        self,
+        store: StatsStore,
+        render_cache: RenderCache | None = None,
+        pic_dir: Path | None = None,
+        disabled_file: Path | None = None,
+        workers: int = 4,
+        pic_index: PicCacheIndex | None = None,
+    ):
+        """
+        store: 时间序列存储
+        render_cache: 内容寻址渲染缓存（可选）
+        pic_dir: 按群缓存图片的目录，例如 data/mbtistats/cache/v1
+        disabled_file: auto_stats_disabled.txt 路径
+        workers: I/O 线程数
+        pic_index: 群缓存图片的内存索引（可选）
+        """
+        self.store = store
+        self.render_cache = render_cache
+        self.pic_dir = Path(pic_dir) if pic_dir is not None else None
+        self.disabled_file = Path(disabled_file) if disabled_file is not None else None
+        self.workers = workers
+        self.pic_index = pic_index
+        self._executor: ThreadPoolExecutor | None = None
+        self._group_locks: dict[str, asyncio.Lock] = {}
+        self._cache_lock = asyncio.Lock()
+        self._disabled_lock = asyncio.Lock()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Any,
+        store: StatsStore,
+        render_cache: RenderCache | None = None,
+        pic_index: PicCacheIndex | None = None,
+    ) -> "AsyncStorage":
+        """根据 NoneBot 配置创建异步存储"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        return cls(
+            store,
+            render_cache=render_cache,
+            pic_dir=data_dir / "cache" / "v1",
+            disabled_file=data_dir / DISABLED_FILE_NAME,
+            workers=int(getattr(config, "mbtistats_io_workers", 4)),
+            pic_index=pic_index,
+        )
+
+    # --- 线程池 ---
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在 I/O 线程池中执行阻塞调用"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mbtistats-io")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def group_lock(self, group_id: str | int) -> asyncio.Lock:
+        """该群的写锁（同一个群的写操作串行执行）"""
+        key = str(group_id)
+        lock = self._group_locks.get(key)
+        if lock is None:
+            lock = self._group_locks[key] = asyncio.Lock()
+        return lock
+
+    async def close(self) -> None:
+        """等待进行中的 I/O 完成并关闭线程池"""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    # --- 时间序列 ---
+
+    async def group_ids(self) -> list[str]:
+        return await self.run(self.store.group_ids)
+
+    async def read_records(self, group_id: str | int) -> list[StatsRecord]:
+        return await self.run(self.store.read_records, group_id)
+
+    async def read_latest(self, group_id: str | int) -> StatsRecord | None:
+        return await self.run(self.store.read_latest, group_id)
+
+    async def read_tail(self, group_id: str | int, count: int) -> list[StatsRecord]:
+        return await self.run(self.store.read_tail, group_id, count)
+
+    async def read_since(self, group_id: str | int, since: int) -> list[StatsRecord]:
+        return await self.run(self.store.read_since, group_id, since)
+
+    async def append(self, group_id: str | int, item: StatsPoint | StatsRecord) -> bool:
+        async with self.group_lock(group_id):
+            return await self.run(self.store.append, group_id, item)
+
+    async def write_records(self, group_id: str | int, records: list[StatsRecord]) -> None:
+        async with self.group_lock(group_id):
+            await self.run(self.store.write_records, group_id, records)
+
+    async def compact(self, group_id: str | int) -> int:
+        async with self.group_lock(group_id):
+            return await self.run(self.store.compact, group_id)
+
+    # --- 按群缓存图片 ---
+
+    def pic_path(self, group_id: str | int, timestamp: int) -> Path:
+        if self.pic_dir is None:
+            raise RuntimeError("未配置图片缓存目录")
+        return self.pic_dir / str(group_id) / CACHE_PIC_TEMPLATE.format(timestamp=timestamp)
+
+    async def save_pic(self, group_id: str | int, timestamp: int, data: bytes) -> Path:
+        """写入群缓存图片 mbti-stats-pic-{timestamp}.png（原子替换）"""
+        path = self.pic_path(group_id, timestamp)
+        async with self.group_lock(group_id):
+            await self.run(atomic_write_bytes, path, data)
+        if self.pic_index is not None:
+            self.pic_index.add(group_id, timestamp, len(data))
+        return path
+
+    async def read_pic(self, path: Path) -> bytes:
+        return await self.run(Path(path).read_bytes)
+
+    async def latest_pic(self, group_id: str | int) -> Path | None:
+        """群缓存目录中时间戳最大的图片（索引已加载时不访问磁盘）"""
+        if self.pic_index is not None and self.pic_index.loaded:
+            return self.pic_index.latest(group_id)
+        if self.pic_dir is None:
+            return None
+        return await self.run(latest_cache_pic, self.pic_dir / str(group_id))
+
+    # --- 渲染缓存 ---
+
+    async def cache_get(self, key: str) -> bytes | None:
+        if self.render_cache is None:
+            return None
+        async with self._cache_lock:
+            return await self.run(self.render_cache.get, key)
+
+    async def cache_put(self, key: str, data: bytes, suffix: str | None = None) -> Path | None:
+        if self.render_cache is None:
+            return None
+        async with self._cache_lock:
+            return await self.run(self.render_cache.put, key, data, suffix)
+
+    async def cache_export(self, key: str, group_id: str | int, timestamp: int) -> Path:
+        """把渲染缓存中的图片放到群缓存目录（原子替换）"""
+        if self.render_cache is None:
+            raise RuntimeError("未配置渲染缓存")
+        dest = self.pic_path(group_id, timestamp)
+        async with self.group_lock(group_id):
+            path = await self.run(self.render_cache.export, key, dest)
+        if self.pic_index is not None:
+            await self.run(self.pic_index.add, group_id, timestamp)
+        return path
+
+    # --- 自动统计黑名单 ---
+
+    async def disabled_groups(self) -> set[str]:
+        if self.disabled_file is None:
+            return set()
+        return await self.run(load_disabled_groups, self.disabled_file)
+
+    async def set_disabled(self, group_id: str | int, disabled: bool) -> bool:
+        """在 auto_stats_disabled.txt 中加入 / 移除群号（保留注释与其他行），返回文件是否变化"""
+        if self.disabled_file is None:
+            raise RuntimeError("未配置 auto_stats_disabled.txt 路径")
+        group_id = str(group_id)
+        path = self.disabled_file
+
+        def update() -> bool:
+            lines = path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+            kept = [line for line in lines if line.split("#", 1)[0].strip() != group_id]
+            if disabled:
+                kept.append(group_id)
+            if kept == lines:
+                return False
+            atomic_write_bytes(path, ("\n".join(kept) + "\n").encode("utf-8"))
+            return True
+
+        async with self._disabled_lock:
+            return await self.run(update)
+
+
+_async_storage: AsyncStorage | None = None
+
+
+def set_async_storage(storage: AsyncStorage | None) -> None:
+    global _async_storage
+    _async_storage = storage
+
+
+def get_async_storage() -> AsyncStorage | None:
+    """获取 bot.py 注册的异步存储；未注册时返回 None"""
+    return _async_storage
+
+
+async def run_io(func: Callable[..., T], *args: Any) -> T:
+    """在存储 I/O 线程池中执行阻塞调用（未注册异步存储时使用默认线程池）"""
+    storage = _async_storage
+    if storage is None:
+        return await asyncio.to_thread(func, *args)
+    return await storage.run(func, *args)
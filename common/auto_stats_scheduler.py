@@ -0,0 +1,238 @@
+"""
+自动统计调度器（库，尚未接入）
+
+插件的每日自动统计逐个群串行执行「拉取成员 → 统计 → 渲染 → 发送」，群一多就非常慢。
+这里把四个阶段拆开做成流水线。每日自动统计的实现在插件内部（submodule），目前 bot.py 与
+plugins/ 都没有创建本调度器，自动统计仍走插件原有的串行流程；插件改为注入各阶段回调后才会生效。
+
+- 全局并发上限 concurrency：同时处于流水线中的群数量
+- 每个阶段单独的并发上限（拉取 / 统计 / 渲染 / 发送），渲染受浏览器池大小约束，API 阶段受风控约束
+- 所有 OneBot API 调用（拉取成员、发送图片）共享一个全局令牌桶速率预算
+- 跳过 auto_stats_disabled.txt 中的群；调试模式 (mbtistats_auto_stats_debug) 下不发送，只渲染到缓存
+- 与 /mbti 共享群成员列表缓存（member_cache.py）：ttl 内刚拉取过的群直接复用，不占用 API 速率预算
+- 运行结束后输出每个群各阶段耗时
+
+各阶段的具体实现由插件以回调形式注入：
+    fetch_members(group_id) -> members
+    compute_stats(group_id, members) -> stats         # 返回 None 表示无需继续（如无人填写 MBTI）
+    render(group_id, stats) -> image
+    send(group_id, image) -> None
+回调既可以是普通函数，也可以是协程函数；普通函数（如 CPU 密集的统计）在线程中执行，不阻塞事件循环。
+"""
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable
+
+from nonebot.log import logger
+
+from .async_storage import load_disabled_groups, run_io
+from .member_cache import MemberListCache, get_member_cache
+from .perf import perf
+from .rate_limit import TokenBucket
+
+StageFunc = Callable[..., Any | Awaitable[Any]]
+
+STAGES = ("fetch", "compute", "render", "send")
+
+
+@dataclass
+class GroupTiming:
+    """单个群在一次自动统计中的耗时记录（秒）"""
+
+    group_id: str
+    status: str = "pending"     # ok / debug / empty / skipped / failed
+    error: str | None = None
+    stages: dict[str, float] = field(default_factory=dict)
+    api_wait: float = 0.0       # 等待 API 速率预算的时间
+    total: float = 0.0
+
+
+@dataclass
+class AutoStatsReport:
+    """一次自动统计运行的汇总"""
+
+    started_at: float
+    elapsed: float = 0.0
+    groups: list[GroupTiming] = field(default_factory=list)
+
+    def count(self, status: str) -> int:
+        return sum(1 for g in self.groups if g.status == status)
+
+    def format(self, top: int = 10) -> str:
+        """生成可读的汇总文本（最慢的 top 个群附带分阶段耗时）"""
+        lines = [
+            f"自动统计完成: {len(self.groups)} 个群, 总耗时 {self.elapsed:.2f}s",
+            "  " + ", ".join(
+                f"{status}={self.count(status)}"
+                for status in ("ok", "debug", "empty", "skipped", "failed")
+            ),
+        ]
+        for stage in STAGES:
+            values = [g.stages[stage] for g in self.groups if stage in g.stages]
+            if values:
+                lines.append(
+                    f"  [{stage}] n={len(values)} avg={sum(values) / len(values):.3f}s max={max(values):.3f}s"
+                )
+        slowest = sorted(
+            (g for g in self.groups if g.status not in ("skipped", "pending")),
+            key=lambda g: g.total,
+            reverse=True,
+        )[:top]
+        if slowest:
+            lines.append(f"  最慢的 {len(slowest)} 个群:")
+            for g in slowest:
+                stages = " ".join(f"{k}={v:.3f}s" for k, v in g.stages.items())
+                suffix = f" error={g.error}" if g.error else ""
+                lines.append(
+                    f"    {g.group_id}: {g.status} total={g.total:.3f}s api_wait={g.api_wait:.3f}s {stages}{suffix}"
+                )
+        return "\n".join(lines)
+
+
+async def _call(func: StageFunc, *args: Any) -> Any:
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    result = await asyncio.to_thread(func, *args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class AutoStatsScheduler:
+    """有界并发、分阶段限流的自动统计流水线"""
+
+    def __init__(
+        self,
+        *,
+        fetch_members: StageFunc,
+        compute_stats: StageFunc,
+        render: StageFunc,
+        send: StageFunc,
+        concurrency: int = 8,
+        fetch_concurrency: int = 4,
+        compute_concurrency: int = 4,
+        render_concurrency: int = 2,
+        send_concurrency: int = 2,
+        api_rate: float = 5.0,
+        api_burst: int | None = None,
+        debug: bool = False,
+        disabled_file: Path | None = None,
+        member_cache: MemberListCache | None = None,
+    ):
+        self._funcs = {
+            "fetch": fetch_members,
+            "compute": compute_stats,
+            "render": render,
+            "send": send,
+        }
+        self.concurrency = concurrency
+        self._stage_limits = {
+            "fetch": fetch_concurrency,
+            "compute": compute_concurrency,
+            "render": render_concurrency,
+            "send": send_concurrency,
+        }
+        self.api_bucket = TokenBucket(api_rate, api_burst)
+        self.debug = debug
+        self.disabled_file = disabled_file
+        self.member_cache = member_cache
+
+    @classmethod
+    def from_config(cls, config: Any, **funcs: StageFunc) -> "AutoStatsScheduler":
+        """根据 NoneBot 配置创建调度器，阶段回调通过关键字参数传入"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        return cls(
+            concurrency=int(getattr(config, "mbtistats_auto_stats_concurrency", 8)),
+            fetch_concurrency=int(getattr(config, "mbtistats_auto_stats_fetch_concurrency", 4)),
+            compute_concurrency=int(getattr(config, "mbtistats_auto_stats_compute_concurrency", 4)),
+            render_concurrency=int(getattr(config, "mbtistats_auto_stats_render_concurrency", 2)),
+            send_concurrency=int(getattr(config, "mbtistats_auto_stats_send_concurrency", 2)),
+            api_rate=float(getattr(config, "mbtistats_api_rate", 5.0)),
+            debug=bool(getattr(config, "mbtistats_auto_stats_debug", False)),
+            disabled_file=data_dir / "auto_stats_disabled.txt",
+            member_cache=get_member_cache(),
+            **funcs,
+        )
+
+    async def run(self, group_ids: Iterable[str | int]) -> AutoStatsReport:
+        """对给定的群执行一次自动统计，返回分群耗时报告"""
+        report = AutoStatsReport(started_at=time.time())
+        begin = time.perf_counter()
+
+        disabled = await run_io(load_disabled_groups, self.disabled_file) if self.disabled_file else set()
+        group_slots = asyncio.Semaphore(self.concurrency)
+        stage_slots = {
+            stage: asyncio.Semaphore(limit) for stage, limit in self._stage_limits.items()
+        }
+
+        async def process(timing: GroupTiming) -> None:
+            async with group_slots:
+                group_begin = time.perf_counter()
+                try:
+                    await self._process_group(timing, stage_slots)
+                except Exception as e:
+                    timing.status = "failed"
+                    timing.error = f"{type(e).__name__}: {e}"
+                    logger.warning(f"群 {timing.group_id} 自动统计失败: {timing.error}")
+                finally:
+                    timing.total = time.perf_counter() - group_begin
+
+        tasks = []
+        for group_id in group_ids:
+            timing = GroupTiming(group_id=str(group_id))
+            report.groups.append(timing)
+            if timing.group_id in disabled:
+                timing.status = "skipped"
+                continue
+            tasks.append(process(timing))
+
+        await asyncio.gather(*tasks)
+        report.elapsed = time.perf_counter() - begin
+        perf.record("auto_stats.run", report.elapsed)
+        logger.info(report.format())
+        return report
+
+    async def _run_stage(
+        self,
+        stage: str,
+        timing: GroupTiming,
+        slots: dict[str, asyncio.Semaphore],
+        *args: Any,
+        uses_api: bool = False,
+    ) -> Any:
+        async with slots[stage]:
+            if uses_api:
+                timing.api_wait += await self.api_bucket.acquire()
+            begin = time.perf_counter()
+            try:
+                return await _call(self._funcs[stage], *args)
+            finally:
+                timing.stages[stage] = time.perf_counter() - begin
+                perf.record(f"auto_stats.{stage}", timing.stages[stage])
+
+    async def _process_group(
+        self, timing: GroupTiming, slots: dict[str, asyncio.Semaphore]
+    ) -> None:
+        group_id = timing.group_id
+        members = self.member_cache.lookup(group_id) if self.member_cache is not None else None
+        if members is None:
+            members = await self._run_stage("fetch", timing, slots, group_id, uses_api=True)
+            if self.member_cache is not None and isinstance(members, list):
+                self.member_cache.put(group_id, members)
+        else:
+            timing.stages["fetch"] = 0.0
+        stats = await self._run_stage("compute", timing, slots, group_id, members)
+        if stats is None:
+            timing.status = "empty"
+            return
+        image = await self._run_stage("render", timing, slots, group_id, stats)
+        if self.debug:
+            # 调试模式：只渲染到缓存目录，不发送到群
+            timing.status = "debug"
+            return
+        await self._run_stage("send", timing, slots, group_id, image, uses_api=True)
+        timing.status = "ok"
@@ -0,0 +1,421 @@
+"""
+常驻 Chromium 浏览器池
+
+每次渲染都冷启动 Chromium 是 /mbti 回复慢的主要原因。这里维护一个长期存活的浏览器，
+并预先创建固定数量的 (BrowserContext, Page) 槽位，渲染时从池中借出、用完归还：
+
+- 池大小固定，超出的渲染请求排队等待（可观测排队深度与等待时间）
+- 每个页面渲染 N 次后回收重建，避免页面内存持续增长
+- 页面崩溃 / 浏览器断开时自动重建
+- close() 关闭全部页面（包括借出中的），排队等待页面的调用方收到 PoolClosedError
+- Playwright 在第一次 start() 时才导入，导入本模块不会拖慢 Bot 冷启动
+- add_route() 注册的路由处理函数在每个页面借出前应用到其 BrowserContext（新建 / 重建的页面同样生效）
+- screenshot() 测量页面内容的实际高度，通过 CDP Page.captureScreenshot 只截取该区域，
+  支持 PNG / JPEG / WebP 输出（见 image_output.py）
+
+用法：
+    pool = BrowserPool(size=2)
+    await pool.start()
+    async with pool.acquire() as page:
+        await page.goto(url)
+        png = await page.screenshot(full_page=True)
+    await pool.close()
+"""
+
+import asyncio
+import base64
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable
+
+from nonebot.log import logger
+
+from .image_output import PNG, ImageFormat, optimize_png, output_stats
+from .perf import perf
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, CDPSession, Page, Playwright, Route
+
+RouteHandler = Callable[["Route"], Awaitable[None]]
+
+# 页面内容高度：body 的内容高度加上下外边距（body 设为 100% 高度时退化为视口高度）
+CONTENT_HEIGHT_JS = """() => {
+    const body = document.body;
+    if (!body) return 0;
+    const style = getComputedStyle(body);
+    const bottom = Math.max(body.scrollHeight, body.getBoundingClientRect().bottom + window.scrollY);
+    return Math.ceil(bottom + parseFloat(style.marginTop || 0) + parseFloat(style.marginBottom || 0));
+}"""
+# Chromium 单张截图的最大边长
+MAX_SCREENSHOT_HEIGHT = 16384
+
+
+class _PlaywrightNotLoaded(Exception):
+    """Playwright 导入前 PlaywrightError 的占位类型（不会被抛出）"""
+
+
+# 第一次启动浏览器池时替换为 playwright.async_api.Error
+PlaywrightError: type[Exception] = _PlaywrightNotLoaded
+
+
+def _load_playwright():
+    """延迟导入 Playwright，并记录导入耗时"""
+    global PlaywrightError
+    begin = time.perf_counter()
+    from playwright.async_api import Error, async_playwright
+
+    PlaywrightError = Error
+    perf.record("render.playwright_import", time.perf_counter() - begin)
+    return async_playwright
+
+
+@dataclass(eq=False)
+class _Slot:
+    """池中的一个渲染槽位：独立的 BrowserContext + Page"""
+
+    context: "BrowserContext"
+    page: "Page"
+    renders: int = 0
+    crashed: bool = False
+    cdp: "CDPSession | None" = None
+    routes: int = 0     # 已应用到该 context 的路由数量
+    generation: int = 0  # 创建时池的启动代数，关闭后重新启动的池不接收旧槽位
+
+
+@dataclass
+class PoolStats:
+    """浏览器池运行统计"""
+
+    renders: int = 0            # 完成的渲染次数
+    failures: int = 0           # 渲染过程中抛出异常的次数
+    recycled: int = 0           # 页面回收重建次数
+    crashed: int = 0            # 页面崩溃次数
+    browser_restarts: int = 0   # 浏览器重新启动次数
+    wait_count: int = 0
+    wait_total: float = 0.0     # 累计排队等待时间（秒）
+    wait_max: float = 0.0
+    wait_last: float = 0.0
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+class PoolClosedError(RuntimeError):
+    """浏览器池已关闭（排队等待页面的调用方在关闭时收到）"""
+
+
+class BrowserPool:
+    """常驻浏览器 + 有界页面池"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_renders_per_page: int = 50,
+        viewport_width: int = 1050,
+        viewport_height: int = 2500,
+        render_timeout: float = 30,
+        launch_args: list[str] | None = None,
+    ):
+        if size <= 0:
+            raise ValueError("浏览器池大小必须大于0")
+        self.size = size
+        self.max_renders_per_page = max_renders_per_page
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.render_timeout = render_timeout
+        self.launch_args = launch_args or []
+
+        self._playwright: "Playwright | None" = None
+        self._browser: "Browser | None" = None
+        # 空闲槽位；None 是关闭时唤醒排队者的哨兵
+        self._idle: asyncio.Queue[_Slot | None] = asyncio.Queue()
+        # 全部存活的槽位（空闲 + 借出），关闭时逐个关闭
+        self._slots: set[_Slot] = set()
+        self._generation = 0
+        self._start_lock = asyncio.Lock()
+        self._browser_lock = asyncio.Lock()
+        self._started = False
+        self._closing = False
+        self._waiting = 0
+        self._routes: list[tuple[str, RouteHandler]] = []
+        self.stats = PoolStats()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "BrowserPool":
+        """根据 NoneBot 配置（.env 中的 mbtistats_* 项）创建浏览器池"""
+        return cls(
+            size=int(getattr(config, "mbtistats_browser_pool_size", 2)),
+            max_renders_per_page=int(getattr(config, "mbtistats_browser_page_max_renders", 50)),
+            viewport_width=int(getattr(config, "mbtistats_viewport_width", 1050)),
+            viewport_height=int(getattr(config, "mbtistats_viewport_height", 2500)),
+            render_timeout=float(getattr(config, "mbtistats_render_timeout", 30)),
+        )
+
+    # --- 生命周期 ---
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def start(self) -> None:
+        """启动浏览器并创建全部页面槽位（重复调用无副作用）"""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._closing = False
+            # 丢弃上次关闭时未被取走的哨兵
+            while not self._idle.empty():
+                self._idle.get_nowait()
+            self._generation += 1
+            begin = time.perf_counter()
+            async_playwright = _load_playwright()
+            try:
+                self._playwright = await async_playwright().start()
+                await self._launch_browser()
+                for _ in range(self.size):
+                    self._idle.put_nowait(await self._new_slot())
+            except BaseException:
+                # 启动中途失败：释放已创建的页面、浏览器与 Playwright
+                await self._shutdown()
+                raise
+            self._started = True
+            logger.info(
+                f"浏览器池已启动: {self.size} 个页面, 耗时 {time.perf_counter() - begin:.2f}s"
+            )
+
+    async def close(self) -> None:
+        """关闭所有页面、浏览器与 Playwright"""
+        async with self._start_lock:
+            if not self._started:
+                return
+            self._closing = True
+            self._started = False
+            await self._shutdown()
+            # 唤醒排队等待页面的调用方，它们会收到 PoolClosedError
+            for _ in range(self._waiting):
+                self._idle.put_nowait(None)
+            logger.info("浏览器池已关闭")
+
+    async def _shutdown(self) -> None:
+        """关闭全部槽位（包括借出中的）、浏览器与 Playwright"""
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for slot in list(self._slots):
+            await self._close_slot(slot)
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except PlaywrightError:
+                pass
+            self._playwright = None
+
+    def add_route(self, pattern: str, handler: RouteHandler) -> None:
+        """注册 BrowserContext 路由（重复注册同一处理函数无副作用），页面下次借出时生效"""
+        if (pattern, handler) not in self._routes:
+            self._routes.append((pattern, handler))
+
+    # --- 借出 / 归还 ---
+
+    @property
+    def queue_depth(self) -> int:
+        """正在排队等待页面的请求数"""
+        return self._waiting
+
+    @property
+    def idle_count(self) -> int:
+        """当前空闲的页面数"""
+        return self._idle.qsize()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator["Page"]:
+        """借出一个页面；退出上下文时自动归还（必要时回收重建）"""
+        async with self._acquire_slot() as slot:
+            yield slot.page
+
+    @asynccontextmanager
+    async def _acquire_slot(self) -> AsyncIterator[_Slot]:
+        if not self._started:
+            await self.start()
+
+        begin = time.perf_counter()
+        self._waiting += 1
+        try:
+            slot = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if slot is None:
+            raise PoolClosedError("浏览器池已关闭")
+        self._record_wait(time.perf_counter() - begin)
+
+        failed = False
+        try:
+            if slot.crashed or slot.page.is_closed() or not self._browser_connected():
+                slot = await self._recycle(slot)
+            while slot.routes < len(self._routes):
+                await slot.context.route(*self._routes[slot.routes])
+                slot.routes += 1
+            yield slot
+        except BaseException:
+            failed = True
+            self.stats.failures += 1
+            raise
+        finally:
+            slot.renders += 1
+            if not failed:
+                self.stats.renders += 1
+            needs_recycle = (
+                slot.crashed
+                or slot.page.is_closed()
+                or (failed and not self._browser_connected())
+                or slot.renders >= self.max_renders_per_page
+            )
+            # 借出期间池已关闭时，槽位已随关闭释放，不再归还
+            if not self._closing and slot.generation == self._generation:
+                if needs_recycle:
+                    try:
+                        slot = await self._recycle(slot)
+                    except PlaywrightError as e:
+                        # 重建失败时仍归还旧槽位，保证池大小不变；下次借出时会再次尝试重建
+                        logger.error(f"重建渲染页面失败: {e}")
+                        slot.crashed = True
+                self._idle.put_nowait(slot)
+
+    async def screenshot(self, url: str, *, image_format: ImageFormat = PNG, clip_to_content: bool = True) -> bytes:
+        """打开 url 并截图，返回 image_format 格式的图片字节
+
+        clip_to_content=True 时只截取页面内容的实际高度；False 时截取固定视口。
+        """
+        async with self._acquire_slot() as slot:
+            page = slot.page
+            with perf.span("render.screenshot"):
+                await page.goto(url, wait_until="networkidle")
+                height = self.viewport_height
+                if clip_to_content:
+                    measured = await page.evaluate(CONTENT_HEIGHT_JS)
+                    if measured > 0:
+                        height = min(int(measured), MAX_SCREENSHOT_HEIGHT)
+                if slot.cdp is None:
+                    slot.cdp = await slot.context.new_cdp_session(page)
+                params: dict[str, Any] = {
+                    "format": image_format.type,
+                    "clip": {"x": 0, "y": 0, "width": self.viewport_width, "height": height, "scale": 1},
+                    "captureBeyondViewport": True,
+                }
+                if image_format.quality is not None:
+                    params["quality"] = image_format.quality
+                result = await slot.cdp.send("Page.captureScreenshot", params)
+            encoded = base64.b64decode(result["data"])
+
+        if image_format.type == "png":
+            # zlib 释放 GIL，重新压缩放到线程中执行，不阻塞事件循环
+            with perf.span("render.encode"):
+                data = await asyncio.to_thread(optimize_png, encoded)
+        else:
+            data = encoded
+        output_stats.record(
+            image_format,
+            encoded=len(encoded),
+            output=len(data),
+            pixels_clipped=max(0, self.viewport_height - height) * self.viewport_width,
+        )
+        return data
+
+    def snapshot(self) -> dict[str, Any]:
+        """返回可序列化的池状态，用于日志与管理命令"""
+        stats = self.stats
+        return {
+            "size": self.size,
+            "idle": self.idle_count,
+            "queue_depth": self.queue_depth,
+            "renders": stats.renders,
+            "failures": stats.failures,
+            "recycled": stats.recycled,
+            "crashed": stats.crashed,
+            "browser_restarts": stats.browser_restarts,
+            "wait_avg_ms": round(stats.wait_total / stats.wait_count * 1000, 2) if stats.wait_count else 0.0,
+            "wait_max_ms": round(stats.wait_max * 1000, 2),
+            "wait_last_ms": round(stats.wait_last * 1000, 2),
+        }
+
+    # --- 内部实现 ---
+
+    def _record_wait(self, seconds: float) -> None:
+        perf.record("render.pool_wait", seconds)
+        stats = self.stats
+        stats.wait_count += 1
+        stats.wait_total += seconds
+        stats.wait_last = seconds
+        stats.wait_max = max(stats.wait_max, seconds)
+
+    def _browser_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _launch_browser(self) -> None:
+        assert self._playwright is not None
+        self._browser = await self._playwright.chromium.launch(args=self.launch_args)
+
+    async def _ensure_browser(self) -> None:
+        """浏览器断开（崩溃 / 被杀）时重新启动"""
+        async with self._browser_lock:
+            if self._browser_connected():
+                return
+            logger.warning("浏览器连接已断开，正在重新启动...")
+            self.stats.browser_restarts += 1
+            await self._launch_browser()
+
+    async def _new_slot(self) -> _Slot:
+        await self._ensure_browser()
+        assert self._browser is not None
+        context = await self._browser.new_context(
+            viewport={"width": self.viewport_width, "height": self.viewport_height}
+        )
+        context.set_default_timeout(self.render_timeout * 1000)
+        try:
+            page = await context.new_page()
+        except BaseException:
+            await context.close()
+            raise
+        slot = _Slot(context=context, page=page, generation=self._generation)
+        self._slots.add(slot)
+
+        def on_crash(_: "Page") -> None:
+            slot.crashed = True
+            self.stats.crashed += 1
+            logger.warning("渲染页面崩溃，将在归还时重建")
+
+        page.on("crash", on_crash)
+        return slot
+
+    async def _close_slot(self, slot: _Slot) -> None:
+        if slot not in self._slots:
+            # 已关闭（例如借出期间池被关闭）
+            return
+        self._slots.discard(slot)
+        try:
+            await slot.context.close()
+        except PlaywrightError:
+            pass
+
+    async def _recycle(self, slot: _Slot) -> _Slot:
+        self.stats.recycled += 1
+        await self._close_slot(slot)
+        return await self._new_slot()
+
+
+# 进程内共享的浏览器池（由 bot.py 在启动时设置）
+_browser_pool: BrowserPool | None = None
+
+
+def set_browser_pool(pool: BrowserPool | None) -> None:
+    global _browser_pool
+    _browser_pool = pool
+
+
+def get_browser_pool() -> BrowserPool | None:
+    """获取 bot.py 注册的共享浏览器池；未注册时返回 None，调用方应回退到自行启动浏览器"""
+    return _browser_pool
@@ -0,0 +1,317 @@
+"""
+历史趋势数据的降采样与连续段识别（服务端实现）
+
+对应 .ai/plan-260218.md 中前端的 getIntervalRenderData：
+- 按时间窗口 [start, end] 选取数据，并纳入窗口外最近的左右锚点
+- 相邻两点时间差 <= continuityResolution 视为连续，识别出连续段与离散点
+- 连续段内按 sampleResolution 分桶做多维 LTTB 降采样（各维三角形面积之和最大者入选）
+- 根据总时间跨度决定展示的窗口组合（一周 / 一月 / 一年 / 全历史）
+
+原先这些计算在 Chromium 页面内用 JavaScript 完成，长历史的群需要把全量历史注入页面；
+现在由后端预先算好每个窗口降采样后的序列，页面只负责绘制。
+
+整个历史的时间戳与参考向量只计算一次，各窗口通过 bisect 得到下标区间后共享同一份数组。
+历史先转换为列式表示（common/history_columns.py），参考向量直接取自类型矩阵，
+时间点数据只为最终入选的点按需还原。
+"""
+
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, tzinfo
+from typing import Any, Callable, Sequence
+from zoneinfo import ZoneInfo
+
+from .history_columns import ColumnarHistory
+from .stats_format import MBTI_TYPES
+
+DAY_MS = 24 * 3600 * 1000
+
+# 四色人格：紫(NT) 绿(NF) 蓝(SJ) 黄(SP)
+TEMPERAMENTS = {
+    "NT": MBTI_TYPES[0:4],
+    "NF": MBTI_TYPES[4:8],
+    "SJ": MBTI_TYPES[8:12],
+    "SP": MBTI_TYPES[12:16],
+}
+
+# 图表几何常量（px），见 plan 1.2
+CHART_WIDTH = 900
+CONTINUITY_PX = 12
+SAMPLE_PX = 3
+
+DEFAULT_TZ = ZoneInfo("Asia/Shanghai")
+
+TimePoint = dict[str, Any]
+RenderItem = dict[str, Any]
+
+
+# 四色人格在类型矩阵中的列区间 [lo, hi)
+_TEMPERAMENT_COLUMNS = {
+    key: (MBTI_TYPES.index(names[0]), MBTI_TYPES.index(names[-1]) + 1)
+    for key, names in TEMPERAMENTS.items()
+}
+
+
+class _LazyPoints(Sequence[TimePoint]):
+    """按下标按需构造 TimePoint（降采样只会取用其中少数点）"""
+
+    def __init__(self, timestamps: Sequence[int], build: Callable[[int], TimePoint]):
+        self._timestamps = timestamps
+        self._build = build
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __getitem__(self, index: int) -> TimePoint:
+        return self._build(index)
+
+
+def type16_vector(type_data: list[dict[str, Any]]) -> list[float]:
+    """type_data -> 16 维向量（按 MBTI_TYPES 顺序）"""
+    values = {entry["name"]: entry["value"] for entry in type_data}
+    return [float(values.get(name, 0)) for name in MBTI_TYPES]
+
+
+def type4_data(type_data: list[dict[str, Any]]) -> dict[str, int]:
+    """type_data -> 四色人格人数"""
+    values = {entry["name"]: entry["value"] for entry in type_data}
+    return {
+        key: sum(values.get(name, 0) for name in names)
+        for key, names in TEMPERAMENTS.items()
+    }
+
+
+def _triangle_area(
+    ta: float, va: Sequence[float],
+    tb: float, vb: Sequence[float],
+    tc: float, vc: Sequence[float],
+) -> float:
+    """多维三角形面积：各维度 (t, v_d) 平面上三角形面积绝对值之和（省略常数 1/2）"""
+    dt_ab = tb - ta
+    dt_ac = tc - ta
+    return sum(
+        abs(dt_ab * (c - a) - dt_ac * (b - a))
+        for a, b, c in zip(va, vb, vc)
+    )
+
+
+def lttb_indices(
+    timestamps: Sequence[int],
+    vectors: Sequence[Sequence[float]],
+    lo: int,
+    hi: int,
+    sample_resolution: float,
+) -> list[int]:
+    """对 [lo, hi] 闭区间内的连续段做多维 LTTB，返回被选中的中间点下标（不含两端点）
+
+    桶宽为 sample_resolution，多余的时间量并入最后一个桶。
+    """
+    if hi - lo < 2:
+        return []
+    t0 = timestamps[lo]
+    span = timestamps[hi] - t0
+    bucket_count = max(1, int(span // sample_resolution)) if sample_resolution > 0 else hi - lo - 1
+
+    # 中间点按时间分桶（空桶直接跳过）
+    buckets: list[list[int]] = []
+    current_bucket = -1
+    for i in range(lo + 1, hi):
+        if sample_resolution > 0:
+            b = min(int((timestamps[i] - t0) // sample_resolution), bucket_count - 1)
+        else:
+            b = i
+        if b != current_bucket:
+            buckets.append([])
+            current_bucket = b
+        buckets[-1].append(i)
+
+    dims = len(vectors[lo])
+    selected: list[int] = []
+    prev = lo
+    for n, bucket in enumerate(buckets):
+        if len(bucket) == 1:
+            selected.append(bucket[0])
+            prev = bucket[0]
+            continue
+        # 下一个桶的平均点；最后一个桶用连续段右端点
+        if n + 1 < len(buckets):
+            nxt = buckets[n + 1]
+            tc = sum(timestamps[i] for i in nxt) / len(nxt)
+            vc = [sum(vectors[i][d] for i in nxt) / len(nxt) for d in range(dims)]
+        else:
+            tc = timestamps[hi]
+            vc = vectors[hi]
+        ta, va = timestamps[prev], vectors[prev]
+        best = max(
+            bucket,
+            key=lambda i: _triangle_area(ta, va, timestamps[i], vectors[i], tc, vc),
+        )
+        selected.append(best)
+        prev = best
+    return selected
+
+
+def get_interval_render_data(
+    points: Sequence[TimePoint],
+    timestamps: Sequence[int],
+    vectors: Sequence[Sequence[float]],
+    start: int,
+    end: int,
+    sample_resolution: float,
+    continuity_resolution: float,
+) -> list[RenderItem]:
+    """计算 [start, end] 时间范围内的渲染数据（离散点与连续段按时间排序）
+
+    points / timestamps / vectors 按下标一一对应，且按时间升序。
+    返回元素为 TimePoint 或
+    {"type": "continuous", "start": TimePoint, "end": TimePoint, "series": [TimePoint, ...]}。
+    """
+    lo = bisect_left(timestamps, start)
+    hi = bisect_right(timestamps, end) - 1
+    # 左右锚点
+    lo = max(0, lo - 1)
+    hi = min(len(timestamps) - 1, hi + 1)
+    if lo > hi:
+        return []
+
+    result: list[RenderItem] = []
+    seg_start = lo
+    for i in range(lo, hi + 1):
+        is_last = i == hi
+        if not is_last and timestamps[i + 1] - timestamps[i] <= continuity_resolution:
+            continue
+        # [seg_start, i] 为一个连续段或单个离散点
+        if seg_start == i:
+            result.append(points[i])
+        else:
+            middle = lttb_indices(timestamps, vectors, seg_start, i, sample_resolution)
+            result.append({
+                "type": "continuous",
+                "start": points[seg_start],
+                "end": points[i],
+                "series": [points[j] for j in middle],
+            })
+        seg_start = i + 1
+    return result
+
+
+def resolution_for(span_ms: int) -> tuple[int, int]:
+    """根据窗口时间跨度计算 (sampleResolution, continuityResolution)，单位 ms
+
+    sampleResolution 取不小于 SAMPLE_PX 对应时长的最小 2^n。
+    """
+    ms_per_px = max(span_ms, 1) / CHART_WIDTH
+    continuity = int(CONTINUITY_PX * ms_per_px)
+    sample_target = SAMPLE_PX * ms_per_px
+    sample = 1
+    while sample < sample_target:
+        sample <<= 1
+    return sample, continuity
+
+
+def _shift_months(dt: datetime, months: int) -> datetime:
+    """日期平移整月（日期超出目标月份天数时取月末）"""
+    index = dt.year * 12 + dt.month - 1 + months
+    year, month = divmod(index, 12)
+    day = min(dt.day, calendar.monthrange(year, month + 1)[1])
+    return dt.replace(year=year, month=month + 1, day=day)
+
+
+def _midnight(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _to_ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+
+def plan_windows(first: int, last: int, now: int, tz: tzinfo = DEFAULT_TZ) -> list[tuple[str, int, int]]:
+    """根据总时间跨度决定展示的窗口组合，返回 [(key, start_ms, end_ms), ...]
+
+    规则见 plan 1.2；只有 1 个时间点（first == last）时不展示历史趋势图。
+    """
+    if first == last:
+        return []
+    now_dt = datetime.fromtimestamp(now / 1000, tz)
+    first_date = datetime.fromtimestamp(first / 1000, tz).date()
+    last_date = datetime.fromtimestamp(last / 1000, tz).date()
+    window_end = _midnight(now_dt) + timedelta(days=1)
+
+    def window_start(shifted: datetime) -> int:
+        return _to_ms(_midnight(shifted) + timedelta(days=1))
+
+    windows = []
+    if last - first >= 7 * DAY_MS:
+        windows.append(("week", window_start(now_dt - timedelta(days=7)), _to_ms(window_end)))
+        if _shift_months(datetime.combine(first_date, datetime.min.time()), 2).date() <= last_date:
+            windows.append(("month", window_start(_shift_months(now_dt, -1)), _to_ms(window_end)))
+            if _shift_months(datetime.combine(first_date, datetime.min.time()), 24).date() <= last_date:
+                windows.append(("year", window_start(_shift_months(now_dt, -12)), _to_ms(window_end)))
+    windows.append(("all", first, last))
+    return windows
+
+
+def build_history_windows(
+    history: Sequence[dict[str, Any]],
+    now: int | None = None,
+    tz: tzinfo = DEFAULT_TZ,
+) -> list[dict[str, Any]]:
+    """由时间序列（时间点数据、游程记录或 ColumnarHistory）生成各窗口预先降采样的 Type16 / Type4 序列
+
+    返回:
+        [{
+            "key": "week" | "month" | "year" | "all",
+            "start": ms, "end": ms,
+            "sample_resolution": ms, "continuity_resolution": ms,
+            "type16": RenderData,   # TimePoint.data 为 type_data
+            "type4": RenderData,    # TimePoint.data 为 {"NT", "NF", "SJ", "SP"} 人数
+        }, ...]
+    """
+    columns = history if isinstance(history, ColumnarHistory) else ColumnarHistory.from_items(history)
+    if not columns:
+        return []
+
+    # 参考向量直接取自类型矩阵；时间点数据只为最终入选的点按需还原
+    timestamps = columns.timestamps
+    rows = columns.type_matrix.tolist()
+    type16_vectors = [[float(v) for v in row[:16]] for row in rows]
+    type4_vectors = [
+        [float(sum(row[lo:hi])) for lo, hi in _TEMPERAMENT_COLUMNS.values()]
+        for row in rows
+    ]
+    type16_points = _LazyPoints(
+        timestamps, lambda i: {"timestamp": timestamps[i], "data": columns.type_data(i)}
+    )
+    type4_points = _LazyPoints(timestamps, lambda i: {
+        "timestamp": timestamps[i],
+        "data": {key: int(v) for key, v in zip(_TEMPERAMENT_COLUMNS, type4_vectors[i])},
+    })
+
+    now = timestamps[-1] if now is None else now
+    windows = []
+    for key, start, end in plan_windows(timestamps[0], timestamps[-1], now, tz):
+        sample, continuity = resolution_for(end - start)
+        windows.append({
+            "key": key,
+            "start": start,
+            "end": end,
+            "sample_resolution": sample,
+            "continuity_resolution": continuity,
+            "type16": get_interval_render_data(
+                type16_points, timestamps, type16_vectors, start, end, sample, continuity
+            ),
+            "type4": get_interval_render_data(
+                type4_points, timestamps, type4_vectors, start, end, sample, continuity
+            ),
+        })
+    return windows
+
+
+def attach_history_windows(
+    render_data: dict[str, Any],
+    history: Sequence[dict[str, Any]],
+    now: int | None = None,
+) -> dict[str, Any]:
+    """在 transform_to_render_data 的结果上附加 history_windows 字段（原地修改并返回）"""
+    render_data["history_windows"] = build_history_windows(history, now=now)
+    return render_data
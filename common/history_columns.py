@@ -0,0 +1,342 @@
+"""
+时间序列的列式内存表示
+
+时间点数据（见 docs/data-specs.md）在内存中是 dict 列表：每个时间点一份 type_data 列表与
+trait_data 嵌套字典，长历史的群要为每个时间点保存几十个小对象，占内存且遍历慢。
+ColumnarHistory 把同一时间序列按列存放在 array 中（不依赖 NumPy）：
+
+- timestamps: int64，长度 T
+- types:      T × 17 的类型人数矩阵（MBTI_TYPES 16 型 + 模糊类型），行优先平铺
+- traits:     T × 4 × 3 的特质人数矩阵（EI / SN / TF / JP × 两个字母 + X），行优先平铺
+
+按时间窗口切片（window / 下标切片）只产生共享底层数组的视图，不复制数据；
+matrix 属性通过 memoryview 暴露二维 / 三维只读视图。
+
+与 JSON 的相互转换是无损的：type_data 的条目顺序与缺省条目、各字段是否存在都记录在附加列中，
+无法放进矩阵的内容（未知的类型名 / 维度、非整数人数、额外字段）原样保存在每行的 extras 中，
+此时类型矩阵只填入其中可识别的条目。
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterable, Iterator, Sequence
+
+from .stats_format import AMBIGUOUS_TYPE, MBTI_TYPES, collapse, expand, is_record
+
+# 类型矩阵的列顺序：16 型（stats_format.MBTI_TYPES）+ 模糊类型
+TYPE_NAMES = (*MBTI_TYPES, AMBIGUOUS_TYPE)
+# 特质矩阵的维度与每个维度内的列顺序
+TRAIT_AXES = (
+    ("EI", ("E", "I", "X")),
+    ("SN", ("S", "N", "X")),
+    ("TF", ("T", "F", "X")),
+    ("JP", ("J", "P", "X")),
+)
+TYPE_COLUMNS = len(TYPE_NAMES)
+TRAIT_COLUMNS = len(TRAIT_AXES) * 3
+
+_TYPE_INDEX = {name: i for i, name in enumerate(TYPE_NAMES)}
+_TRAIT_KEYS = frozenset(axis for axis, _ in TRAIT_AXES)
+_TRAIT_LETTERS = tuple(frozenset(letters) for _, letters in TRAIT_AXES)
+_COLUMN_FIELDS = frozenset(("timestamp", "group_name", "total_count", "type_data", "trait_data"))
+
+# 每行的字段存在标记
+_HAS_GROUP_NAME = 1
+_HAS_TOTAL_COUNT = 2
+_HAS_TYPE_DATA = 4
+_HAS_TRAIT_DATA = 8
+# 特质存在掩码：低 12 位对应 12 个人数格，高 4 位对应 4 个维度字典
+_AXIS_PRESENT_SHIFT = TRAIT_COLUMNS
+# type_order 中表示「无此条目」的填充值
+_ABSENT = -1
+
+
+def _is_count(value: Any) -> bool:
+    return type(value) is int and -(1 << 63) <= value < (1 << 63)
+
+
+def _encode_types(type_data: Any) -> tuple[list[int], list[int]] | None:
+    """type_data -> (17 列人数, 17 个条目顺序)；无法无损表示时返回 None"""
+    if not isinstance(type_data, list) or len(type_data) > TYPE_COLUMNS:
+        return None
+    counts = [0] * TYPE_COLUMNS
+    order = []
+    for entry in type_data:
+        if type(entry) is not dict or len(entry) != 2:
+            return None
+        index = _TYPE_INDEX.get(entry.get("name"))
+        value = entry.get("value")
+        if index is None or index in order or not _is_count(value):
+            return None
+        counts[index] = value
+        order.append(index)
+    order.extend([_ABSENT] * (TYPE_COLUMNS - len(order)))
+    return counts, order
+
+
+def _approximate_types(type_data: Any) -> list[int]:
+    """无法无损表示的 type_data：矩阵中只填入可识别的条目（原始数据另存于 extras）"""
+    counts = [0] * TYPE_COLUMNS
+    for entry in type_data if isinstance(type_data, list) else []:
+        if isinstance(entry, dict) and entry.get("name") in _TYPE_INDEX and _is_count(entry.get("value")):
+            counts[_TYPE_INDEX[entry["name"]]] = entry["value"]
+    return counts
+
+
+def _encode_traits(trait_data: Any) -> tuple[list[int], int] | None:
+    """trait_data -> (12 格人数, 存在掩码)；无法无损表示时返回 None"""
+    if not isinstance(trait_data, dict) or not trait_data.keys() <= _TRAIT_KEYS:
+        return None
+    counts = [0] * TRAIT_COLUMNS
+    mask = 0
+    for a, (axis, letters) in enumerate(TRAIT_AXES):
+        if axis not in trait_data:
+            continue
+        values = trait_data[axis]
+        if not isinstance(values, dict) or not values.keys() <= _TRAIT_LETTERS[a]:
+            return None
+        mask |= 1 << (_AXIS_PRESENT_SHIFT + a)
+        for k, letter in enumerate(letters):
+            if letter not in values:
+                continue
+            if not _is_count(values[letter]):
+                return None
+            counts[a * 3 + k] = values[letter]
+            mask |= 1 << (a * 3 + k)
+    return counts, mask
+
+
+class _Columns:
+    """底层列存储（只追加；视图通过 [lo, hi) 下标区间共享）"""
+
+    __slots__ = (
+        "timestamps", "types", "type_order", "traits", "trait_mask",
+        "total_count", "flags", "group_names", "extras", "_last_encoded",
+    )
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.types = array("q")          # T × 17
+        self.type_order = array("b")     # T × 17，type_data 中第 k 个条目对应的列，不足以 -1 填充
+        self.traits = array("q")         # T × 12
+        self.trait_mask = array("H")     # T
+        self.total_count = array("q")    # T
+        self.flags = array("B")          # T
+        self.group_names: list[str | None] = []
+        # 行号 -> 未进入矩阵的字段（原样保存）
+        self.extras: dict[int, dict[str, Any]] = {}
+        # 上一行的 (type_data, trait_data) 对象与编码结果：游程记录展开后各点共享同一对象，不必重复编码
+        self._last_encoded: tuple[Any, Any, Any, Any] = (None, None, None, None)
+
+    def append(self, point: dict[str, Any]):
+        row = len(self.timestamps)
+        extras = {}
+        if not point.keys() <= _COLUMN_FIELDS:
+            extras = {k: v for k, v in point.items() if k not in _COLUMN_FIELDS}
+        flags = 0
+
+        self.timestamps.append(point["timestamp"])
+
+        group_name = point.get("group_name")
+        if "group_name" in point:
+            flags |= _HAS_GROUP_NAME
+        # 同一时间序列的群名几乎总是同一个字符串，复用上一行的对象
+        if self.group_names and self.group_names[-1] == group_name:
+            group_name = self.group_names[-1]
+        self.group_names.append(group_name)
+
+        total_count = point.get("total_count", 0)
+        if "total_count" in point and not _is_count(total_count):
+            extras["total_count"] = total_count
+            total_count = 0
+        elif "total_count" in point:
+            flags |= _HAS_TOTAL_COUNT
+        self.total_count.append(total_count)
+
+        type_data, trait_data = point.get("type_data"), point.get("trait_data")
+        last_types, last_traits, encoded_types, encoded_traits = self._last_encoded
+        if type_data is None or type_data is not last_types:
+            encoded_types = _encode_types(type_data) if "type_data" in point else None
+        if trait_data is None or trait_data is not last_traits:
+            encoded_traits = _encode_traits(trait_data) if "trait_data" in point else None
+        self._last_encoded = type_data, trait_data, encoded_types, encoded_traits
+
+        if encoded_types is None:
+            if "type_data" in point:
+                extras["type_data"] = point["type_data"]
+            encoded_types = _approximate_types(point.get("type_data")), [_ABSENT] * TYPE_COLUMNS
+        else:
+            flags |= _HAS_TYPE_DATA
+        self.types.extend(encoded_types[0])
+        self.type_order.extend(encoded_types[1])
+
+        if encoded_traits is None:
+            if "trait_data" in point:
+                extras["trait_data"] = point["trait_data"]
+            encoded_traits = [0] * TRAIT_COLUMNS, 0
+        else:
+            flags |= _HAS_TRAIT_DATA
+        self.traits.extend(encoded_traits[0])
+        self.trait_mask.append(encoded_traits[1])
+
+        self.flags.append(flags)
+        if extras:
+            self.extras[row] = extras
+
+
+class ColumnarHistory(Sequence[dict[str, Any]]):
+    """
+    列式时间序列（按时间升序）
+
+    作为 Sequence 使用时逐行还原为时间点数据；window() / 切片返回共享底层数组的视图。
+    """
+
+    __slots__ = ("_cols", "_lo", "_hi")
+
+    def __init__(self, columns: _Columns | None = None, lo: int = 0, hi: int | None = None):
+        self._cols = columns if columns is not None else _Columns()
+        self._lo = lo
+        self._hi = len(self._cols.timestamps) if hi is None else hi
+
+    # ---------- 构造与导出 ----------
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict[str, Any]]) -> "ColumnarHistory":
+        """由时间点数据 / 游程记录（可混合）构造；非时间升序的输入按时间戳稳定排序"""
+        points = expand(items) if not isinstance(items, list) or any(is_record(i) for i in items) else items
+        if any(points[i]["timestamp"] > points[i + 1]["timestamp"] for i in range(len(points) - 1)):
+            points = sorted(points, key=lambda p: p["timestamp"])
+        columns = _Columns()
+        for point in points:
+            columns.append(point)
+        return cls(columns)
+
+    def to_points(self) -> list[dict[str, Any]]:
+        """还原为时间点数据列表（与输入逐项相等）"""
+        return [self.point(i) for i in range(len(self))]
+
+    def to_records(self) -> list[dict[str, Any]]:
+        """还原为游程记录列表（相邻一致的观测合并，同 stats_format.collapse）"""
+        return collapse(self.to_points())
+
+    # ---------- 视图 ----------
+
+    def __len__(self) -> int:
+        return self._hi - self._lo
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.point(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("ColumnarHistory 只支持连续切片")
+            stop = max(start, stop)
+            return ColumnarHistory(self._cols, self._lo + start, self._lo + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.point(index)
+
+    def window(self, start: int, end: int) -> "ColumnarHistory":
+        """时间戳落在 [start, end] 内的视图（不复制数据）"""
+        timestamps = self.timestamps
+        return self[bisect_left(timestamps, start):bisect_right(timestamps, end)]
+
+    @property
+    def timestamps(self) -> memoryview:
+        """时间戳列（int64 只读视图）"""
+        return memoryview(self._cols.timestamps)[self._lo:self._hi].toreadonly()
+
+    @property
+    def total_counts(self) -> memoryview:
+        return memoryview(self._cols.total_count)[self._lo:self._hi].toreadonly()
+
+    @property
+    def type_matrix(self) -> memoryview:
+        """T × 17 类型人数矩阵（列顺序见 TYPE_NAMES），可用 m[i, j] 取值"""
+        return self._matrix(self._cols.types, (TYPE_COLUMNS,))
+
+    @property
+    def trait_matrix(self) -> memoryview:
+        """T × 4 × 3 特质人数矩阵（顺序见 TRAIT_AXES），可用 m[i, a, k] 取值"""
+        return self._matrix(self._cols.traits, (len(TRAIT_AXES), 3))
+
+    def _matrix(self, column: array, shape: tuple[int, ...]) -> memoryview:
+        width = 1
+        for n in shape:
+            width *= n
+        flat = memoryview(column)[self._lo * width:self._hi * width]
+        return flat.cast("B").cast(column.typecode, (len(self), *shape)).toreadonly()
+
+    @property
+    def nbytes(self) -> int:
+        """本视图在列存储中占用的字节数（不含 extras 与群名字符串）"""
+        cols = self._cols
+        per_row = (
+            cols.timestamps.itemsize + cols.total_count.itemsize + cols.flags.itemsize
+            + cols.trait_mask.itemsize + TYPE_COLUMNS * (cols.types.itemsize + cols.type_order.itemsize)
+            + TRAIT_COLUMNS * cols.traits.itemsize
+        )
+        return per_row * len(self)
+
+    # ---------- 逐行访问 ----------
+
+    def type_row(self, i: int) -> memoryview:
+        """第 i 行的 17 列类型人数"""
+        row = self._lo + i
+        return memoryview(self._cols.types)[row * TYPE_COLUMNS:(row + 1) * TYPE_COLUMNS].toreadonly()
+
+    def type_data(self, i: int) -> list[dict[str, Any]] | None:
+        """第 i 行的 type_data（条目顺序与原始数据一致）；原始数据没有该字段时返回 None"""
+        row = self._lo + i
+        cols = self._cols
+        if not cols.flags[row] & _HAS_TYPE_DATA:
+            return cols.extras.get(row, {}).get("type_data")
+        base = row * TYPE_COLUMNS
+        data = []
+        for k in range(TYPE_COLUMNS):
+            column = cols.type_order[base + k]
+            if column == _ABSENT:
+                break
+            data.append({"name": TYPE_NAMES[column], "value": cols.types[base + column]})
+        return data
+
+    def trait_data(self, i: int) -> dict[str, dict[str, int]] | None:
+        """第 i 行的 trait_data；原始数据没有该字段时返回 None"""
+        row = self._lo + i
+        cols = self._cols
+        if not cols.flags[row] & _HAS_TRAIT_DATA:
+            return cols.extras.get(row, {}).get("trait_data")
+        mask = cols.trait_mask[row]
+        base = row * TRAIT_COLUMNS
+        data = {}
+        for a, (axis, letters) in enumerate(TRAIT_AXES):
+            if not mask & (1 << (_AXIS_PRESENT_SHIFT + a)):
+                continue
+            data[axis] = {
+                letter: cols.traits[base + a * 3 + k]
+                for k, letter in enumerate(letters)
+                if mask & (1 << (a * 3 + k))
+            }
+        return data
+
+    def point(self, i: int) -> dict[str, Any]:
+        """第 i 行还原为时间点数据"""
+        row = self._lo + i
+        cols = self._cols
+        flags = cols.flags[row]
+        point: dict[str, Any] = {"timestamp": cols.timestamps[row]}
+        if flags & _HAS_GROUP_NAME:
+            point["group_name"] = cols.group_names[row]
+        if flags & _HAS_TOTAL_COUNT:
+            point["total_count"] = cols.total_count[row]
+        if flags & _HAS_TYPE_DATA:
+            point["type_data"] = self.type_data(i)
+        if flags & _HAS_TRAIT_DATA:
+            point["trait_data"] = self.trait_data(i)
+        point.update(cols.extras.get(row, {}))
+        return point
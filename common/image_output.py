@@ -0,0 +1,150 @@
+"""
+截图输出格式与体积优化
+
+统计图片经 OneBot 上传，体积直接决定发送耗时，也决定缓存目录的大小：
+
+- 截图只截取页面内容的实际高度（BrowserPool.screenshot 测量后按区域截图），不再是固定的视口高度
+- 输出格式可配置：PNG（无损，用最高压缩级别重新压缩）、JPEG / WebP（有损，指定质量）
+- 按 Adapter 选择格式：`mbtistats_image_format` 为默认值，`mbtistats_image_format_overrides`
+  按 Adapter 名称覆盖（例如 QQ 官方接口只用 PNG / JPEG，OneBot V11 实现通常支持 WebP）
+- 记录每种格式的原始字节数、输出字节数与裁掉的像素数，见 output_stats.snapshot()（/mbtiperf 中展示）
+
+格式写法："png"、"jpeg"、"jpeg:85"、"webp:90"（冒号后为质量 1-100，PNG 忽略质量）。
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+SUFFIXES = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+DEFAULT_QUALITY = 85
+# 单个 IDAT 块的大小上限（与常见编码器一致）
+IDAT_CHUNK_SIZE = 1 << 16
+
+
+@dataclass(frozen=True)
+class ImageFormat:
+    type: str = "png"
+    quality: int | None = None
+
+    @property
+    def suffix(self) -> str:
+        return SUFFIXES[self.type]
+
+    def __str__(self) -> str:
+        return self.type if self.quality is None else f"{self.type}:{self.quality}"
+
+    @classmethod
+    def parse(cls, text: str) -> "ImageFormat":
+        """解析 "png" / "jpeg:85" / "webp:90"（"jpg" 视为 "jpeg"）"""
+        name, _, quality = str(text).strip().lower().partition(":")
+        name = "jpeg" if name == "jpg" else name
+        if name not in SUFFIXES:
+            raise ValueError(f"不支持的图片格式: {text}（可选 png / jpeg / webp）")
+        if name == "png":
+            return cls("png")
+        value = int(quality) if quality else DEFAULT_QUALITY
+        if not 1 <= value <= 100:
+            raise ValueError(f"图片质量必须在 1-100 之间: {text}")
+        return cls(name, value)
+
+
+PNG = ImageFormat("png")
+
+
+def format_for_adapter(config: Any, adapter_name: str | None = None) -> ImageFormat:
+    """按 Adapter 名称（Adapter.get_name()，如 "OneBot V11"、"QQ"）选择输出格式"""
+    overrides = getattr(config, "mbtistats_image_format_overrides", None) or {}
+    text = overrides.get(adapter_name) if adapter_name else None
+    return ImageFormat.parse(text or getattr(config, "mbtistats_image_format", None) or "png")
+
+
+def _iter_chunks(data: bytes):
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        yield chunk_type, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+def _chunk(chunk_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+
+def optimize_png(data: bytes, level: int = 9) -> bytes:
+    """用 zlib 最高压缩级别重新压缩 PNG 的图像数据（无损，像素与滤波方式不变）
+
+    Chromium 编码截图时优先速度，压缩级别较低；这里只替换 IDAT 的压缩流并去掉 tEXt 等文本块，
+    结果不比原图小时返回原图。
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    head: list[bytes] = []
+    tail: list[bytes] = []
+    idat: list[bytes] = []
+    for chunk_type, body in _iter_chunks(data):
+        if chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type in (b"tEXt", b"zTXt", b"iTXt", b"tIME"):
+            continue
+        elif chunk_type == b"IEND":
+            break
+        else:
+            (tail if idat else head).append(_chunk(chunk_type, body))
+    if not idat:
+        return data
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error:
+        return data
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9)
+    stream = compressor.compress(raw) + compressor.flush()
+    result = b"".join([
+        PNG_SIGNATURE,
+        *head,
+        *(_chunk(b"IDAT", stream[i:i + IDAT_CHUNK_SIZE]) for i in range(0, len(stream), IDAT_CHUNK_SIZE)),
+        *tail,
+        _chunk(b"IEND", b""),
+    ])
+    return result if len(result) < len(data) else data
+
+
+@dataclass
+class _FormatStats:
+    count: int = 0
+    encoded_bytes: int = 0      # 浏览器编码输出的字节数
+    output_bytes: int = 0       # 优化后的字节数
+    pixels_clipped: int = 0     # 按内容高度截图比固定视口少截的像素数
+
+
+@dataclass
+class OutputStats:
+    """各输出格式的体积统计"""
+
+    formats: dict[str, _FormatStats] = field(default_factory=dict)
+
+    def record(self, image_format: ImageFormat, encoded: int, output: int, pixels_clipped: int) -> None:
+        stats = self.formats.setdefault(str(image_format), _FormatStats())
+        stats.count += 1
+        stats.encoded_bytes += encoded
+        stats.output_bytes += output
+        stats.pixels_clipped += pixels_clipped
+
+    def reset(self) -> None:
+        self.formats.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            name: {
+                "count": s.count,
+                "avg_kb": round(s.output_bytes / s.count / 1024, 1) if s.count else 0.0,
+                "bytes_saved": s.encoded_bytes - s.output_bytes,
+                "pixels_clipped": s.pixels_clipped,
+            }
+            for name, s in self.formats.items()
+        }
+
+
+output_stats = OutputStats()
@@ -0,0 +1,131 @@
+"""
+MBTI 昵称分类器（独立原型，生产环境不使用）
+
+Bot 运行时的 MBTI 解析由插件自己的分类器完成，本模块只被 scripts/bench/ 与 member_stats.py
+（同样尚未接入插件）使用；下面的解析规则是推测的，基准测到的是这份原型而不是线上代码。
+
+统计的内层循环：把每个成员的群名片 / 昵称解析为 MBTI。这里只编译一次正则，
+并按原始字符串做 LRU 缓存（同一个名字在不同群、不同轮次的统计里反复出现）。
+
+解析规则：
+- 匹配前后不紧邻英文字母的 4 字母片段 [EIX][SNX][TFX][JPX]（不区分大小写），例如
+  "INTP"、"intj-a 小明"、"ENxP"；"X" 表示该维度未知
+- 名字里出现多个不同的片段（如 "INTP/INFP"）时逐维合并，不一致的维度记为 "X"
+- 全为 "X" 的片段不算 MBTI
+
+这些规则不是从插件移植的，插件源码不在本仓库（submodule）。接入插件之前，
+必须先用插件的解析函数在同一批昵称上比对，结果完全一致后才能替换：
+
+    uv run scripts/bench/bench_classifier.py --reference path/to/plugin_module.py:函数名 [--names names.txt]
+
+比对时双方结果都先归一化为标签（16 型 / 「模糊类型」 / None），见 compare()。
+
+代码 (code) 为 4 个字符，例如 "INTP"、"INXP"；标签 (label) 为 16 型之一或「模糊类型」。
+"""
+
+import importlib
+import importlib.util
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable
+
+from .stats_format import AMBIGUOUS_TYPE
+
+
+_PATTERN = re.compile(r"(?<![A-Za-z])[EIX][SNX][TFX][JPX](?![A-Za-z])", re.IGNORECASE)
+
+CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def classify_code(name: str) -> str | None:
+    """名字 -> MBTI 代码（含 X），没有 MBTI 时返回 None"""
+    code = None
+    for match in _PATTERN.findall(name):
+        candidate = match.upper()
+        if candidate == "XXXX":
+            continue
+        if code is None:
+            code = candidate
+        elif candidate != code:
+            code = "".join(a if a == b else "X" for a, b in zip(code, candidate))
+    return code
+
+
+def code_to_label(code: str | None) -> str | None:
+    """MBTI 代码 -> 标签（16 型或「模糊类型」）"""
+    if code is None:
+        return None
+    return AMBIGUOUS_TYPE if "X" in code else code
+
+
+def classify_label(name: str) -> str | None:
+    """名字 -> 标签"""
+    return code_to_label(classify_code(name))
+
+
+def classify_codes(names: Iterable[str]) -> list[str | None]:
+    """批量解析为 MBTI 代码"""
+    return [classify_code(name) for name in names]
+
+
+def classify(names: Iterable[str]) -> list[str | None]:
+    """批量解析为标签（16 型 / 「模糊类型」 / None）"""
+    return [code_to_label(classify_code(name)) for name in names]
+
+
+def cache_info():
+    """LRU 缓存统计（hits / misses / currsize）"""
+    return classify_code.cache_info()
+
+
+def cache_clear() -> None:
+    classify_code.cache_clear()
+
+
+# --- 与插件解析规则比对 ---
+
+
+def load_reference(spec: str) -> Callable[[str], str | None]:
+    """
+    加载用于比对的解析函数，spec 为 "模块路径.py:函数名" 或 "包.模块:函数名"
+
+    按文件路径加载时不会触发插件 __init__.py 中的 NoneBot 初始化。
+    """
+    target, sep, attr = spec.rpartition(":")
+    if not sep or not target or not attr:
+        raise ValueError(f"比对函数格式应为 模块:函数名，收到: {spec}")
+    if target.endswith(".py"):
+        path = Path(target)
+        if not path.exists():
+            raise FileNotFoundError(f"找不到比对模块: {path}")
+        module_spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    return getattr(module, attr)
+
+
+def _normalize(result: str | None) -> str | None:
+    """比对用：代码 / 标签统一为标签"""
+    if not result:
+        return None
+    result = result.strip()
+    if len(result) == 4 and result.isascii():
+        return code_to_label(result.upper())
+    return result
+
+
+def compare(
+    names: Iterable[str], reference: Callable[[str], str | None]
+) -> list[tuple[str, str | None, str | None]]:
+    """在同一批名字上比对本模块与 reference 的解析结果，返回不一致的 (名字, 本模块, reference)"""
+    mismatches = []
+    for name in dict.fromkeys(names):
+        ours = classify_label(name)
+        theirs = _normalize(reference(name))
+        if ours != theirs:
+            mismatches.append((name, ours, theirs))
+    return mismatches
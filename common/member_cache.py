@@ -0,0 +1,208 @@
+"""
+群成员列表缓存与并发合并 (single-flight)
+
+/mbti 在活跃的群里常常几秒内被多人触发，每次都调用 get_group_member_list 并重新统计；
+零点的自动统计又会对同一批群再拉取一遍。这里按群缓存成员列表：
+
+- 成员列表在 ttl 秒内直接复用，不再调用 API；最多缓存 max_groups 个群（LRU）
+- 同一个群同时只有一次拉取在进行：第一个调用方成为 leader 发起请求，其余调用方等待它的结果；
+  leader 失败时等待者依次重新尝试；leader 被取消或迟迟没有结果时，claim_timeout 秒后
+  本次拉取按失败处理（等待者最多等待 claim_timeout 秒）
+- Bot 进程内由 plugins/member_cache_plugin.py 在 OneBot API 层接入（插件的 /mbti 与自动统计都经过这里）
+
+SingleFlight 也可以用于合并整条「拉取 → 统计 → 渲染」流水线：
+
+    flight = SingleFlight()
+    image = await flight.run(group_id, lambda: fetch_compute_render(group_id))
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+Members = list[dict[str, Any]]
+
+
+class SingleFlight:
+    """相同键的并发调用合并为一次执行，所有调用方得到同一个结果（或异常）"""
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        # 某个调用方被取消时不取消共享的任务，其他调用方仍在等待
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # 标记异常已被读取（所有调用方都已取消时不再产生警告）
+            task.exception()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+
+class MemberListCache:
+    """按群缓存成员列表（TTL + LRU），并合并同一个群的并发拉取"""
+
+    def __init__(self, ttl: float = 60, max_groups: int = 1024, claim_timeout: float = 60):
+        self.ttl = ttl
+        self.max_groups = max_groups
+        self.claim_timeout = claim_timeout
+        # 群号 -> (拉取完成时间 time.monotonic(), 成员列表)
+        self._entries: OrderedDict[str, tuple[float, Members]] = OrderedDict()
+        # 进行中的拉取：群号 -> leader 完成时设置结果的 Future（失败时结果为 None）
+        self._pending: dict[str, asyncio.Future] = {}
+        # 进行中的拉取的超时回调：群号 -> TimerHandle
+        self._claim_timers: dict[str, asyncio.TimerHandle] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired_claims = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "MemberListCache":
+        """根据 NoneBot 配置创建缓存（mbtistats_member_cache_ttl=0 表示不缓存，只合并并发请求）"""
+        return cls(
+            ttl=float(getattr(config, "mbtistats_member_cache_ttl", 60)),
+            max_groups=int(getattr(config, "mbtistats_member_cache_max_groups", 1024)),
+            claim_timeout=float(getattr(config, "mbtistats_member_cache_claim_timeout", 60)),
+        )
+
+    # --- 缓存 ---
+
+    def lookup(self, group_id: str | int) -> Members | None:
+        """ttl 内的成员列表（返回副本）；没有或已过期时返回 None"""
+        key = str(group_id)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def fresh(self, group_id: str | int) -> bool:
+        """是否有 ttl 内的成员列表（不计入命中统计）"""
+        entry = self._entries.get(str(group_id))
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def put(self, group_id: str | int, members: Members) -> None:
+        if self.ttl <= 0:
+            return
+        key = str(group_id)
+        self._entries[key] = (time.monotonic(), list(members))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_groups:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, group_id: str | int | None = None) -> None:
+        """使一个群（None 表示全部）的缓存失效，例如成员变动通知到达时"""
+        if group_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(group_id), None)
+
+    # --- 并发合并 ---
+
+    def claim(self, group_id: str | int) -> bool:
+        """尝试成为该群本次拉取的 leader；已有拉取在进行时返回 False"""
+        key = str(group_id)
+        if key in self._pending:
+            return False
+        loop = asyncio.get_running_loop()
+        self._pending[key] = loop.create_future()
+        if self.claim_timeout > 0:
+            self._claim_timers[key] = loop.call_later(self.claim_timeout, self._expire_claim, key)
+        return True
+
+    def _expire_claim(self, key: str) -> None:
+        """leader 超时未结束（例如调用被取消、on_called_api 没有触发）：按失败处理"""
+        self._claim_timers.pop(key, None)
+        if key in self._pending:
+            self.expired_claims += 1
+            self.resolve(key, None)
+
+    def resolve(self, group_id: str | int, members: Members | None) -> None:
+        """leader 拉取结束：成功时写入缓存，并唤醒等待者（失败时 members 为 None）"""
+        key = str(group_id)
+        if members is not None:
+            self.put(key, members)
+        timer = self._claim_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        future = self._pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(list(members) if members is not None else None)
+
+    async def join(self, group_id: str | int, timeout: float | None = None) -> Members | None:
+        """
+        等待进行中的拉取，返回其结果；没有进行中的拉取、leader 失败或等待超过
+        timeout 秒（默认 claim_timeout，0 表示不限）时返回 None
+        """
+        future = self._pending.get(str(group_id))
+        if future is None:
+            return None
+        self.coalesced += 1
+        timeout = self.claim_timeout if timeout is None else timeout
+        try:
+            members = await asyncio.wait_for(asyncio.shield(future), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            return None
+        return list(members) if members is not None else None
+
+    async def get(self, group_id: str | int, fetch: Callable[[], Awaitable[Members]]) -> Members:
+        """取成员列表：命中缓存直接返回，否则合并到进行中的拉取，或自己发起拉取"""
+        members = self.lookup(group_id)
+        while members is None:
+            if self.claim(group_id):
+                try:
+                    members = await fetch()
+                except BaseException:
+                    self.resolve(group_id, None)
+                    raise
+                self.resolve(group_id, members)
+            else:
+                members = await self.join(group_id)
+        return members
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "groups": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._pending),
+            "expired_claims": self.expired_claims,
+        }
+
+
+_member_cache: MemberListCache | None = None
+
+
+def set_member_cache(cache: MemberListCache | None) -> None:
+    global _member_cache
+    _member_cache = cache
+
+
+def get_member_cache() -> MemberListCache | None:
+    """获取 bot.py 注册的成员列表缓存；未注册时返回 None"""
+    return _member_cache
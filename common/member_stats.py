@@ -0,0 +1,182 @@
+"""
+基于成员列表差分的增量统计
+
+每次统计都要对整个群成员列表逐个解析群名片 / 昵称，再全量重算 16 型人数与四个维度的特质人数。
+大群里两次统计之间通常只有少数成员变化，这里按群缓存「成员 ID → (名字, 解析结果)」，
+每次只对新增、退出、改名的成员做解析，并增量调整计数。
+
+解析结果 (MBTI 代码) 是 4 个字符，每一位为该维度的字母或 "X"（无法判断），例如 "INTP"、"INXP"；
+名字中没有 MBTI 时为 None，不计入统计。含 "X" 的代码在 type_data 中计为「模糊类型」，
+在 trait_data 中对应维度计为 "X"。默认使用 mbti_classifier.classify_code（独立原型）解析；
+插件的统计流程目前没有使用本模块（只在 scripts/bench/ 中使用），接入时应传入插件自己的分类器。
+
+verify=True 时每次更新后都会全量重算并与增量结果比对；不一致时记录警告并以全量结果为准。
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from nonebot.log import logger
+
+from .mbti_classifier import classify_code
+from .stats_format import AMBIGUOUS_TYPE, MBTI_TYPES
+
+TRAIT_DIMENSIONS = ("EI", "SN", "TF", "JP")
+
+Classifier = Callable[[str], str | None]
+MemberKey = tuple[str, str]
+
+
+def member_names(member: dict[str, Any]) -> MemberKey:
+    """成员的 (群名片, 昵称)，作为判断是否改名的依据"""
+    return (member.get("card") or "", member.get("nickname") or "")
+
+
+def classify_member(names: MemberKey, classify: Classifier) -> str | None:
+    """优先解析群名片，解析不出再解析昵称"""
+    card, nickname = names
+    code = classify(card) if card else None
+    if code is None and nickname:
+        code = classify(nickname)
+    return code
+
+
+@dataclass
+class MemberDiff:
+    """一次更新中变化的成员"""
+
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    renamed: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.renamed)
+
+
+class MbtiCounter:
+    """16 型 + 特质计数器"""
+
+    def __init__(self) -> None:
+        self.types: Counter[str] = Counter()
+        self.traits: dict[str, Counter[str]] = {dim: Counter() for dim in TRAIT_DIMENSIONS}
+        self.total = 0
+
+    def add(self, code: str | None, delta: int = 1) -> None:
+        if code is None:
+            return
+        self.total += delta
+        self.types[AMBIGUOUS_TYPE if "X" in code else code] += delta
+        for dim, letter in zip(TRAIT_DIMENSIONS, code):
+            self.traits[dim][letter] += delta
+
+    def type_data(self) -> list[dict[str, Any]]:
+        """16 型按人数降序（同数按固定顺序），模糊类型放在最后"""
+        data = sorted(
+            ({"name": name, "value": self.types[name]} for name in MBTI_TYPES),
+            key=lambda entry: -entry["value"],
+        )
+        data.append({"name": AMBIGUOUS_TYPE, "value": self.types[AMBIGUOUS_TYPE]})
+        return data
+
+    def trait_data(self) -> dict[str, dict[str, int]]:
+        return {
+            dim: {dim[0]: self.traits[dim][dim[0]], dim[1]: self.traits[dim][dim[1]], "X": self.traits[dim]["X"]}
+            for dim in TRAIT_DIMENSIONS
+        }
+
+    def as_tuple(self) -> tuple:
+        """用于比对两个计数器是否一致"""
+        return (
+            self.total,
+            tuple(sorted((k, v) for k, v in self.types.items() if v)),
+            tuple(tuple(sorted((k, v) for k, v in self.traits[dim].items() if v)) for dim in TRAIT_DIMENSIONS),
+        )
+
+
+class GroupMemberStats:
+    """单个群的成员解析缓存与增量计数"""
+
+    def __init__(self, classify: Classifier = classify_code, verify: bool = False):
+        self.classify = classify
+        self.verify = verify
+        self._members: dict[str, tuple[MemberKey, str | None]] = {}
+        self.counter = MbtiCounter()
+        self.mismatches = 0
+
+    def update(self, members: Iterable[dict[str, Any]]) -> MemberDiff:
+        """用最新的成员列表（OneBot get_group_member_list 的结果）更新计数，返回成员变化"""
+        diff = MemberDiff()
+        current: dict[str, MemberKey] = {
+            str(member["user_id"]): member_names(member) for member in members
+        }
+
+        for member_id in list(self._members):
+            if member_id not in current:
+                _, code = self._members.pop(member_id)
+                self.counter.add(code, -1)
+                diff.removed.append(member_id)
+
+        for member_id, names in current.items():
+            cached = self._members.get(member_id)
+            if cached is not None and cached[0] == names:
+                continue
+            code = classify_member(names, self.classify)
+            if cached is None:
+                diff.added.append(member_id)
+            else:
+                diff.renamed.append(member_id)
+                self.counter.add(cached[1], -1)
+            self._members[member_id] = (names, code)
+            self.counter.add(code)
+
+        if self.verify:
+            self._verify()
+        return diff
+
+    def recount(self) -> MbtiCounter:
+        """按当前成员全量重新解析并计数（不使用解析缓存）"""
+        counter = MbtiCounter()
+        for names, _ in self._members.values():
+            counter.add(classify_member(names, self.classify))
+        return counter
+
+    def _verify(self) -> None:
+        full = self.recount()
+        if full.as_tuple() != self.counter.as_tuple():
+            self.mismatches += 1
+            logger.warning(
+                f"增量统计与全量重算不一致（第 {self.mismatches} 次），已以全量结果为准: "
+                f"增量={self.counter.as_tuple()} 全量={full.as_tuple()}"
+            )
+            self.counter = full
+
+    def stats(self, group_name: str, timestamp: int) -> dict[str, Any]:
+        """生成时间点数据（格式见 docs/data-specs.md）"""
+        return {
+            "timestamp": timestamp,
+            "group_name": group_name,
+            "total_count": self.counter.total,
+            "type_data": self.counter.type_data(),
+            "trait_data": self.counter.trait_data(),
+        }
+
+
+class MemberStatsRegistry:
+    """按群号管理 GroupMemberStats"""
+
+    def __init__(self, classify: Classifier = classify_code, verify: bool = False):
+        self.classify = classify
+        self.verify = verify
+        self._groups: dict[str, GroupMemberStats] = {}
+
+    def get(self, group_id: str | int) -> GroupMemberStats:
+        key = str(group_id)
+        if key not in self._groups:
+            self._groups[key] = GroupMemberStats(self.classify, verify=self.verify)
+        return self._groups[key]
+
+    def discard(self, group_id: str | int) -> None:
+        """机器人退群等情况下丢弃该群的缓存"""
+        self._groups.pop(str(group_id), None)
@@ -0,0 +1,35 @@
+"""
+数据迁移
+
+版本化的迁移步骤放在本包中，模块名为 `m{NNNN}_{name}.py`，按编号顺序依次执行：
+
+    m0001_layout_v1     旧目录结构 → data/mbtistats（原 scripts/migrate_data_v1.py）
+    m0002_stats_jsonl   stats-data.json → stats-data.jsonl 游程记录
+
+- 每个步骤按单元（群）在线程池中并行处理，输出文件写入后校验 sha256
+- 进度写入只追加的 journal (`data/mbtistats/migrations/journal.jsonl`)，中断后重新运行从断点继续
+- 非交互：`scripts/migrate.py` 手动执行，bot.py 启动时自动执行未完成的步骤
+
+    runner = MigrationRunner(Path("data/mbtistats"))
+    results = runner.run()
+"""
+
+from .runner import (
+    Migration,
+    MigrationContext,
+    MigrationError,
+    MigrationJournal,
+    MigrationResult,
+    MigrationRunner,
+    discover_migrations,
+)
+
+__all__ = [
+    "Migration",
+    "MigrationContext",
+    "MigrationError",
+    "MigrationJournal",
+    "MigrationResult",
+    "MigrationRunner",
+    "discover_migrations",
+]
@@ -0,0 +1,71 @@
+"""
+0001: 旧目录结构 → data/mbtistats 目录结构（原 scripts/migrate_data_v1.py 的逻辑）
+
+旧结构:
+  data/v1/cache-charts/{group_id}/mbti-stats.json      -> data/mbtistats/data/v1/{group_id}/stats-data.json
+  data/v1/cache-charts/{group_id}/mbti-stats.png       -> data/mbtistats/cache/v1/{group_id}/mbti-stats-pic-{mtime}.png
+  data/v1/auto_stats_disabled.txt                      -> data/mbtistats/auto_stats_disabled.txt
+
+与原脚本不同：目标位置已有数据时不覆盖（新目录中的数据可能已被 Bot 继续写入，以新目录为准），
+因此手动运行过旧脚本、或中断后重新运行都是安全的。
+"""
+
+from pathlib import Path
+
+from ..stats_store import LEGACY_FILE_NAME, LOG_FILE_NAME
+from .runner import Migration, MigrationContext, copy_verified, file_sha256
+
+OLD_DATA_DIR_NAME = "cache-charts"
+OLD_JSON_NAME = "mbti-stats.json"
+OLD_PNG_NAME = "mbti-stats.png"
+DISABLED_FILE_NAME = "auto_stats_disabled.txt"
+DISABLED_UNIT = ":disabled"
+
+
+class LayoutV1Migration(Migration):
+    description = "旧目录结构迁移到 data/mbtistats"
+
+    def units(self, ctx: MigrationContext) -> list[str]:
+        units = []
+        if (ctx.legacy_root / DISABLED_FILE_NAME).exists():
+            units.append(DISABLED_UNIT)
+        old_data_dir = ctx.legacy_root / OLD_DATA_DIR_NAME
+        if old_data_dir.exists():
+            units.extend(sorted(p.name for p in old_data_dir.iterdir() if p.is_dir()))
+        return units
+
+    def apply(self, ctx: MigrationContext, unit: str) -> dict[str, str]:
+        if unit == DISABLED_UNIT:
+            return {str(ctx.disabled_file): _copy_if_missing(ctx.legacy_root / DISABLED_FILE_NAME, ctx.disabled_file)}
+
+        group_dir = ctx.legacy_root / OLD_DATA_DIR_NAME / unit
+        checksums = {}
+
+        old_json = group_dir / OLD_JSON_NAME
+        if old_json.exists():
+            new_dir = ctx.data_dir / unit
+            new_log = new_dir / LOG_FILE_NAME
+            if new_log.exists():
+                # 已迁移并转换为 JSON Lines（见 0002）
+                checksums[str(new_log)] = file_sha256(new_log)
+            else:
+                checksums[str(new_dir / LEGACY_FILE_NAME)] = _copy_if_missing(old_json, new_dir / LEGACY_FILE_NAME)
+
+        old_png = group_dir / OLD_PNG_NAME
+        if old_png.exists():
+            # 使用文件修改时间作为时间戳
+            timestamp = int(old_png.stat().st_mtime * 1000)
+            new_png = ctx.cache_dir / unit / f"mbti-stats-pic-{timestamp}.png"
+            checksums[str(new_png)] = _copy_if_missing(old_png, new_png)
+
+        return checksums
+
+
+def _copy_if_missing(src: Path, dest: Path) -> str:
+    """目标不存在时复制并校验；已存在时保留目标文件，返回其校验和"""
+    if dest.exists():
+        return file_sha256(dest)
+    return copy_verified(src, dest)
+
+
+MIGRATION = LayoutV1Migration()
@@ -0,0 +1,45 @@
+"""
+0002: stats-data.json（JSON 数组）→ stats-data.jsonl（游程记录，只追加）
+
+与 scripts/migrate_data_jsonl.py（不带 --drop-legacy）相同的转换；写入后重新读取，逐个观测比对时间戳与内容哈希。
+插件仍在读写 stats-data.json，旧文件始终保留（只读，StatsStore 读取时与 .jsonl 合并）；
+只有显式执行 migrate_data_jsonl.py --drop-legacy 才会删除。
+"""
+
+from ..stats_format import canonical_hash, expand, migrate_history
+from .runner import Migration, MigrationContext, MigrationError, file_sha256
+
+
+def _observations(items: list[dict]) -> list[tuple[int, str, object]]:
+    return sorted(
+        (p["timestamp"], canonical_hash(p), p.get("group_name")) for p in expand(items)
+    )
+
+
+class StatsJsonlMigration(Migration):
+    description = "时间序列转换为 JSON Lines 游程记录"
+
+    def units(self, ctx: MigrationContext) -> list[str]:
+        store = ctx.store()
+        return [group_id for group_id in store.group_ids() if store.legacy_path(group_id).exists()]
+
+    def apply(self, ctx: MigrationContext, unit: str) -> dict[str, str]:
+        store = ctx.store()
+        if not store.legacy_path(unit).exists():
+            # units() 列出后旧文件被 migrate_data_jsonl.py --drop-legacy 并入 .jsonl（或被删除）
+            log = store.log_path(unit)
+            return {str(log): file_sha256(log)} if log.exists() else {}
+
+        original = store.read_records(unit)
+        records, _ = migrate_history(original)
+        # 写入前先在内存中比对，不一致时不写入 .jsonl
+        expected = _observations(original)
+        if _observations(records) != expected:
+            raise MigrationError("转换结果与原始数据不一致")
+        store.write_records(unit, records)
+        if _observations(store.read_records(unit)) != expected:
+            raise MigrationError("写入后重新读取的数据与原始数据不一致")
+        return {str(store.log_path(unit)): file_sha256(store.log_path(unit))}
+
+
+MIGRATION = StatsJsonlMigration()
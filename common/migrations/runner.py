@@ -0,0 +1,259 @@
+"""
+迁移框架：迁移步骤的发现、日志 (journal) 与并行执行
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import pkgutil
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from nonebot.log import logger
+
+from ..stats_store import StatsStore
+
+STEP_MODULE_PATTERN = re.compile(r"^m(\d{4})_\w+$")
+JOURNAL_FILE_NAME = "journal.jsonl"
+
+
+class MigrationError(Exception):
+    """迁移单元执行或校验失败"""
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_verified(src: Path, dest: Path) -> str:
+    """复制文件（先写临时文件再原子替换）并校验 sha256，返回校验和"""
+    expected = file_sha256(src)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.migrating")
+    shutil.copy2(src, tmp)
+    actual = file_sha256(tmp)
+    if actual != expected:
+        tmp.unlink(missing_ok=True)
+        raise MigrationError(f"校验失败: {src} -> {dest}")
+    os.replace(tmp, dest)
+    return actual
+
+
+@dataclass
+class MigrationContext:
+    """迁移步骤共享的路径"""
+
+    data_root: Path                 # data/mbtistats
+    legacy_root: Path               # 旧版数据目录 data/v1
+
+    @property
+    def data_dir(self) -> Path:
+        return self.data_root / "data" / "v1"
+
+    @property
+    def cache_dir(self) -> Path:
+        return self.data_root / "cache" / "v1"
+
+    @property
+    def disabled_file(self) -> Path:
+        return self.data_root / "auto_stats_disabled.txt"
+
+    @property
+    def journal_dir(self) -> Path:
+        return self.data_root / "migrations"
+
+    def store(self) -> StatsStore:
+        return StatsStore(self.data_dir)
+
+
+class Migration:
+    """
+    一个版本化的迁移步骤。
+
+    子类定义在本包中名为 `m{NNNN}_{name}.py` 的模块里，并以模块级变量 MIGRATION 导出实例。
+    迁移按单元（通常是一个群）执行：units() 列出需要处理的单元，apply() 处理并校验一个单元，
+    返回输出文件的校验和（写入 journal）。单元之间互不依赖，可以并行；apply() 需要可重复执行。
+    """
+
+    id: str = ""
+    description: str = ""
+
+    def units(self, ctx: MigrationContext) -> list[str]:
+        raise NotImplementedError
+
+    def apply(self, ctx: MigrationContext, unit: str) -> dict[str, str]:
+        raise NotImplementedError
+
+
+def discover_migrations() -> list[Migration]:
+    """按编号顺序返回本包中的所有迁移步骤"""
+    package = importlib.import_module(__package__)
+    steps = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = STEP_MODULE_PATTERN.match(info.name)
+        if match is None:
+            continue
+        module = importlib.import_module(f"{__package__}.{info.name}")
+        migration = getattr(module, "MIGRATION", None)
+        if not isinstance(migration, Migration):
+            raise TypeError(f"迁移模块 {info.name} 没有导出 MIGRATION")
+        migration.id = migration.id or info.name[1:]
+        steps.append((int(match.group(1)), migration))
+    return [migration for _, migration in sorted(steps, key=lambda item: item[0])]
+
+
+class MigrationJournal:
+    """
+    只追加的迁移日志：每完成一个单元写一行（含输出文件校验和），每完成一个步骤写一行 complete。
+    中断后重新运行会跳过已完成的单元。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.completed: set[str] = set()
+        self.done_units: dict[str, set[str]] = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # 中断时写了一半的行
+                if entry.get("status") == "complete":
+                    self.completed.add(entry["id"])
+                elif entry.get("status") == "done":
+                    self.done_units.setdefault(entry["id"], set()).add(entry["unit"])
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        entry["time"] = int(time.time() * 1000)
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def is_done(self, migration_id: str, unit: str) -> bool:
+        return unit in self.done_units.get(migration_id, ())
+
+    def record_unit(self, migration_id: str, unit: str, checksums: dict[str, str]) -> None:
+        self._write({"id": migration_id, "unit": unit, "status": "done", "checksums": checksums})
+        with self._lock:
+            self.done_units.setdefault(migration_id, set()).add(unit)
+
+    def record_failure(self, migration_id: str, unit: str, error: str) -> None:
+        self._write({"id": migration_id, "unit": unit, "status": "failed", "error": error})
+
+    def record_complete(self, migration_id: str) -> None:
+        self._write({"id": migration_id, "status": "complete"})
+        self.completed.add(migration_id)
+
+
+@dataclass
+class MigrationResult:
+    id: str
+    done: int = 0
+    skipped: int = 0                # journal 中已完成的单元
+    failed: dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class MigrationRunner:
+    """按顺序执行所有未完成的迁移步骤；每个步骤内的单元用线程池并行处理"""
+
+    def __init__(
+        self,
+        data_root: Path,
+        legacy_root: Path | None = None,
+        workers: int = 8,
+        migrations: list[Migration] | None = None,
+    ):
+        data_root = Path(data_root)
+        self.ctx = MigrationContext(
+            data_root=data_root,
+            legacy_root=Path(legacy_root) if legacy_root is not None else data_root.parent / "v1",
+        )
+        self.workers = workers
+        self.migrations = migrations if migrations is not None else discover_migrations()
+        self.journal = MigrationJournal(self.ctx.journal_dir / JOURNAL_FILE_NAME)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "MigrationRunner":
+        """根据 NoneBot 配置创建迁移执行器"""
+        return cls(
+            data_root=Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats"),
+            workers=int(getattr(config, "mbtistats_migrate_workers", 8)),
+        )
+
+    def pending(self) -> list[Migration]:
+        return [m for m in self.migrations if m.id not in self.journal.completed]
+
+    def plan(self) -> list[tuple[Migration, list[str]]]:
+        """每个未完成步骤剩余需要处理的单元（不执行）"""
+        return [
+            (m, [u for u in m.units(self.ctx) if not self.journal.is_done(m.id, u)])
+            for m in self.pending()
+        ]
+
+    def run(self) -> list[MigrationResult]:
+        """执行所有未完成的步骤；某个步骤有单元失败时停止，后续步骤不执行"""
+        results = []
+        for migration in self.pending():
+            result = self.run_one(migration)
+            results.append(result)
+            if not result.ok:
+                logger.error(
+                    f"迁移 {migration.id} 有 {len(result.failed)} 个单元失败，已停止；修复后重新运行即可从断点继续"
+                )
+                break
+        return results
+
+    def run_one(self, migration: Migration) -> MigrationResult:
+        result = MigrationResult(migration.id)
+        begin = time.perf_counter()
+        units = migration.units(self.ctx)
+        todo = [u for u in units if not self.journal.is_done(migration.id, u)]
+        result.skipped = len(units) - len(todo)
+        if todo:
+            logger.info(f"迁移 {migration.id} ({migration.description}): {len(todo)} 个单元待处理")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(migration.apply, self.ctx, unit): unit for unit in todo}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    checksums = future.result()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    result.failed[unit] = error
+                    self.journal.record_failure(migration.id, unit, error)
+                    logger.warning(f"迁移 {migration.id} 单元 {unit} 失败: {error}")
+                    continue
+                self.journal.record_unit(migration.id, unit, checksums)
+                result.done += 1
+
+        if result.ok:
+            self.journal.record_complete(migration.id)
+        result.elapsed = time.perf_counter() - begin
+        if todo:
+            logger.info(
+                f"迁移 {migration.id} 结束: 完成 {result.done}, 跳过 {result.skipped}, "
+                f"失败 {len(result.failed)}, 耗时 {result.elapsed:.2f}s"
+            )
+        return result
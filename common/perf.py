@@ -0,0 +1,102 @@
+"""
+热路径计时
+
+在进程内为每个阶段维护一个滚动窗口直方图（最近 N 个样本），按需计算 p50 / p95 / p99，
+开销只有一次 perf_counter 与一次 deque 追加，可以常开。
+
+    from common.perf import perf
+
+    with perf.span("render.jinja"):
+        html = template.render(**data)
+
+    perf.record("api.get_group_member_list", seconds)
+    perf.snapshot()   # {name: {"count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "last_ms"}}
+
+命名约定：`阶段.子阶段`，例如 api.*（OneBot API）、storage.*（JSON I/O）、render.*（转换 / Jinja / Chromium）、
+auto_stats.*（自动统计）、handler.*（整个事件处理器）。
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+DEFAULT_WINDOW = 1024
+
+
+class RollingHistogram:
+    """保留最近 window 个样本的直方图"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.last = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.last = seconds
+
+    def percentiles(self, *qs: float) -> list[float]:
+        """最近窗口内样本的分位数（最近秩法）"""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0 for _ in qs]
+        last_index = len(ordered) - 1
+        return [ordered[min(last_index, int(q * len(ordered)))] for q in qs]
+
+    def summary(self) -> dict[str, Any]:
+        p50, p95, p99 = self.percentiles(0.5, 0.95, 0.99)
+        return {
+            "count": self.count,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 2),
+            "last_ms": round(self.last * 1000, 2),
+        }
+
+
+class PerfRegistry:
+    """按名称管理滚动直方图"""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._histograms: dict[str, RollingHistogram] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = RollingHistogram(self.window)
+        histogram.add(seconds)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """计时一段代码（同步 / 异步代码中都可用 with 包裹；异常时同样记录）"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - begin)
+
+    def reset(self) -> None:
+        self._histograms.clear()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {name: self._histograms[name].summary() for name in sorted(self._histograms)}
+
+    def format(self, prefix: str = "") -> str:
+        """生成可读的文本表格（可按名称前缀过滤）"""
+        lines = []
+        for name, summary in self.snapshot().items():
+            if not name.startswith(prefix):
+                continue
+            lines.append(
+                f"{name}: n={summary['count']} p50={summary['p50_ms']}ms "
+                f"p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms max={summary['max_ms']}ms"
+            )
+        return "\n".join(lines) if lines else "暂无数据"
+
+
+# 进程内共享的计时表
+perf = PerfRegistry()
@@ -0,0 +1,299 @@
+"""
+按群缓存图片的索引与清理
+
+每次渲染结果变化都会在 data/mbtistats/cache/v1/{group_id}/ 下新增一张
+mbti-stats-pic-{timestamp}.png，旧图片从不删除；SCF 上数据目录在 /tmp，有硬性的容量上限。
+
+- 启动时扫描一次目录建立内存索引（群号 -> 时间戳 -> 字节数），之后查找最新图片不再列目录；
+  AsyncStorage 写入图片时同步更新索引
+- 插件自己写入的图片不经过 AsyncStorage，因此每次清理前重新扫描目录，与索引对齐
+  （扫描期间经 add() 记录的图片保留）
+- 后台任务每隔 interval 秒清理一次：
+  1. 最新统计记录引用的图片（时间戳不早于最新一条游程记录的第一次观测）与每个群最新的一张图片始终保留
+  2. 其余图片只保留最新的 keep 张，更早的删除
+  3. 单个群超出 group_max_bytes、全部群超出 max_bytes 时，从最旧的图片开始继续删除保留的图片
+- 种子铺设的符号链接不占用数据目录空间，按 0 字节计
+"""
+
+import asyncio
+import heapq
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from nonebot.log import logger
+
+from .seed import CACHE_PIC_PATTERN
+from .stats_store import StatsStore
+
+CACHE_PIC_TEMPLATE = "mbti-stats-pic-{timestamp}.png"
+
+RunIO = Callable[..., Awaitable[Any]]
+
+
+def _file_size(path: Path) -> int:
+    stat = path.lstat()
+    return 0 if path.is_symlink() else stat.st_size
+
+
+class PicCacheIndex:
+    """按群缓存图片的内存索引，以及按字节预算的清理"""
+
+    def __init__(
+        self,
+        pic_dir: Path,
+        max_bytes: int = 100 * 1024 * 1024,
+        group_max_bytes: int = 5 * 1024 * 1024,
+        keep: int = 2,
+        interval: float = 600,
+    ):
+        """
+        pic_dir: 按群缓存图片的目录，例如 data/mbtistats/cache/v1
+        max_bytes: 全部群图片的总字节数上限
+        group_max_bytes: 单个群图片的字节数上限
+        keep: 除最新统计引用的图片外，每个群额外保留的最新图片数
+        interval: 后台清理间隔（秒），0 表示不启动后台任务
+        """
+        self.pic_dir = Path(pic_dir)
+        self.max_bytes = max_bytes
+        self.group_max_bytes = group_max_bytes
+        self.keep = keep
+        self.interval = interval
+        # 群号 -> {时间戳: 字节数}
+        self._groups: dict[str, dict[int, int]] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # 扫描进行中时经 add() 记录的图片：(群号, 时间戳) -> 字节数；没有扫描时为 None
+        self._added_during_scan: dict[tuple[str, int], int] | None = None
+        self._task: asyncio.Task | None = None
+        self.loaded = False
+        self.runs = 0
+        self.removed_files = 0
+        self.removed_bytes = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "PicCacheIndex":
+        """根据 NoneBot 配置创建索引"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        return cls(
+            data_dir / "cache" / "v1",
+            max_bytes=int(float(getattr(config, "mbtistats_pic_cache_max_mb", 100)) * 1024 * 1024),
+            group_max_bytes=int(float(getattr(config, "mbtistats_pic_cache_group_max_mb", 5)) * 1024 * 1024),
+            keep=int(getattr(config, "mbtistats_pic_cache_keep", 2)),
+            interval=float(getattr(config, "mbtistats_pic_cache_gc_interval", 600)),
+        )
+
+    def path_for(self, group_id: str | int, timestamp: int) -> Path:
+        return self.pic_dir / str(group_id) / CACHE_PIC_TEMPLATE.format(timestamp=timestamp)
+
+    # --- 索引 ---
+
+    def load(self) -> None:
+        """扫描图片目录建立内存索引"""
+        begin = time.perf_counter()
+        self.rescan()
+        stats = self.snapshot()
+        logger.info(
+            f"缓存图片索引已加载: {stats['groups']} 个群, {stats['files']} 张图片, "
+            f"{stats['bytes'] / 1024 / 1024:.1f} MB, 耗时 {time.perf_counter() - begin:.3f}s"
+        )
+
+    def rescan(self) -> None:
+        """重新扫描图片目录替换内存索引（扫描期间 add() 的记录保留）"""
+        with self._lock:
+            self._added_during_scan = {}
+        try:
+            groups, total = self._scan()
+        except BaseException:
+            with self._lock:
+                self._added_during_scan = None
+            raise
+        with self._lock:
+            for (group_id, timestamp), size in self._added_during_scan.items():
+                pics = groups.setdefault(group_id, {})
+                total += size - pics.get(timestamp, 0)
+                pics[timestamp] = size
+            self._added_during_scan = None
+            self._groups = groups
+            self._total_bytes = total
+            self.loaded = True
+
+    def _scan(self) -> tuple[dict[str, dict[int, int]], int]:
+        groups: dict[str, dict[int, int]] = {}
+        total = 0
+        if self.pic_dir.exists():
+            for group_dir in self.pic_dir.iterdir():
+                if not group_dir.is_dir():
+                    continue
+                pics: dict[int, int] = {}
+                for path in group_dir.iterdir():
+                    match = CACHE_PIC_PATTERN.match(path.name)
+                    if not match:
+                        continue
+                    try:
+                        size = _file_size(path)
+                    except FileNotFoundError:
+                        continue
+                    pics[int(match.group(1))] = size
+                    total += size
+                if pics:
+                    groups[group_dir.name] = pics
+        return groups, total
+
+    def add(self, group_id: str | int, timestamp: int, size: int | None = None) -> None:
+        """记录新写入的图片（未指定 size 时读取文件大小）"""
+        if size is None:
+            try:
+                size = _file_size(self.path_for(group_id, timestamp))
+            except FileNotFoundError:
+                return
+        with self._lock:
+            pics = self._groups.setdefault(str(group_id), {})
+            self._total_bytes += size - pics.get(timestamp, 0)
+            pics[timestamp] = size
+            if self._added_during_scan is not None:
+                self._added_during_scan[(str(group_id), timestamp)] = size
+
+    def latest(self, group_id: str | int) -> Path | None:
+        """该群时间戳最大的图片（只查内存索引）"""
+        with self._lock:
+            pics = self._groups.get(str(group_id))
+            timestamp = max(pics) if pics else None
+        return self.path_for(group_id, timestamp) if timestamp is not None else None
+
+    # --- 清理 ---
+
+    def _referenced_since(self, store: StatsStore, group_id: str) -> int | None:
+        """最新统计记录引用的图片的最早时间戳（没有记录时返回 None）"""
+        try:
+            latest = store.read_latest(group_id)
+        except (OSError, ValueError):
+            return None
+        return latest["timestamps"][0] if latest else None
+
+    def collect(self, store: StatsStore) -> tuple[int, int]:
+        """重新扫描目录后执行一次清理，返回 (删除的文件数, 释放的字节数)"""
+        begin = time.perf_counter()
+        self.rescan()
+        with self._lock:
+            groups = {group_id: dict(pics) for group_id, pics in self._groups.items()}
+
+        victims: list[tuple[str, int]] = []
+        # 可按预算删除的图片（按时间戳升序）：群号 -> [(时间戳, 字节数)]
+        tails: dict[str, list[tuple[int, int]]] = {}
+        group_bytes: dict[str, int] = {}
+        for group_id, pics in groups.items():
+            newest = max(pics)
+            since = self._referenced_since(store, group_id)
+            candidates = sorted(
+                (timestamp, size) for timestamp, size in pics.items()
+                if timestamp != newest and (since is None or timestamp < since)
+            )
+            cut = max(0, len(candidates) - self.keep)
+            victims.extend((group_id, timestamp) for timestamp, _ in candidates[:cut])
+            tail = candidates[cut:]
+            remaining = sum(pics.values()) - sum(size for _, size in candidates[:cut])
+            while tail and remaining > self.group_max_bytes:
+                timestamp, size = tail.pop(0)
+                victims.append((group_id, timestamp))
+                remaining -= size
+            tails[group_id] = tail
+            group_bytes[group_id] = remaining
+
+        total = sum(group_bytes.values())
+        heap = [(tail[0][0], group_id, 0) for group_id, tail in tails.items() if tail]
+        heapq.heapify(heap)
+        while heap and total > self.max_bytes:
+            _, group_id, pos = heapq.heappop(heap)
+            timestamp, size = tails[group_id][pos]
+            victims.append((group_id, timestamp))
+            total -= size
+            if pos + 1 < len(tails[group_id]):
+                heapq.heappush(heap, (tails[group_id][pos + 1][0], group_id, pos + 1))
+
+        removed_files = removed_bytes = 0
+        for group_id, timestamp in victims:
+            try:
+                self.path_for(group_id, timestamp).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"删除缓存图片失败 {group_id}/{timestamp}: {e}")
+                continue
+            with self._lock:
+                pics = self._groups.get(group_id, {})
+                size = pics.pop(timestamp, 0)
+                if not pics:
+                    self._groups.pop(group_id, None)
+                self._total_bytes -= size
+            removed_files += 1
+            removed_bytes += size
+
+        self.runs += 1
+        self.removed_files += removed_files
+        self.removed_bytes += removed_bytes
+        if total > self.max_bytes:
+            logger.warning(
+                f"缓存图片超出总预算: {total / 1024 / 1024:.1f} MB > {self.max_bytes / 1024 / 1024:.1f} MB"
+                "（剩余的都是最新统计引用的图片）"
+            )
+        if removed_files:
+            logger.info(
+                f"缓存图片清理: 删除 {removed_files} 张, 释放 {removed_bytes / 1024 / 1024:.1f} MB, "
+                f"耗时 {time.perf_counter() - begin:.3f}s"
+            )
+        return removed_files, removed_bytes
+
+    # --- 后台任务 ---
+
+    def start(self, store: StatsStore, run: RunIO | None = None) -> None:
+        """启动后台清理任务；run 为执行阻塞调用的协程函数（默认 asyncio.to_thread）"""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(store, run or asyncio.to_thread))
+
+    async def _loop(self, store: StatsStore, run: RunIO) -> None:
+        if not self.loaded:
+            await run(self.load)
+        while True:
+            try:
+                await run(self.collect, store)
+            except Exception as e:
+                logger.warning(f"缓存图片清理失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self) -> None:
+        """停止后台清理任务"""
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "groups": len(self._groups),
+                "files": sum(len(pics) for pics in self._groups.values()),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "runs": self.runs,
+                "removed_files": self.removed_files,
+                "removed_bytes": self.removed_bytes,
+            }
+
+
+_pic_cache: PicCacheIndex | None = None
+
+
+def set_pic_cache(index: PicCacheIndex | None) -> None:
+    global _pic_cache
+    _pic_cache = index
+
+
+def get_pic_cache() -> PicCacheIndex | None:
+    """获取 bot.py 注册的缓存图片索引；未注册时返回 None"""
+    return _pic_cache
@@ -0,0 +1,53 @@
+"""
+异步限速工具
+
+TokenBucket 用于给 OneBot API 调用设置全局速率预算：所有调用方共享同一个桶，
+桶空时 acquire() 会等待到有新令牌为止。
+目前只有 AutoStatsScheduler（尚未接入）使用，Bot 的 API 调用并不经过这里。
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    rate: 每秒补充的令牌数
+    burst: 桶容量（允许的瞬时突发量），默认等于 rate 向上取整
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, int(rate + 0.999))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """取出令牌，返回为此等待的秒数"""
+        if tokens > self.capacity:
+            raise ValueError("单次申请的令牌数不能超过桶容量")
+        waited = 0.0
+        # 串行化等待者，保证先到先得
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
@@ -0,0 +1,221 @@
+"""
+渲染页面的内存静态资源
+
+原先每次截图都把页面写成模板目录下的临时 .html 文件，再以 file:// 打开：script.mjs、style.css、
+images/ 下的人格图片逐个从磁盘读取，ECharts 等外部脚本每个新页面（页面定期回收重建）都要重新下载。
+这里改为通过 Playwright 路由拦截提供全部资源：
+
+- 页面挂在虚拟源 http://r{n}.mbtistats.render/ 下，路径与模板目录一一对应，相对路径照常解析；
+  页面 HTML 本身也从内存提供，不再写临时文件
+- 模板目录下的静态文件（脚本、样式、图片）第一次使用时一次性读入内存，之后不再访问磁盘
+- 白名单 CDN 主机（remote_hosts，默认 ECharts 等脚本常用的公共 CDN）上的资源只在进程内第一次请求时下载，
+  之后直接从内存返回；同一个 URL 的并发请求合并为一次下载。缓存按 LRU 淘汰，总大小不超过 remote_max_bytes
+- 其他外部请求不缓存，直接放行（route.continue_()）
+
+    assets = RenderAssets(template_dir)
+    pool.add_route(ASSET_ROUTE, assets.handle)
+    with assets.page("mbti-stats", html) as url:
+        png = await pool.screenshot(url)
+"""
+
+import itertools
+import mimetypes
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
+from urllib.parse import unquote, urlsplit
+
+from nonebot.log import logger
+
+from .member_cache import SingleFlight
+
+if TYPE_CHECKING:
+    from playwright.async_api import Route
+
+ASSET_ROUTE = "**/*"
+ASSET_HOST_SUFFIX = ".mbtistats.render"
+# 不作为静态资源提供的文件：模板源文件与调试用文件
+EXCLUDED_SUFFIXES = (".html", ".py", ".pyc")
+EXCLUDED_NAMES = ("mock.json",)
+CONTENT_TYPES = {
+    ".mjs": "text/javascript",
+    ".js": "text/javascript",
+    ".css": "text/css",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".woff2": "font/woff2",
+}
+# 缓存外部资源的主机（含子域名）
+REMOTE_CACHE_HOSTS = (
+    "cdn.jsdelivr.net",
+    "fastly.jsdelivr.net",
+    "unpkg.com",
+    "cdnjs.cloudflare.com",
+    "registry.npmmirror.com",
+)
+REMOTE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# 转发外部响应时去掉的头（Playwright 返回的是解压后的内容）
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_origin_ids = itertools.count(1)
+
+
+def content_type(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    return CONTENT_TYPES.get(suffix) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+@dataclass
+class _Response:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+
+class RenderAssets:
+    """以虚拟源提供模板目录的静态资源与渲染页面，并缓存外部资源"""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        remote_hosts: tuple[str, ...] = REMOTE_CACHE_HOSTS,
+        remote_max_bytes: int = REMOTE_CACHE_MAX_BYTES,
+    ):
+        """
+        base_dir: 模板目录
+        remote_hosts: 缓存外部资源的主机（含子域名），其他外部请求直接放行
+        remote_max_bytes: 外部资源缓存的总字节数上限（LRU 淘汰）
+        """
+        self.base_dir = Path(base_dir)
+        self.remote_hosts = tuple(host.lower() for host in remote_hosts)
+        self.remote_max_bytes = remote_max_bytes
+        self.origin = f"http://r{next(_origin_ids)}{ASSET_HOST_SUFFIX}"
+        # 相对模板目录的路径 -> 文件内容
+        self._files: dict[str, bytes] = {}
+        # 正在渲染的页面：路径 -> HTML
+        self._pages: dict[str, bytes] = {}
+        # 外部资源：URL -> 响应（LRU）
+        self._remote: OrderedDict[str, _Response] = OrderedDict()
+        self._remote_bytes = 0
+        self._flight = SingleFlight()
+        self.loaded = False
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.remote_fetches = 0
+        self.misses = 0
+        self.passthrough = 0
+
+    def load(self) -> None:
+        """把模板目录下的静态文件读入内存"""
+        begin = time.perf_counter()
+        files = {}
+        for path in self.base_dir.rglob("*"):
+            if (
+                not path.is_file()
+                or path.name.startswith(".")
+                or path.suffix in EXCLUDED_SUFFIXES
+                or path.name in EXCLUDED_NAMES
+            ):
+                continue
+            files[path.relative_to(self.base_dir).as_posix()] = path.read_bytes()
+        self._files = files
+        self.loaded = True
+        logger.info(
+            f"渲染静态资源已载入内存: {len(files)} 个文件, "
+            f"{sum(map(len, files.values())) / 1024 / 1024:.1f} MB, 耗时 {time.perf_counter() - begin:.3f}s"
+        )
+
+    @contextmanager
+    def page(self, mode: str, html: str) -> Iterator[str]:
+        """在虚拟源下挂载一个渲染页面，返回其 URL（退出上下文时移除）"""
+        path = f"{mode}/.render-{uuid.uuid4().hex}.html"
+        self._pages[path] = html.encode("utf-8")
+        try:
+            yield f"{self.origin}/{path}"
+        finally:
+            self._pages.pop(path, None)
+
+    # --- 路由 ---
+
+    def _cacheable_host(self, host: str) -> bool:
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.remote_hosts)
+
+    async def handle(self, route: "Route") -> None:
+        """Playwright 路由处理函数：虚拟源请求从内存返回，白名单 CDN 资源走缓存，其余外部请求直接放行"""
+        request = route.request
+        url = request.url
+        if url.startswith(self.origin + "/"):
+            await self._serve_local(route, url)
+        elif url.startswith(("http://", "https://")):
+            host = (urlsplit(url).hostname or "").lower()
+            if request.method == "GET" and self._cacheable_host(host):
+                await self._serve_remote(route, url)
+            elif host.endswith(ASSET_HOST_SUFFIX):
+                await route.fallback()
+            else:
+                self.passthrough += 1
+                await route.continue_()
+        else:
+            await route.fallback()
+
+    async def _serve_local(self, route: "Route", url: str) -> None:
+        path = unquote(urlsplit(url).path).lstrip("/")
+        if path in self._pages:
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=self._pages[path])
+        elif path in self._files:
+            self.local_hits += 1
+            await route.fulfill(status=200, content_type=content_type(path), body=self._files[path])
+        else:
+            self.misses += 1
+            logger.debug(f"渲染页面请求了不存在的资源: {path}")
+            await route.fulfill(status=404, body=b"")
+
+    async def _serve_remote(self, route: "Route", url: str) -> None:
+        response = self._remote.get(url)
+        if response is not None:
+            self._remote.move_to_end(url)
+            self.remote_hits += 1
+        else:
+            try:
+                response = await self._flight.run(url, lambda: self._fetch(route, url))
+            except Exception as e:
+                logger.warning(f"下载外部资源失败 {url}: {e}")
+                await route.abort()
+                return
+        await route.fulfill(status=response.status, headers=response.headers, body=response.body)
+
+    async def _fetch(self, route: "Route", url: str) -> _Response:
+        self.remote_fetches += 1
+        fetched = await route.fetch()
+        headers = {k: v for k, v in fetched.headers.items() if k.lower() not in DROPPED_HEADERS}
+        response = _Response(status=fetched.status, headers=headers, body=await fetched.body())
+        if fetched.status == 200 and len(response.body) <= self.remote_max_bytes:
+            self._remember(url, response)
+        return response
+
+    def _remember(self, url: str, response: _Response) -> None:
+        old = self._remote.pop(url, None)
+        if old is not None:
+            self._remote_bytes -= len(old.body)
+        self._remote[url] = response
+        self._remote_bytes += len(response.body)
+        while self._remote_bytes > self.remote_max_bytes:
+            _, evicted = self._remote.popitem(last=False)
+            self._remote_bytes -= len(evicted.body)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "files": len(self._files),
+            "bytes": sum(map(len, self._files.values())),
+            "remote": len(self._remote),
+            "remote_bytes": self._remote_bytes,
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "remote_fetches": self.remote_fetches,
+            "misses": self.misses,
+            "passthrough": self.passthrough,
+        }
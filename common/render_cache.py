@@ -0,0 +1,249 @@
+"""
+内容寻址的渲染缓存
+
+原先的缓存逻辑是按群、按文件名判断：统计数据（除去时间戳）没变就复用该群的
+`mbti-stats-pic-{timestamp}.png`。这里改为以「渲染输入 + 模板版本」的哈希作为键：
+
+- 相同输入、相同模板必然得到相同图片，因此不同群只要输出一致也能共享同一张图
+- 模板文件任何改动都会改变模板版本，旧缓存自然失效
+- 启动时扫描一次目录建立内存索引，之后查找不再访问磁盘目录
+- 按总字节数上限做 LRU 淘汰（最近使用时间写回文件 mtime，重启后顺序不丢）
+- 记录命中 / 未命中次数
+
+目录结构：
+    {cache_dir}/{key[:2]}/{key}.png
+需要兼容按群缓存文件名时，用 export() 把缓存图片硬链接（或复制）到群缓存目录。
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from nonebot.log import logger
+
+from .stats_store import atomic_link, atomic_write_bytes
+
+# 计算键时忽略的顶层字段（时间点数据的时间戳不影响渲染结果的等价性）
+IGNORED_KEYS = ("timestamp", "timestamps")
+
+_template_version_cache: dict[Path, tuple[tuple[tuple[str, int, int], ...], str]] = {}
+
+
+def template_version(template_dir: Path) -> str:
+    """模板目录的版本号：目录下所有文件相对路径与内容的哈希
+
+    文件的 (路径, 大小, mtime) 未变化时直接复用上次的结果，不重新读取内容。
+    """
+    template_dir = Path(template_dir)
+    files = sorted(p for p in template_dir.rglob("*") if p.is_file())
+    signature = tuple(
+        (str(p.relative_to(template_dir)), p.stat().st_size, p.stat().st_mtime_ns) for p in files
+    )
+    cached = _template_version_cache.get(template_dir)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(str(path.relative_to(template_dir)).encode("utf-8") + b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    version = digest.hexdigest()[:16]
+    _template_version_cache[template_dir] = (signature, version)
+    return version
+
+
+def render_key(render_input: Any, template_version: str, ignored_keys: tuple[str, ...] = IGNORED_KEYS) -> str:
+    """计算渲染输入的内容哈希（规范 JSON：键排序、紧凑分隔符）"""
+    if isinstance(render_input, dict):
+        render_input = {k: v for k, v in render_input.items() if k not in ignored_keys}
+    payload = json.dumps(
+        {"input": render_input, "template": template_version},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    size: int
+    used_at: float
+    suffix: str
+
+
+class RenderCache:
+    """内容寻址、按字节数上限 LRU 淘汰的图片缓存"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 200 * 1024 * 1024, suffix: str = ".png"):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._index: OrderedDict[str, _Entry] = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "RenderCache":
+        """根据 NoneBot 配置创建渲染缓存"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        max_mb = float(getattr(config, "mbtistats_render_cache_max_mb", 200))
+        return cls(data_dir / "cache" / "objects", max_bytes=int(max_mb * 1024 * 1024))
+
+    # --- 索引 ---
+
+    def load(self) -> None:
+        """扫描缓存目录建立内存索引（按最近使用时间排序），并按上限淘汰"""
+        begin = time.perf_counter()
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*/*.*"):
+                # 跳过写入中的临时文件
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size, path.suffix))
+        entries.sort()
+        self._index.clear()
+        self._total_bytes = 0
+        for used_at, key, size, suffix in entries:
+            self._index[key] = _Entry(size=size, used_at=used_at, suffix=suffix)
+            self._total_bytes += size
+        self._loaded = True
+        self._evict()
+        logger.info(
+            f"渲染缓存索引已加载: {len(self._index)} 个文件, "
+            f"{self._total_bytes / 1024 / 1024:.1f} MB, 耗时 {time.perf_counter() - begin:.3f}s"
+        )
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def path_for(self, key: str, suffix: str | None = None) -> Path:
+        """缓存文件路径；未指定后缀时使用索引中记录的后缀（不在索引中时为默认后缀）"""
+        if suffix is None:
+            entry = self._index.get(key)
+            suffix = entry.suffix if entry is not None else self.suffix
+        return self.cache_dir / key[:2] / f"{key}{suffix}"
+
+    def __contains__(self, key: str) -> bool:
+        self._ensure_loaded()
+        return key in self._index
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._index)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    # --- 读写 ---
+
+    def _touch(self, key: str) -> None:
+        entry = self._index[key]
+        entry.used_at = time.time()
+        self._index.move_to_end(key)
+        try:
+            os.utime(self.path_for(key), (entry.used_at, entry.used_at))
+        except FileNotFoundError:
+            pass
+
+    def get_path(self, key: str) -> Path | None:
+        """命中时返回缓存文件路径并更新最近使用时间，未命中返回 None"""
+        self._ensure_loaded()
+        if key not in self._index:
+            self.misses += 1
+            return None
+        path = self.path_for(key)
+        if not path.exists():
+            # 文件被外部删除（例如 /tmp 被清理），同步索引
+            self._drop(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key)
+        return path
+
+    def get(self, key: str) -> bytes | None:
+        path = self.get_path(key)
+        return path.read_bytes() if path is not None else None
+
+    def put(self, key: str, data: bytes, suffix: str | None = None) -> Path:
+        """写入缓存（原子替换），返回缓存文件路径；suffix 为文件后缀（默认 .png）"""
+        self._ensure_loaded()
+        suffix = suffix or self.suffix
+        path = self.path_for(key, suffix)
+        atomic_write_bytes(path, data)
+        if key in self._index:
+            old = self._index[key]
+            self._total_bytes -= old.size
+            if old.suffix != suffix:
+                self.path_for(key, old.suffix).unlink(missing_ok=True)
+        self._index[key] = _Entry(size=len(data), used_at=time.time(), suffix=suffix)
+        self._index.move_to_end(key)
+        self._total_bytes += len(data)
+        self._evict(keep=key)
+        return path
+
+    def export(self, key: str, dest: Path) -> Path:
+        """把缓存图片放到指定路径（优先硬链接，跨设备时复制；原子替换已有文件）"""
+        return atomic_link(self.path_for(key), dest)
+
+    # --- 淘汰 ---
+
+    def _drop(self, key: str) -> _Entry | None:
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+        return entry
+
+    def _evict(self, keep: str | None = None) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > (1 if keep else 0):
+            key = next(iter(self._index))
+            if key == keep:
+                self._index.move_to_end(key)
+                continue
+            entry = self._drop(key)
+            self.evictions += 1
+            self.path_for(key, entry.suffix).unlink(missing_ok=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        """缓存统计（用于日志与管理命令）"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# 进程内共享的渲染缓存（由 bot.py 在启动时设置）
+_render_cache: RenderCache | None = None
+
+
+def set_render_cache(cache: RenderCache | None) -> None:
+    global _render_cache
+    _render_cache = cache
+
+
+def get_render_cache() -> RenderCache | None:
+    """获取 bot.py 注册的共享渲染缓存；未注册时返回 None"""
+    return _render_cache
@@ -0,0 +1,478 @@
+"""
+进程外渲染服务（可选）
+
+Chromium 与 Bot 在同一个进程里时，截图与事件循环争抢 CPU 和内存，一个卡住的页面会拖慢所有
+Adapter 的消息处理。开启 mbtistats_render_workers 后，截图交给 N 个独立的渲染进程
+（scripts/render_worker.py，各自持有一个浏览器池），Bot 进程通过本地 Unix socket 提交任务：
+
+- 任务先进入有界队列（mbtistats_render_queue_size），每个渲染进程同时处理
+  mbtistats_render_worker_concurrency 个任务，多个进程分摊到多个 CPU 核
+- 单个任务超过 mbtistats_render_timeout（加上 TIMEOUT_GRACE 秒余量）视为渲染进程卡死，
+  结束并重启该进程（该进程上其他进行中的任务一并失败）
+- 每次任务完成后检查渲染进程（含 Chromium 子进程）的 RSS，超过 mbtistats_render_worker_max_rss_mb
+  时不再分配新任务，等进行中的任务完成后重启
+- 渲染进程意外退出时自动重启；取到任务时所在进程正在重启或已退出（任务尚未发出）时，
+  任务放回队列交给其他就绪的进程
+
+消息格式：4 字节长度 + JSON 头，4 字节长度 + 二进制内容（页面 HTML / 图片）。
+
+    service = get_render_service()
+    image = await service.screenshot("mbti-stats", html, image_format)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from nonebot.log import logger
+
+from .image_output import PNG, ImageFormat
+from .perf import perf
+
+project_root = Path(__file__).parent.parent.resolve()
+
+WORKER_SCRIPT = project_root / "scripts" / "render_worker.py"
+# 渲染进程内部的页面操作超时为 render_timeout，Bot 进程多等待这么多秒再判定为卡死
+TIMEOUT_GRACE = 5.0
+START_TIMEOUT = 60.0
+STOP_TIMEOUT = 5.0
+
+_LENGTH = struct.Struct(">I")
+
+
+async def write_message(writer: asyncio.StreamWriter, header: dict[str, Any], body: bytes = b"") -> None:
+    data = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    writer.write(_LENGTH.pack(len(data)) + data + _LENGTH.pack(len(body)) + body)
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[dict[str, Any], bytes]:
+    """读取一条消息；连接在消息边界关闭时抛出 asyncio.IncompleteReadError"""
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    header = json.loads(await reader.readexactly(size))
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return header, await reader.readexactly(size)
+
+
+def process_tree_rss(pid: int) -> int:
+    """进程及其全部子孙进程的 RSS 之和（字节，读取 /proc；不可用时返回 0）"""
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+    for name in entries:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{name}/statm", "rb") as f:
+                statm = f.read().split()
+        except OSError:
+            continue
+        # comm 字段可能包含空格，从最后一个 ')' 之后解析
+        fields = stat[stat.rindex(b")") + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(name))
+        rss[int(name)] = int(statm[1]) * page_size
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, ()))
+    return total
+
+
+class RenderError(RuntimeError):
+    """渲染进程返回的错误，或渲染进程卡死 / 退出"""
+
+
+class _WorkerUnavailable(RenderError):
+    """连接不上渲染进程（任务尚未发出，可以交给其他进程）"""
+
+
+@dataclass
+class _Job:
+    mode: str
+    html: str
+    image_format: ImageFormat
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+    requeues: int = 0
+
+
+class _Worker:
+    """一个渲染进程"""
+
+    def __init__(self, index: int, socket_path: Path, command: list[str]):
+        self.index = index
+        self.socket_path = socket_path
+        self.command = command
+        self.process: asyncio.subprocess.Process | None = None
+        self.ready = asyncio.Event()
+        self.inflight = 0
+        self.renders = 0
+        self.failures = 0
+        self.restarts = 0
+        self.rss = 0
+        self.restarting = False
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid if self.process is not None else None
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        self.socket_path.unlink(missing_ok=True)
+        begin = time.perf_counter()
+        # 独立进程组：结束时连同 Chromium 子进程一起结束
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, "--socket", str(self.socket_path), start_new_session=True
+        )
+        while True:
+            if self.process.returncode is not None:
+                raise RenderError(f"渲染进程 #{self.index} 启动失败，退出码 {self.process.returncode}")
+            if time.perf_counter() - begin > START_TIMEOUT:
+                await self.stop()
+                raise RenderError(f"渲染进程 #{self.index} 启动超时")
+            try:
+                _, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            except OSError:
+                await asyncio.sleep(0.1)
+                continue
+            writer.close()
+            break
+        self.ready.set()
+        logger.info(
+            f"渲染进程 #{self.index} 已启动 (pid {self.process.pid}), 耗时 {time.perf_counter() - begin:.2f}s"
+        )
+
+    async def stop(self) -> None:
+        self.ready.clear()
+        process, self.process = self.process, None
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def request(self, header: dict[str, Any], body: bytes = b"") -> tuple[dict[str, Any], bytes]:
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+        except OSError as e:
+            raise _WorkerUnavailable(f"渲染进程 #{self.index} 连接失败: {e}") from None
+        try:
+            await write_message(writer, header, body)
+            return await read_message(reader)
+        finally:
+            writer.close()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "pid": self.pid,
+            "alive": self.alive(),
+            "inflight": self.inflight,
+            "renders": self.renders,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "rss_mb": round(self.rss / 1024 / 1024, 1),
+        }
+
+
+class RenderService:
+    """把截图任务分发到多个渲染进程"""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        concurrency: int = 2,
+        render_timeout: float = 30,
+        max_rss_mb: float = 1024,
+        queue_size: int = 64,
+        socket_dir: Path | None = None,
+        worker_args: list[str] | None = None,
+    ):
+        """
+        workers: 渲染进程数
+        concurrency: 每个渲染进程同时处理的任务数（即其浏览器池大小）
+        render_timeout: 单个任务的超时（秒）
+        max_rss_mb: 渲染进程（含 Chromium）RSS 上限，超出时重启
+        queue_size: 排队任务数上限，超出时直接失败
+        socket_dir: Unix socket 所在目录（默认新建临时目录）
+        worker_args: 传给 scripts/render_worker.py 的其他参数
+        """
+        if workers <= 0:
+            raise ValueError("渲染进程数必须大于0")
+        self.concurrency = concurrency
+        self.render_timeout = render_timeout
+        self.max_rss = int(max_rss_mb * 1024 * 1024)
+        self._socket_dir = Path(socket_dir) if socket_dir is not None else None
+        # socket 目录是否由本服务创建（关闭时删除）
+        self._owns_socket_dir = False
+        self._worker_args = worker_args or []
+        self._queue: asyncio.Queue[_Job] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[_Worker] = []
+        self._worker_count = workers
+        self._tasks: list[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self.rejected = 0
+        self.timeouts = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "RenderService":
+        """根据 NoneBot 配置创建渲染服务（渲染进程的视口与页面回收沿用浏览器池配置）"""
+        concurrency = int(
+            getattr(config, "mbtistats_render_worker_concurrency", None)
+            or getattr(config, "mbtistats_browser_pool_size", 2)
+        )
+        render_timeout = float(getattr(config, "mbtistats_render_timeout", 30))
+        socket_dir = getattr(config, "mbtistats_render_socket_dir", None)
+        return cls(
+            workers=int(getattr(config, "mbtistats_render_workers", 2)),
+            concurrency=concurrency,
+            render_timeout=render_timeout,
+            max_rss_mb=float(getattr(config, "mbtistats_render_worker_max_rss_mb", 1024)),
+            queue_size=int(getattr(config, "mbtistats_render_queue_size", 64)),
+            socket_dir=Path(socket_dir) if socket_dir else None,
+            worker_args=[
+                "--pool-size", str(concurrency),
+                "--timeout", str(render_timeout),
+                "--max-renders", str(int(getattr(config, "mbtistats_browser_page_max_renders", 50))),
+                "--viewport-width", str(int(getattr(config, "mbtistats_viewport_width", 1050))),
+                "--viewport-height", str(int(getattr(config, "mbtistats_viewport_height", 2500))),
+            ],
+        )
+
+    # --- 生命周期 ---
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def start(self) -> None:
+        """启动全部渲染进程与分发任务（重复调用无副作用）"""
+        async with self._start_lock:
+            if self._started:
+                return
+            if self._socket_dir is None:
+                self._socket_dir = Path(tempfile.mkdtemp(prefix="mbtistats-render-"))
+                self._owns_socket_dir = True
+            self._socket_dir.mkdir(parents=True, exist_ok=True)
+            command = [sys.executable, str(WORKER_SCRIPT), "--parent-pid", str(os.getpid()), *self._worker_args]
+            self._workers = [
+                _Worker(i, self._socket_dir / f"worker-{i}.sock", command) for i in range(self._worker_count)
+            ]
+            results = await asyncio.gather(*(worker.start() for worker in self._workers), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                # 已启动的渲染进程一并结束，避免留下没有分发任务的进程
+                await asyncio.gather(*(worker.stop() for worker in self._workers), return_exceptions=True)
+                self._remove_socket_dir()
+                self._workers = []
+                raise errors[0]
+            for worker in self._workers:
+                for _ in range(self.concurrency):
+                    self._tasks.append(asyncio.create_task(self._consume(worker)))
+            self._started = True
+
+    async def close(self) -> None:
+        """停止分发，结束全部渲染进程；排队中的任务以 RenderError 失败"""
+        async with self._start_lock:
+            if not self._started:
+                return
+            self._started = False
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks.clear()
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.set_exception(RenderError("渲染服务已关闭"))
+            await asyncio.gather(*(worker.stop() for worker in self._workers))
+            self._remove_socket_dir()
+            logger.info("渲染服务已关闭")
+
+    def _remove_socket_dir(self) -> None:
+        """删除本服务创建的临时 socket 目录（配置指定的目录只删除其中的 socket）"""
+        if self._socket_dir is None:
+            return
+        if self._owns_socket_dir:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+            self._owns_socket_dir = False
+        else:
+            for worker in self._workers:
+                worker.socket_path.unlink(missing_ok=True)
+
+    # --- 提交任务 ---
+
+    async def screenshot(self, mode: str, html: str, image_format: ImageFormat = PNG) -> bytes:
+        """提交截图任务并等待结果；队列已满时抛出 RenderError"""
+        if not self._started:
+            await self.start()
+        job = _Job(mode, html, image_format, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise RenderError("渲染队列已满") from None
+        return await job.future
+
+    # --- 分发 ---
+
+    async def _consume(self, worker: _Worker) -> None:
+        while True:
+            await worker.ready.wait()
+            if not worker.alive():
+                # 渲染进程在空闲时退出
+                self._schedule_restart(worker, drain=False)
+                continue
+            job = await self._queue.get()
+            if job.future.done():
+                # 调用方已取消
+                continue
+            if not worker.ready.is_set() or not worker.alive():
+                # 等待任务期间该进程开始重启或已退出：任务交给其他就绪的进程
+                if not worker.alive():
+                    self._schedule_restart(worker, drain=False)
+                if self._requeue(job):
+                    continue
+                await worker.ready.wait()
+            perf.record("render.queue_wait", time.perf_counter() - job.queued_at)
+            worker.inflight += 1
+            try:
+                image = await self._run(worker, job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.set_exception(RenderError("渲染服务已关闭"))
+                raise
+            except _WorkerUnavailable as e:
+                if not self._requeue(job):
+                    worker.failures += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+            except Exception as e:
+                worker.failures += 1
+                if not job.future.done():
+                    job.future.set_exception(e if isinstance(e, RenderError) else RenderError(str(e)))
+            else:
+                worker.renders += 1
+                if not job.future.done():
+                    job.future.set_result(image)
+            finally:
+                worker.inflight -= 1
+            await self._check_worker(worker)
+
+    def _requeue(self, job: _Job) -> bool:
+        """把尚未发出的任务放回队列；放回次数超过渲染进程数或队列已满时返回 False"""
+        if job.requeues >= len(self._workers):
+            return False
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+        job.requeues += 1
+        return True
+
+    async def _run(self, worker: _Worker, job: _Job) -> bytes:
+        header = {"op": "render", "mode": job.mode, "format": str(job.image_format)}
+        try:
+            with perf.span("render.worker"):
+                reply, image = await asyncio.wait_for(
+                    worker.request(header, job.html.encode("utf-8")), self.render_timeout + TIMEOUT_GRACE
+                )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"渲染进程 #{worker.index} 超过 {self.render_timeout:.0f}s 未返回，正在重启")
+            self._schedule_restart(worker, drain=False)
+            raise RenderError("渲染超时") from None
+        except _WorkerUnavailable:
+            if not worker.alive():
+                self._schedule_restart(worker, drain=False)
+            raise
+        except (OSError, asyncio.IncompleteReadError) as e:
+            if not worker.alive():
+                self._schedule_restart(worker, drain=False)
+            raise RenderError(f"渲染进程 #{worker.index} 连接失败: {e}") from None
+        if not reply.get("ok"):
+            raise RenderError(reply.get("error") or "渲染失败")
+        return image
+
+    async def _check_worker(self, worker: _Worker) -> None:
+        if worker.restarting or not worker.alive():
+            return
+        worker.rss = await asyncio.to_thread(process_tree_rss, worker.pid)
+        if self.max_rss > 0 and worker.rss > self.max_rss:
+            logger.info(
+                f"渲染进程 #{worker.index} 内存 {worker.rss / 1024 / 1024:.0f} MB 超过上限，"
+                "等待进行中的任务完成后重启"
+            )
+            self._schedule_restart(worker, drain=True)
+
+    def _schedule_restart(self, worker: _Worker, drain: bool) -> None:
+        if worker.restarting:
+            return
+        worker.restarting = True
+        worker.ready.clear()
+        self._tasks.append(asyncio.create_task(self._restart(worker, drain)))
+
+    async def _restart(self, worker: _Worker, drain: bool) -> None:
+        try:
+            while drain and worker.inflight:
+                await asyncio.sleep(0.05)
+            await worker.stop()
+            while self._started:
+                try:
+                    await worker.start()
+                    break
+                except RenderError as e:
+                    logger.warning(f"{e}，1 秒后重试")
+                    await asyncio.sleep(1)
+            worker.restarts += 1
+            worker.rss = 0
+        finally:
+            worker.restarting = False
+            self._tasks = [task for task in self._tasks if not task.done()]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "workers": [worker.snapshot() for worker in self._workers],
+            "queue_depth": self._queue.qsize(),
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+_render_service: RenderService | None = None
+
+
+def set_render_service(service: RenderService | None) -> None:
+    global _render_service
+    _render_service = service
+
+
+def get_render_service() -> RenderService | None:
+    """获取 bot.py 注册的渲染服务；未开启 mbtistats_render_workers 时返回 None（在进程内使用浏览器池）"""
+    return _render_service
@@ -0,0 +1,158 @@
+"""
+渲染页面：插件模板 + Jinja2 + 浏览器截图
+
+插件源码在 submodule 中，这里按文件路径加载其中的 transform_render_data 模块与模板目录，
+不会触发插件 __init__.py 中的 NoneBot 初始化，因此离线脚本（基准、批量渲染）也能使用。
+
+    renderer = PageRenderer()
+    render_data = renderer.transform(history)
+    html = renderer.render_html("mbti-stats", render_data)
+    png = await renderer.screenshot(pool, "mbti-stats", html)
+
+截图时页面与静态资源都从内存提供（RenderAssets 路由拦截，见 render_assets.py），外部脚本进程内只下载一次；
+inline_assets=False 时回退为写临时文件并以 file:// 打开。模板只在第一次使用时解析，之后不再检查源文件
+（auto_reload=False；前端调试时传入 auto_reload=True）。
+
+镜像构建时可用 compile_templates() 把模板预编译为 Python 模块（scripts/prebake.py），
+PageRenderer 发现与当前模板版本一致的预编译结果时优先使用，省去运行时解析模板。
+"""
+
+import asyncio
+import importlib.util
+import sys
+import uuid
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+from jinja2 import ChoiceLoader, Environment, FileSystemLoader, ModuleLoader
+
+from .browser_pool import BrowserPool
+from .image_output import PNG, ImageFormat
+from .perf import perf
+from .render_assets import ASSET_ROUTE, RenderAssets
+from .render_cache import template_version
+
+project_root = Path(__file__).parent.parent.resolve()
+
+PLUGIN_PACKAGE = "nonebot_plugin_mbtistats"
+DEV_PLUGIN_DIR = project_root / "dev-plugins" / "mbtistats" / "src" / PLUGIN_PACKAGE
+TEMPLATE_DIR_NAME = "template"
+INDEX_FILE_NAME = "index.html"
+DEFAULT_MODE = "mbti-stats"
+# 预编译模板的默认位置与版本戳文件
+COMPILED_TEMPLATE_DIR = project_root / "build" / "jinja"
+COMPILED_VERSION_FILE = "TEMPLATE_VERSION"
+
+
+def plugin_dir() -> Path:
+    """插件包目录：优先使用 submodule 源码，否则查找已安装的插件包（不导入）"""
+    if DEV_PLUGIN_DIR.exists():
+        return DEV_PLUGIN_DIR
+    spec = importlib.util.find_spec(PLUGIN_PACKAGE)
+    if spec is None or not spec.submodule_search_locations:
+        raise FileNotFoundError(f"找不到插件 {PLUGIN_PACKAGE}，请先执行 git submodule update --init")
+    return Path(next(iter(spec.submodule_search_locations)))
+
+
+def template_dir() -> Path:
+    return plugin_dir() / TEMPLATE_DIR_NAME
+
+
+_transform_module: ModuleType | None = None
+
+
+def load_transform_module() -> ModuleType:
+    """直接按路径加载 transform_render_data 模块，避免触发插件初始化"""
+    global _transform_module
+    if _transform_module is None:
+        path = plugin_dir() / "transform_render_data.py"
+        if not path.exists():
+            raise FileNotFoundError(f"找不到 transform_render_data 模块: {path}")
+        spec = importlib.util.spec_from_file_location("transform_render_data", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["transform_render_data"] = module
+        spec.loader.exec_module(module)
+        _transform_module = module
+    return _transform_module
+
+
+def transform_to_render_data(history: list[dict[str, Any]]) -> dict[str, Any]:
+    """调用插件的 transform_to_render_data（history 为逐次观测的时间点数据）"""
+    return load_transform_module().transform_to_render_data(history_data=history)
+
+
+def compile_templates(base_dir: Path, target: Path) -> str:
+    """把模板目录下的 .html 模板预编译为 Python 模块，返回模板版本"""
+    target = Path(target)
+    env = Environment(loader=FileSystemLoader(base_dir))
+    env.compile_templates(target, zip=None, filter_func=lambda name: name.endswith(".html"))
+    version = template_version(base_dir)
+    (target / COMPILED_VERSION_FILE).write_text(version, encoding="utf-8")
+    return version
+
+
+def _compiled_loader(base_dir: Path, compiled_dir: Path) -> ModuleLoader | None:
+    """预编译结果存在且与当前模板版本一致时返回 ModuleLoader"""
+    stamp = compiled_dir / COMPILED_VERSION_FILE
+    if not stamp.exists() or stamp.read_text(encoding="utf-8").strip() != template_version(base_dir):
+        return None
+    return ModuleLoader(compiled_dir)
+
+
+class PageRenderer:
+    """复用同一个 Jinja2 Environment 渲染模板，并借用浏览器池截图"""
+
+    def __init__(
+        self,
+        base_dir: Path | None = None,
+        compiled_dir: Path | None = COMPILED_TEMPLATE_DIR,
+        inline_assets: bool = True,
+        auto_reload: bool = False,
+    ):
+        self.template_base_dir = Path(base_dir) if base_dir is not None else template_dir()
+        loader = FileSystemLoader(self.template_base_dir)
+        compiled = _compiled_loader(self.template_base_dir, Path(compiled_dir)) if compiled_dir else None
+        self.precompiled = compiled is not None
+        if compiled is not None:
+            # 预编译模块优先，缺失的模板回退到源文件
+            loader = ChoiceLoader([compiled, loader])
+        self.env = Environment(loader=loader, auto_reload=auto_reload)
+        self.assets = RenderAssets(self.template_base_dir) if inline_assets else None
+
+    def modes(self) -> list[str]:
+        """所有包含 index.html 的模板子目录"""
+        if not self.template_base_dir.exists():
+            return []
+        return sorted(
+            path.name
+            for path in self.template_base_dir.iterdir()
+            if path.is_dir() and (path / INDEX_FILE_NAME).exists()
+        )
+
+    def transform(self, history: list[dict[str, Any]]) -> dict[str, Any]:
+        with perf.span("render.transform"):
+            return transform_to_render_data(history)
+
+    def render_html(self, mode: str, render_data: dict[str, Any]) -> str:
+        with perf.span("render.jinja"):
+            template = self.env.get_template(f"{mode}/{INDEX_FILE_NAME}")
+            return template.render(**render_data)
+
+    async def screenshot(
+        self, pool: BrowserPool, mode: str, html: str, image_format: ImageFormat = PNG
+    ) -> bytes:
+        """截图：页面挂在 RenderAssets 的虚拟源下（未启用时写入模板目录下的临时文件，使相对路径的静态资源可用）"""
+        if self.assets is not None:
+            if not self.assets.loaded:
+                await asyncio.to_thread(self.assets.load)
+            pool.add_route(ASSET_ROUTE, self.assets.handle)
+            with self.assets.page(mode, html) as url:
+                return await pool.screenshot(url, image_format=image_format)
+
+        page_path = self.template_base_dir / mode / f".render-{uuid.uuid4().hex}.html"
+        page_path.write_text(html, encoding="utf-8")
+        try:
+            return await pool.screenshot(page_path.as_uri(), image_format=image_format)
+        finally:
+            page_path.unlink(missing_ok=True)
@@ -0,0 +1,94 @@
+"""
+只读数据种子
+
+SCF 实例的数据目录在 /tmp 上，每个冷启动的实例都从空目录开始：没有历史数据、没有缓存图片，
+第一次 /mbti 必须拉起 Chromium 渲染。镜像构建时用 build_seed() 把现有数据中每个群的时间序列
+与最新一张缓存图片打包进镜像（只读），实例启动时 overlay_seed() 把种子铺到 /tmp 中的数据目录：
+
+- 时间序列文件会被追加写入，因此复制一份（写时复制）
+- 图片只读，使用符号链接，不占用 /tmp 空间也不花复制时间
+- 数据目录中已存在的文件不覆盖（热实例中的数据比种子更新）
+"""
+
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+from nonebot.log import logger
+
+from .stats_store import LEGACY_FILE_NAME, LOG_FILE_NAME, StatsStore
+
+DISABLED_FILE_NAME = "auto_stats_disabled.txt"
+CACHE_PIC_PATTERN = re.compile(r"^mbti-stats-pic-(\d+)\.png$")
+# 只读使用的文件以符号链接方式铺设
+LINK_SUFFIXES = (".png",)
+
+
+def latest_cache_pic(cache_dir: Path) -> Path | None:
+    """群缓存目录中时间戳最大的 mbti-stats-pic-{timestamp}.png"""
+    if not cache_dir.exists():
+        return None
+    candidates = []
+    for path in cache_dir.iterdir():
+        match = CACHE_PIC_PATTERN.match(path.name)
+        if match:
+            candidates.append((int(match.group(1)), path))
+    return max(candidates)[1] if candidates else None
+
+
+def build_seed(data_root: Path, seed_dir: Path) -> int:
+    """从 data_root（data/mbtistats）打包种子到 seed_dir，返回包含的群数量"""
+    data_root, seed_dir = Path(data_root), Path(seed_dir)
+    store = StatsStore(data_root / "data" / "v1")
+    if seed_dir.exists():
+        shutil.rmtree(seed_dir)
+    seed_dir.mkdir(parents=True)
+
+    disabled = data_root / DISABLED_FILE_NAME
+    if disabled.exists():
+        shutil.copy2(disabled, seed_dir / DISABLED_FILE_NAME)
+
+    group_ids = store.group_ids()
+    for group_id in group_ids:
+        for name in (LEGACY_FILE_NAME, LOG_FILE_NAME):
+            src = store.group_dir(group_id) / name
+            if src.exists():
+                dest = seed_dir / "data" / "v1" / group_id / name
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dest)
+        pic = latest_cache_pic(data_root / "cache" / "v1" / group_id)
+        if pic is not None:
+            dest = seed_dir / "cache" / "v1" / group_id / pic.name
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(pic, dest)
+    return len(group_ids)
+
+
+def overlay_seed(seed_dir: Path, data_root: Path) -> tuple[int, int]:
+    """把种子铺到数据目录（已存在的文件跳过），返回 (复制的文件数, 链接的文件数)"""
+    seed_dir, data_root = Path(seed_dir), Path(data_root)
+    if not seed_dir.exists():
+        return 0, 0
+
+    begin = time.perf_counter()
+    copied = linked = 0
+    for src in seed_dir.rglob("*"):
+        if not src.is_file():
+            continue
+        dest = data_root / src.relative_to(seed_dir)
+        if dest.exists() or dest.is_symlink():
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if src.suffix in LINK_SUFFIXES:
+            os.symlink(src.resolve(), dest)
+            linked += 1
+        else:
+            shutil.copy2(src, dest)
+            copied += 1
+    logger.info(
+        f"数据种子已铺设: 复制 {copied} 个文件, 链接 {linked} 个文件, "
+        f"耗时 {time.perf_counter() - begin:.3f}s"
+    )
+    return copied, linked
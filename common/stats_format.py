@@ -0,0 +1,106 @@
+"""
+时间序列数据格式与迁移
+
+两种时间序列元素格式（详见 docs/data-specs.md）：
+
+- 时间点数据 (point)：每次观测一条，带 `timestamp` 字段
+- 游程记录 (record)：连续多次观测结果完全一致时合并为一条，带 `timestamps: number[]` 字段
+
+两条数据是否「一致」由 canonical_hash 判定：只看 type_data / trait_data 的内容，
+与 type_data 列表顺序、字典键顺序无关；另外群名不同的观测不会合并。
+"""
+
+import hashlib
+import json
+from typing import Any, Iterable
+
+StatsPoint = dict[str, Any]
+StatsRecord = dict[str, Any]
+
+# 16 人格顺序（type_data 的标准顺序，也是各模块向量 / 矩阵的维度顺序）
+MBTI_TYPES = (
+    "INTJ", "INTP", "ENTJ", "ENTP",
+    "INFJ", "INFP", "ENFJ", "ENFP",
+    "ISTJ", "ISFJ", "ESTJ", "ESFJ",
+    "ISTP", "ISFP", "ESTP", "ESFP",
+)
+# 名字里的 MBTI 含未知维度 (X) 时计入的类型
+AMBIGUOUS_TYPE = "模糊类型"
+
+
+def canonical_hash(item: StatsPoint | StatsRecord) -> str:
+    """计算统计内容的规范哈希（忽略时间戳、群名与 type_data 顺序）"""
+    type_data = {entry["name"]: entry["value"] for entry in item.get("type_data", [])}
+    payload = json.dumps(
+        {"type_data": type_data, "trait_data": item.get("trait_data", {})},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def is_record(item: dict[str, Any]) -> bool:
+    """是否为游程记录格式"""
+    return "timestamps" in item
+
+
+def is_continuation(item: dict[str, Any]) -> bool:
+    """是否为只含时间戳的续写行（JSON Lines 存储中表示「与上一条记录一致」）"""
+    return is_record(item) and "type_data" not in item and "trait_data" not in item
+
+
+def same_observation(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    """两条数据的统计内容与群名是否一致"""
+    return a.get("group_name") == b.get("group_name") and canonical_hash(a) == canonical_hash(b)
+
+
+def to_record(item: StatsPoint | StatsRecord) -> StatsRecord:
+    """把时间点数据转换为游程记录（已是记录时返回副本）"""
+    record = {k: v for k, v in item.items() if k != "timestamp"}
+    if is_record(item):
+        record["timestamps"] = list(item["timestamps"])
+    else:
+        record = {"timestamps": [item["timestamp"]], **record}
+    return record
+
+
+def latest_timestamp(item: StatsPoint | StatsRecord) -> int:
+    """数据中最新的时间戳"""
+    if is_record(item):
+        return item["timestamps"][-1]
+    return item["timestamp"]
+
+
+def collapse(items: Iterable[StatsPoint | StatsRecord]) -> list[StatsRecord]:
+    """把时间点数据 / 游程记录（可混合）合并为游程记录，相邻一致的观测合并到同一条记录"""
+    records: list[StatsRecord] = []
+    last_key = None
+    for item in items:
+        key = (item.get("group_name"), canonical_hash(item))
+        if records and key == last_key:
+            records[-1]["timestamps"].extend(to_record(item)["timestamps"])
+        else:
+            records.append(to_record(item))
+            last_key = key
+    return records
+
+
+def expand(items: Iterable[StatsPoint | StatsRecord]) -> list[StatsPoint]:
+    """把游程记录展开为逐次观测的时间点数据（旧格式，可直接交给 transform_to_render_data）"""
+    points = []
+    for item in items:
+        if not is_record(item):
+            points.append(item)
+            continue
+        payload = {k: v for k, v in item.items() if k != "timestamps"}
+        for timestamp in item["timestamps"]:
+            points.append({"timestamp": timestamp, **payload})
+    return points
+
+
+def migrate_history(items: list[StatsPoint | StatsRecord]) -> tuple[list[StatsRecord], int]:
+    """迁移一个时间序列到游程格式，返回 (记录列表, 被合并掉的观测条数)"""
+    records = collapse(items)
+    observations = sum(len(r["timestamps"]) for r in records)
+    return records, observations - len(records)
@@ -0,0 +1,323 @@
+"""
+跨群汇总：全部群 / 群分组的 MBTI 分布与趋势
+
+全局统计如果每次查询都读取所有群的时间序列，成本随群数量线性增长。这里在内存中维护每个群
+最新一次观测的人数向量（16 型 + 模糊类型 + 12 个特质格 + 总人数），以及各汇总范围的向量之和：
+
+- 启动时对每个群只读取最新一条记录（StatsStore.read_latest，从文件末尾反向读取）
+- 之后作为 StatsStore 的写入监听器增量更新：减去该群旧向量、加上新向量，O(1)
+- 插件直接写 stats-data.json，不经过 StatsStore；查询前 refresh() 按文件的 (mtime, 大小) 找出
+  有变化的群，只重新读取这些群的最新记录（没有变化时每个群只需两次 stat）
+- 汇总范围 (scope)：`global` 为全部群；`mbtistats_rollup_clusters` 配置的每个分组为 `cluster.{名称}`
+- 超过 max_age 没有新观测的群（例如 Bot 已退群）不计入汇总
+- 各范围的汇总结果本身也作为时间序列，用另一个 StatsStore 写入 {data_dir}/rollup/v1/{scope}/，
+  供趋势图使用；同一范围至多每 series_interval 秒写入一次，其余变化在下次写入或 flush() 时落盘
+
+汇总结果是标准的时间点数据（见 docs/data-specs.md），可以直接交给插件模板渲染。
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from nonebot.log import logger
+
+from .history_columns import TRAIT_AXES, TYPE_NAMES
+from .stats_format import StatsPoint, StatsRecord, expand, latest_timestamp
+from .stats_store import StatsStore
+
+GLOBAL_SCOPE = "global"
+CLUSTER_SCOPE_PREFIX = "cluster."
+GLOBAL_GROUP_NAME = "全部群"
+
+# 向量布局：[0, 17) 类型人数，[17, 29) 特质人数，[29] 总人数
+_TYPE_SLICE = slice(0, len(TYPE_NAMES))
+_TRAIT_OFFSET = len(TYPE_NAMES)
+_TOTAL_INDEX = _TRAIT_OFFSET + len(TRAIT_AXES) * 3
+_VECTOR_SIZE = _TOTAL_INDEX + 1
+
+
+def cluster_scope(name: str) -> str:
+    return f"{CLUSTER_SCOPE_PREFIX}{name}"
+
+
+def stats_vector(item: StatsPoint | StatsRecord) -> tuple[int, ...]:
+    """时间点数据 / 游程记录 -> 人数向量（缺失的条目计 0）"""
+    vector = [0] * _VECTOR_SIZE
+    types = {entry["name"]: entry["value"] for entry in item.get("type_data", [])}
+    for i, name in enumerate(TYPE_NAMES):
+        vector[i] = int(types.get(name, 0))
+    traits = item.get("trait_data", {})
+    for a, (axis, letters) in enumerate(TRAIT_AXES):
+        values = traits.get(axis, {})
+        for k, letter in enumerate(letters):
+            vector[_TRAIT_OFFSET + a * 3 + k] = int(values.get(letter, 0))
+    vector[_TOTAL_INDEX] = int(item.get("total_count", sum(vector[_TYPE_SLICE])))
+    return tuple(vector)
+
+
+def vector_point(vector: list[int] | tuple[int, ...], timestamp: int, group_name: str) -> StatsPoint:
+    """人数向量 -> 时间点数据（type_data 按人数降序，模糊类型在最后）"""
+    type_data = sorted(
+        ({"name": name, "value": vector[i]} for i, name in enumerate(TYPE_NAMES[:-1])),
+        key=lambda entry: entry["value"],
+        reverse=True,
+    )
+    type_data.append({"name": TYPE_NAMES[-1], "value": vector[len(TYPE_NAMES) - 1]})
+    trait_data = {
+        axis: {
+            letter: vector[_TRAIT_OFFSET + a * 3 + k]
+            for k, letter in enumerate(letters)
+        }
+        for a, (axis, letters) in enumerate(TRAIT_AXES)
+    }
+    return {
+        "timestamp": timestamp,
+        "group_name": group_name,
+        "total_count": vector[_TOTAL_INDEX],
+        "type_data": type_data,
+        "trait_data": trait_data,
+    }
+
+
+class StatsRollup:
+    """各群最新观测的增量汇总（线程安全：写入监听器可能在线程池中被调用）"""
+
+    def __init__(
+        self,
+        store: StatsStore,
+        series_store: StatsStore | None = None,
+        clusters: dict[str, list[str | int]] | None = None,
+        max_age: float = 30 * 24 * 3600,
+        series_interval: float = 600,
+    ):
+        """
+        store: 各群时间序列的存储（注册为其写入监听器）
+        series_store: 汇总时间序列的存储；None 表示不记录趋势
+        clusters: 分组名称 -> 群号列表
+        max_age: 超过该时长（秒）没有新观测的群不计入汇总，0 表示不限
+        series_interval: 同一范围写入汇总时间序列的最小间隔（秒）
+        """
+        self.store = store
+        self.series_store = series_store
+        self.max_age = max_age
+        self.series_interval = series_interval
+        self._group_scopes: dict[str, tuple[str, ...]] = {}
+        self._cluster_names: dict[str, str] = {}
+        for name, group_ids in (clusters or {}).items():
+            scope = cluster_scope(name)
+            self._cluster_names[scope] = name
+            for group_id in group_ids:
+                self._group_scopes[str(group_id)] = self._group_scopes.get(str(group_id), ()) + (scope,)
+
+        self._lock = threading.Lock()
+        # 群号 -> (最新观测时间 ms, 人数向量)
+        self._latest: dict[str, tuple[int, tuple[int, ...]]] = {}
+        # 群号 -> 上次读取时数据文件的 (mtime_ns, 大小)
+        self._signatures: dict[str, tuple[tuple[int, int] | None, ...]] = {}
+        self._totals: dict[str, list[int]] = {scope: [0] * _VECTOR_SIZE for scope in self.scopes()}
+        self._members: dict[str, set[str]] = {scope: set() for scope in self.scopes()}
+        # 汇总时间序列：范围 -> (上次写入时间 time.monotonic(), 上次写入的时间戳 ms)；有未写入变化的范围
+        self._series_written: dict[str, tuple[float, int]] = {}
+        self._dirty: set[str] = set()
+        self._flush_lock = threading.Lock()
+        self.loaded = False
+
+    @classmethod
+    def from_config(cls, config: Any, store: StatsStore) -> "StatsRollup":
+        """根据 NoneBot 配置创建汇总（mbtistats_rollup_clusters 形如 {"分组名": [群号, ...]}）"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        return cls(
+            store,
+            series_store=StatsStore(data_dir / "rollup" / "v1"),
+            clusters=getattr(config, "mbtistats_rollup_clusters", None) or {},
+            max_age=float(getattr(config, "mbtistats_rollup_max_age_days", 30)) * 24 * 3600,
+            series_interval=float(getattr(config, "mbtistats_rollup_series_interval", 600)),
+        )
+
+    def scopes(self) -> list[str]:
+        return [GLOBAL_SCOPE, *self._cluster_names]
+
+    def scope_name(self, scope: str) -> str:
+        """汇总范围的展示名（用作时间点数据的 group_name）"""
+        return self._cluster_names.get(scope, GLOBAL_GROUP_NAME)
+
+    def find_scope(self, name: str) -> str | None:
+        """按分组名称查找汇总范围；空名称为 global"""
+        if not name or name == GLOBAL_SCOPE:
+            return GLOBAL_SCOPE
+        scope = cluster_scope(name)
+        return scope if scope in self._cluster_names else None
+
+    def _scopes_of(self, group_id: str) -> tuple[str, ...]:
+        return (GLOBAL_SCOPE, *self._group_scopes.get(group_id, ()))
+
+    # --- 更新 ---
+
+    def _signature(self, group_id: str) -> tuple[tuple[int, int] | None, ...]:
+        signature = []
+        for path in (self.store.legacy_path(group_id), self.store.log_path(group_id)):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _reload_group(self, group_id: str, signature: tuple[tuple[int, int] | None, ...]) -> bool:
+        """重新读取一个群的最新记录，返回汇总是否变化"""
+        try:
+            latest = self.store.read_latest(group_id)
+        except Exception as e:
+            logger.warning(f"读取群 {group_id} 最新统计数据失败: {e}")
+            return False
+        self._signatures[group_id] = signature
+        return self._apply(group_id, latest)
+
+    def load(self) -> int:
+        """读取每个群的最新记录建立汇总（启动时调用一次），返回群数量"""
+        begin = time.perf_counter()
+        group_ids = self.store.group_ids()
+        for group_id in group_ids:
+            self._reload_group(group_id, self._signature(group_id))
+        if self.series_store is not None:
+            for scope in self.scopes():
+                latest = self.series_store.read_latest(scope)
+                if latest is not None:
+                    self._series_written[scope] = (float("-inf"), latest_timestamp(latest))
+        self.loaded = True
+        logger.info(f"跨群汇总已建立: {len(group_ids)} 个群, 耗时 {time.perf_counter() - begin:.3f}s")
+        return len(group_ids)
+
+    def refresh(self) -> int:
+        """重新读取数据文件有变化（包括不经过 StatsStore 写入）的群，返回重新读取的群数量"""
+        group_ids = set(self.store.group_ids())
+        changed = 0
+        for group_id in group_ids:
+            signature = self._signature(group_id)
+            if self._signatures.get(group_id) != signature:
+                changed += 1
+                self._reload_group(group_id, signature)
+        for group_id in set(self._signatures) - group_ids:
+            # 数据目录已被删除
+            self._signatures.pop(group_id, None)
+            self._apply(group_id, None)
+            changed += 1
+        if changed and self.series_store is not None:
+            self.flush(force=False)
+        return changed
+
+    def on_write(self, group_id: str, latest: StatsRecord | None) -> None:
+        """StatsStore 写入监听器"""
+        changed = self._apply(group_id, latest)
+        if changed and self.series_store is not None:
+            self.flush(force=False)
+
+    def _apply(self, group_id: str, latest: StatsRecord | None) -> bool:
+        """用群最新记录替换其贡献，返回汇总是否变化"""
+        new = (latest_timestamp(latest), stats_vector(latest)) if latest else None
+        with self._lock:
+            old = self._latest.pop(group_id, None)
+            if new is not None:
+                self._latest[group_id] = new
+            if old is not None and new is not None and old[1] == new[1]:
+                return False
+            for scope in self._scopes_of(group_id):
+                totals = self._totals[scope]
+                if old is not None:
+                    for i, v in enumerate(old[1]):
+                        totals[i] -= v
+                    self._members[scope].discard(group_id)
+                if new is not None:
+                    for i, v in enumerate(new[1]):
+                        totals[i] += v
+                    self._members[scope].add(group_id)
+                self._dirty.add(scope)
+            return True
+
+    def expire(self, now_ms: int | None = None) -> int:
+        """移除超过 max_age 没有新观测的群，返回移除数量"""
+        if self.max_age <= 0:
+            return 0
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        cutoff = now_ms - int(self.max_age * 1000)
+        with self._lock:
+            stale = [group_id for group_id, (ts, _) in self._latest.items() if ts < cutoff]
+        for group_id in stale:
+            self._apply(group_id, None)
+        return len(stale)
+
+    # --- 查询 ---
+
+    def point(self, scope: str = GLOBAL_SCOPE) -> StatsPoint | None:
+        """汇总范围当前的时间点数据；范围内没有群时返回 None"""
+        self.expire()
+        with self._lock:
+            members = self._members.get(scope)
+            if not members:
+                return None
+            timestamp = max(self._latest[group_id][0] for group_id in members)
+            return vector_point(self._totals[scope], timestamp, self.scope_name(scope))
+
+    def group_count(self, scope: str = GLOBAL_SCOPE) -> int:
+        with self._lock:
+            return len(self._members.get(scope, ()))
+
+    def history(self, scope: str = GLOBAL_SCOPE) -> list[StatsPoint]:
+        """汇总范围的时间序列（逐次观测的时间点数据，末尾为当前汇总）"""
+        self.flush()
+        points = expand(self.series_store.read_records(scope)) if self.series_store is not None else []
+        current = self.point(scope)
+        if current is not None and (not points or points[-1]["timestamp"] < current["timestamp"]):
+            points.append(current)
+        return points
+
+    def flush(self, force: bool = True) -> None:
+        """把有变化的范围写入汇总时间序列；force=False 时遵守 series_interval"""
+        if self.series_store is None:
+            return
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    scope for scope in self._dirty
+                    if force or now - self._series_written.get(scope, (float("-inf"), 0))[0] >= self.series_interval
+                ]
+                self._dirty.difference_update(due)
+            for scope in due:
+                point = self.point(scope)
+                if point is None:
+                    continue
+                # 群被移除时最新观测时间可能回退，保持汇总时间序列单调
+                point["timestamp"] = max(point["timestamp"], self._series_written.get(scope, (0, 0))[1])
+                try:
+                    self.series_store.append(scope, point)
+                except OSError as e:
+                    logger.warning(f"写入汇总时间序列失败 ({scope}): {e}")
+                    with self._lock:
+                        self._dirty.add(scope)
+                    continue
+                self._series_written[scope] = (now, point["timestamp"])
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "groups": len(self._latest),
+                "scopes": {scope: len(members) for scope, members in self._members.items()},
+                "dirty": sorted(self._dirty),
+            }
+
+
+_stats_rollup: StatsRollup | None = None
+
+
+def set_stats_rollup(rollup: StatsRollup | None) -> None:
+    global _stats_rollup
+    _stats_rollup = rollup
+
+
+def get_stats_rollup() -> StatsRollup | None:
+    """获取 bot.py 注册的跨群汇总；未注册时返回 None"""
+    return _stats_rollup
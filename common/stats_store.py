@@ -0,0 +1,420 @@
+"""
+MBTI 统计时间序列存储
+
+旧格式：每个群一个 `stats-data.json`，内容是整个时间序列的 JSON 数组，
+每追加一个时间点都要解析并重写整个文件，I/O 与历史长度成正比，且写到一半崩溃会损坏文件。
+
+新格式：`stats-data.jsonl`（JSON Lines），只追加不重写，按游程记录 (`timestamps: number[]`) 存储：
+- 追加：单次 O_APPEND 写入一整行并 fsync，崩溃最多留下一行残缺的尾行，读取时跳过
+- 写入去重：新观测与最新记录一致（见 stats_format.canonical_hash）时，只追加一行
+  `{"timestamps":[ts]}` 续写行，历史体积只随数据变化增长，而不随观测次数增长
+- 读取最近窗口：从文件末尾反向按块读取，不解析全部历史
+- 压缩 (compaction)：续写行合并进所属记录、丢弃残缺行，写临时文件后原子替换（不触及旧格式文件）
+
+读取接口统一返回游程记录；需要逐次观测的时间点数据时使用 stats_format.expand()。
+
+旧格式文件保持可读且从不被追加、重写或删除（插件仍在读写它）：一个群同时存在两种文件时，
+旧文件中的数据在前，新文件中只取时间戳晚于旧文件最后一次观测的部分（转换时复制进新文件的数据
+不会重复出现）。只有显式调用 compact(group_id, drop_legacy=True) 时才把旧文件并入新文件并删除。
+
+目录结构：
+    {data_dir}/{group_id}/stats-data.json     # 旧格式（只读）
+    {data_dir}/{group_id}/stats-data.jsonl    # 新格式
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from nonebot.log import logger
+
+from .perf import perf
+from .stats_format import (
+    StatsPoint,
+    StatsRecord,
+    canonical_hash,
+    collapse,
+    is_continuation,
+    same_observation,
+    to_record,
+)
+
+LEGACY_FILE_NAME = "stats-data.json"
+LOG_FILE_NAME = "stats-data.jsonl"
+
+# 写入监听器：(群号, 该群最新的游程记录；时间序列被清空时为 None)
+WriteListener = Callable[[str, StatsRecord | None], None]
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """写入临时文件并 fsync 后原子替换目标文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_link(src: Path, dest: Path) -> Path:
+    """把 src 硬链接（跨设备时复制）到临时文件后原子替换 dest"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.parent / f".{dest.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+def encode_line(item: dict[str, Any]) -> bytes:
+    """把一条记录编码为一行 JSON（不含换行之外的空白）"""
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _iter_lines_reversed(path: Path, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """从文件末尾开始按块反向逐行读取（跳过空行）"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+def _parse_line(line: bytes, path: Path) -> dict[str, Any] | None:
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.warning(f"跳过残缺的数据行: {path}")
+        return None
+    if not isinstance(item, dict):
+        logger.warning(f"跳过格式错误的数据行: {path}")
+        return None
+    return item
+
+
+class StatsStore:
+    """按群存储 MBTI 统计时间序列（JSON Lines，只追加）"""
+
+    def __init__(self, data_dir: Path, compact_every: int = 0):
+        """
+        data_dir: 数据根目录，例如 data/mbtistats/data/v1
+        compact_every: 每追加多少次自动压缩一次（合并续写行），0 表示不自动压缩
+        """
+        self.data_dir = Path(data_dir)
+        self.compact_every = compact_every
+        self._appends_since_compact: dict[str, int] = {}
+        # 每个群最新记录的 (群名, 内容哈希)，用于写入去重
+        self._latest_keys: dict[str, tuple[Any, str] | None] = {}
+        self._listeners: list[WriteListener] = []
+        # 旧格式文件的解析结果：群号 -> ((mtime_ns, size), 游程记录)
+        self._legacy_cache: dict[str, tuple[tuple[int, int], list[StatsRecord]]] = {}
+
+    @classmethod
+    def from_config(cls, config: Any) -> "StatsStore":
+        """根据 NoneBot 配置创建存储"""
+        data_dir = Path(getattr(config, "mbtistats_data_dir", None) or "data/mbtistats")
+        return cls(data_dir / "data" / "v1", compact_every=int(getattr(config, "mbtistats_compact_every", 0)))
+
+    # --- 写入监听 ---
+
+    def add_listener(self, listener: WriteListener) -> None:
+        """注册写入监听器：每次 append / write_records 成功后以该群最新记录调用"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: WriteListener) -> None:
+        self._listeners.remove(listener)
+
+    def _notify(self, group_id: str | int, latest: StatsRecord | None) -> None:
+        for listener in self._listeners:
+            try:
+                listener(str(group_id), latest)
+            except Exception as e:
+                # 监听器出错不影响写入本身
+                logger.warning(f"统计数据写入监听器出错 ({group_id}): {e}")
+
+    # --- 路径 ---
+
+    def group_dir(self, group_id: str | int) -> Path:
+        return self.data_dir / str(group_id)
+
+    def legacy_path(self, group_id: str | int) -> Path:
+        return self.group_dir(group_id) / LEGACY_FILE_NAME
+
+    def log_path(self, group_id: str | int) -> Path:
+        return self.group_dir(group_id) / LOG_FILE_NAME
+
+    def group_ids(self) -> list[str]:
+        """所有存在统计数据的群号"""
+        if not self.data_dir.exists():
+            return []
+        return sorted(
+            path.name
+            for path in self.data_dir.iterdir()
+            if path.is_dir()
+            and ((path / LOG_FILE_NAME).exists() or (path / LEGACY_FILE_NAME).exists())
+        )
+
+    # --- 读取 ---
+
+    def _read_legacy(self, group_id: str | int) -> list[StatsRecord]:
+        """解析旧格式文件（文件未变化时复用上次的结果，返回副本）"""
+        key = str(group_id)
+        path = self.legacy_path(group_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._legacy_cache.pop(key, None)
+            return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._legacy_cache.get(key)
+        if cached is None or cached[0] != signature:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, list):
+                raise ValueError(f"数据格式错误: 期望列表，实际为 {type(data)} ({path})")
+            cached = (signature, collapse(data))
+            self._legacy_cache[key] = cached
+        return [dict(r, timestamps=list(r["timestamps"])) for r in cached[1]]
+
+    def _legacy_last(self, legacy: list[StatsRecord]) -> int | None:
+        return legacy[-1]["timestamps"][-1] if legacy else None
+
+    @staticmethod
+    def _trim_after(record: StatsRecord, since: int | None) -> StatsRecord | None:
+        """只保留时间戳晚于 since 的观测；没有剩余观测时返回 None"""
+        if since is None:
+            return record
+        timestamps = [t for t in record["timestamps"] if t > since]
+        if not timestamps:
+            return None
+        record["timestamps"] = timestamps
+        return record
+
+    def _read_log(self, group_id: str | int) -> list[StatsRecord]:
+        path = self.log_path(group_id)
+        if not path.exists():
+            return []
+        items = []
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = _parse_line(line, path)
+                if item is None:
+                    continue
+                if is_continuation(item):
+                    if not items:
+                        logger.warning(f"跳过缺少所属记录的续写行: {path}")
+                        continue
+                    items[-1] = to_record(items[-1])
+                    items[-1]["timestamps"].extend(item["timestamps"])
+                    continue
+                items.append(item)
+        return collapse(items)
+
+    def read_records(self, group_id: str | int) -> list[StatsRecord]:
+        """读取完整时间序列的游程记录（旧格式数据在前）"""
+        with perf.span("storage.read"):
+            legacy = self._read_legacy(group_id)
+            since = self._legacy_last(legacy)
+            newer = [r for r in (self._trim_after(r, since) for r in self._read_log(group_id)) if r is not None]
+            return collapse(legacy + newer)
+
+    def _iter_log_reversed(self, group_id: str | int) -> Iterator[StatsRecord]:
+        """反向读取新格式文件，把续写行归入其所属记录后产出"""
+        path = self.log_path(group_id)
+        if not path.exists():
+            return
+        pending: list[int] = []
+        for line in _iter_lines_reversed(path):
+            item = _parse_line(line, path)
+            if item is None:
+                continue
+            if is_continuation(item):
+                pending[:0] = item["timestamps"]
+                continue
+            record = to_record(item)
+            record["timestamps"].extend(pending)
+            pending = []
+            yield record
+        if pending:
+            logger.warning(f"跳过缺少所属记录的续写行: {path}")
+
+    def _iter_reversed(self, group_id: str | int) -> Iterator[StatsRecord]:
+        """从最新到最旧逐条产出游程记录
+
+        旧格式文件总是先被读取（需要其最后一次观测的时间戳来截断 .jsonl），但只在第一次
+        及文件 (mtime, 大小) 变化后才解析，之后使用缓存。
+
+        相邻的一致记录会被合并，与 read_records() 的结果保持一致。
+        """
+        def source() -> Iterator[StatsRecord]:
+            legacy = self._read_legacy(group_id)
+            since = self._legacy_last(legacy)
+            for record in self._iter_log_reversed(group_id):
+                record = self._trim_after(record, since)
+                if record is None:
+                    # 新文件按时间追加，更早的记录都已包含在旧文件中
+                    break
+                yield record
+            yield from reversed(legacy)
+
+        newer: StatsRecord | None = None
+        for record in source():
+            if newer is not None and same_observation(record, newer):
+                newer["timestamps"][:0] = record["timestamps"]
+                continue
+            if newer is not None:
+                yield newer
+            newer = record
+        if newer is not None:
+            yield newer
+
+    def read_tail(self, group_id: str | int, count: int) -> list[StatsRecord]:
+        """读取最近 count 条游程记录（按时间正序返回）"""
+        records = []
+        if count > 0:
+            for record in self._iter_reversed(group_id):
+                records.append(record)
+                if len(records) >= count:
+                    break
+        records.reverse()
+        return records
+
+    def read_latest(self, group_id: str | int) -> StatsRecord | None:
+        """读取最新的一条游程记录"""
+        tail = self.read_tail(group_id, 1)
+        return tail[0] if tail else None
+
+    def read_since(self, group_id: str | int, since: int) -> list[StatsRecord]:
+        """读取包含 timestamp >= since (ms) 观测的记录，记录内更早的时间戳会被裁掉（按时间正序返回）"""
+        records = []
+        for record in self._iter_reversed(group_id):
+            timestamps = [t for t in record["timestamps"] if t >= since]
+            if not timestamps:
+                break
+            record["timestamps"] = timestamps
+            records.append(record)
+        records.reverse()
+        return records
+
+    # --- 写入 ---
+
+    def _latest_key(self, group_id: str | int) -> tuple[Any, str] | None:
+        """新格式文件中最新记录的 (群名, 内容哈希)；续写行只能续在新格式文件自己的记录之后"""
+        key = str(group_id)
+        if key not in self._latest_keys:
+            latest = next(self._iter_log_reversed(group_id), None)
+            self._latest_keys[key] = (
+                (latest.get("group_name"), canonical_hash(latest)) if latest else None
+            )
+        return self._latest_keys[key]
+
+    def append(self, group_id: str | int, item: StatsPoint | StatsRecord) -> bool:
+        """追加一次观测（时间点数据或游程记录），返回是否产生了新记录
+
+        与新格式文件中的最新记录一致时只写入续写行，返回 False。旧格式文件不受影响。
+        """
+        record = to_record(item)
+        item_key = (record.get("group_name"), canonical_hash(record))
+        changed = self._latest_key(group_id) != item_key
+        line_item = record if changed else {"timestamps": record["timestamps"]}
+
+        path = self.log_path(group_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        line = encode_line(line_item)
+
+        with perf.span("storage.append"):
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # 上次写入若在行中途崩溃，先补一个换行，把残缺行隔离成单独一行
+                size = os.fstat(fd).st_size
+                if size > 0:
+                    with open(path, "rb") as f:
+                        f.seek(size - 1)
+                        if f.read(1) != b"\n":
+                            line = b"\n" + line
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        key = str(group_id)
+        self._latest_keys[key] = item_key
+        self._appends_since_compact[key] = self._appends_since_compact.get(key, 0) + 1
+        if self.compact_every > 0 and self._appends_since_compact[key] >= self.compact_every:
+            self.compact(group_id)
+        self._notify(group_id, record)
+        return changed
+
+    def write_records(self, group_id: str | int, records: list[StatsRecord]) -> None:
+        """用给定的时间序列原子替换该群的新格式文件
+
+        旧格式文件保持不变，读取时其中的数据仍然在前（见模块说明）。
+        """
+        records = collapse(records)
+        atomic_write_bytes(self.log_path(group_id), b"".join(encode_line(r) for r in records))
+        key = str(group_id)
+        self._latest_keys[key] = (
+            (records[-1].get("group_name"), canonical_hash(records[-1])) if records else None
+        )
+        self._notify(group_id, records[-1] if records else None)
+
+    def compact(self, group_id: str | int, drop_legacy: bool = False) -> int:
+        """合并续写行、丢弃残缺行并原子重写新格式文件，返回压缩后的记录数量
+
+        drop_legacy=True 时同时把旧格式数据并入新文件并删除旧文件——仅在确认插件不再读写
+        stats-data.json 后显式调用。
+        """
+        if drop_legacy:
+            records = self.read_records(group_id)
+            self.write_records(group_id, records)
+            self.legacy_path(group_id).unlink(missing_ok=True)
+            self._legacy_cache.pop(str(group_id), None)
+        else:
+            records = self._read_log(group_id)
+            self.write_records(group_id, records)
+        self._appends_since_compact[str(group_id)] = 0
+        return len(records)
+
+
+_stats_store: StatsStore | None = None
+
+
+def set_stats_store(store: StatsStore | None) -> None:
+    global _stats_store
+    _stats_store = store
+
+
+def get_stats_store() -> StatsStore | None:
+    """获取 bot.py 注册的共享存储；未注册时返回 None"""
+    return _stats_store
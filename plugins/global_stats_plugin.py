@@ -0,0 +1,101 @@
+from nonebot import get_driver, on_command, require
+from nonebot.adapters import Bot, Message
+from nonebot.params import CommandArg
+from nonebot.plugin import PluginMetadata
+from typing import Any
+import asyncio
+
+require("nonebot_plugin_saa")
+from nonebot_plugin_saa import Image, MessageFactory  # noqa: E402
+
+from common.async_storage import get_async_storage, run_io  # noqa: E402
+from common.browser_pool import get_browser_pool  # noqa: E402
+from common.downsample import attach_history_windows  # noqa: E402
+from common.image_output import ImageFormat, format_for_adapter  # noqa: E402
+from common.member_cache import SingleFlight  # noqa: E402
+from common.render_cache import render_key, template_version  # noqa: E402
+from common.render_service import get_render_service  # noqa: E402
+from common.renderer import DEFAULT_MODE, PageRenderer  # noqa: E402
+from common.stats_rollup import GLOBAL_SCOPE, get_stats_rollup  # noqa: E402
+
+__plugin_meta__ = PluginMetadata(
+    name="global_stats",
+    description="全部群 / 群分组的 MBTI 分布与趋势",
+    usage="/mbti global [分组名]",
+    type="application",
+)
+
+global_cmd = on_command("mbti global", aliases={"mbti全局"}, priority=1, block=True)
+
+_renderer: PageRenderer | None = None
+# 同一汇总范围的并发请求合并为一次渲染
+_flight = SingleFlight()
+
+
+def get_renderer() -> PageRenderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = PageRenderer()
+    return _renderer
+
+
+def build_render_data(history: list[dict[str, Any]]) -> dict[str, Any]:
+    """汇总时间序列 → 插件数据转换 → 附加降采样的历史窗口（在线程中执行）"""
+    render_data = get_renderer().transform(history)
+    attach_history_windows(render_data, history, now=history[-1]["timestamp"])
+    return render_data
+
+
+async def render_scope(history: list[dict[str, Any]], image_format: ImageFormat) -> bytes:
+    """按现有模板渲染汇总数据；渲染输入不变时直接使用渲染缓存"""
+    renderer = get_renderer()
+    render_data = await asyncio.to_thread(build_render_data, history)
+    storage = get_async_storage()
+    version = await run_io(template_version, renderer.template_base_dir)
+    key = render_key({"mode": DEFAULT_MODE, "format": str(image_format), "render_data": render_data}, version)
+    if storage is not None and (cached := await storage.cache_get(key)) is not None:
+        return cached
+
+    html = renderer.render_html(DEFAULT_MODE, render_data)
+    service = get_render_service()
+    if service is not None:
+        # 开启了进程外渲染：截图交给渲染进程
+        image = await service.screenshot(DEFAULT_MODE, html, image_format)
+    else:
+        pool = get_browser_pool()
+        if pool is None:
+            raise RuntimeError("浏览器池未初始化")
+        image = await renderer.screenshot(pool, DEFAULT_MODE, html, image_format)
+    if storage is not None:
+        await storage.cache_put(key, image, image_format.suffix)
+    return image
+
+
+@global_cmd.handle()
+async def handle_global(bot: Bot, message: Message = CommandArg()):
+    rollup = get_stats_rollup()
+    if rollup is None or not rollup.loaded:
+        await global_cmd.finish("跨群汇总尚未就绪，请稍后再试")
+
+    name = message.extract_plain_text().strip()
+    scope = rollup.find_scope(name)
+    if scope is None:
+        names = [rollup.scope_name(s) for s in rollup.scopes() if s != GLOBAL_SCOPE]
+        await global_cmd.finish(f"没有名为 {name} 的分组，可用分组: {'、'.join(names) or '无'}")
+
+    # 插件直接写各群的数据文件，查询前按文件修改时间补上有变化的群
+    await run_io(rollup.refresh)
+    history = await run_io(rollup.history, scope)
+    if not history:
+        await global_cmd.finish("还没有任何群的统计数据")
+
+    # 按 Adapter 选择输出格式（不同格式分别合并与缓存）
+    image_format = format_for_adapter(get_driver().config, bot.adapter.get_name())
+    try:
+        image = await _flight.run((scope, image_format), lambda: render_scope(history, image_format))
+    except Exception as e:
+        print(f"渲染跨群汇总失败: {e}")
+        await global_cmd.finish("渲染失败，请稍后再试")
+
+    await MessageFactory(Image(image)).send()
+    await global_cmd.finish(f"{rollup.scope_name(scope)}：{rollup.group_count(scope)} 个群")
@@ -0,0 +1,75 @@
+import time
+
+from nonebot import on_notice
+from nonebot.adapters import Bot, Event
+from nonebot.exception import MockApiException
+from nonebot.plugin import PluginMetadata
+from typing import Any
+
+from common.member_cache import get_member_cache
+
+__plugin_meta__ = PluginMetadata(
+    name="member_cache",
+    description="群成员列表缓存：TTL 内复用 get_group_member_list 结果，并合并同一个群的并发请求",
+    usage="无指令，配置项 mbtistats_member_cache_ttl",
+    type="application",
+)
+
+MEMBER_LIST_API = "get_group_member_list"
+# 成员变动 / 群名片变动时使缓存失效
+INVALIDATING_NOTICES = ("group_increase", "group_decrease", "group_card")
+
+# 本次调用是该群拉取的 leader：id(data) -> (群号, 开始时间)
+# 调用被取消时 on_called_api 不会触发：缓存侧的 claim 会超时，这里的条目在超时后清理
+_leaders: dict[int, tuple[str, float]] = {}
+
+
+def _prune_leaders(now: float, timeout: float) -> None:
+    for key, (_, begin) in list(_leaders.items()):
+        if now - begin > timeout:
+            del _leaders[key]
+
+
+@Bot.on_calling_api
+async def _serve_member_list(bot: Bot, api: str, data: dict[str, Any]):
+    cache = get_member_cache()
+    if cache is None or api != MEMBER_LIST_API or "group_id" not in data:
+        return
+    group_id = str(data["group_id"])
+
+    members = cache.lookup(group_id)
+    if members is None and not cache.claim(group_id):
+        # 已有同一个群的请求在进行，等待它的结果；它失败时自己重新请求
+        members = await cache.join(group_id)
+        if members is None and not cache.claim(group_id):
+            return
+    if members is not None:
+        # 跳过实际调用，直接以缓存结果作为返回值
+        raise MockApiException(result=members)
+    now = time.monotonic()
+    _prune_leaders(now, cache.claim_timeout if cache.claim_timeout > 0 else 600)
+    _leaders[id(data)] = (group_id, now)
+
+
+@Bot.on_called_api
+async def _store_member_list(bot: Bot, exception: Exception | None, api: str, data: dict[str, Any], result: Any):
+    leader = _leaders.pop(id(data), None)
+    cache = get_member_cache()
+    if leader is None or cache is None:
+        return
+    group_id, _ = leader
+    cache.resolve(group_id, result if exception is None and isinstance(result, list) else None)
+
+
+async def _is_member_change(event: Event) -> bool:
+    return getattr(event, "notice_type", None) in INVALIDATING_NOTICES and hasattr(event, "group_id")
+
+
+member_change = on_notice(rule=_is_member_change, priority=1, block=False)
+
+
+@member_change.handle()
+async def handle_member_change(event: Event):
+    cache = get_member_cache()
+    if cache is not None:
+        cache.invalidate(getattr(event, "group_id"))
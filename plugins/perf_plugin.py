@@ -0,0 +1,143 @@
+import hmac
+import json
+import time
+from typing import Any
+
+import nonebot
+from nonebot import on_command
+from nonebot.adapters import Bot, Message
+from nonebot.matcher import Matcher
+from nonebot.message import run_postprocessor, run_preprocessor
+from nonebot.params import CommandArg
+from nonebot.permission import SUPERUSER
+from nonebot.plugin import PluginMetadata
+
+from common.browser_pool import get_browser_pool
+from common.image_output import output_stats
+from common.member_cache import get_member_cache
+from common.perf import perf
+from common.pic_cache import get_pic_cache
+from common.render_cache import get_render_cache
+from common.render_service import get_render_service
+
+__plugin_meta__ = PluginMetadata(
+    name="perf",
+    description="热路径耗时统计（p50/p95/p99），仅超级用户可用",
+    usage="/mbtiperf [前缀]\n/mbtiperf reset",
+    type="application",
+)
+
+perf_cmd = on_command("mbtiperf", permission=SUPERUSER, priority=1, block=True)
+
+# 正在进行中的 API 调用：id(data) -> 开始时间
+# 调用被取消时 on_called_api 不会触发，条目超过上限时清掉超时未完成的
+_api_calls: dict[int, float] = {}
+_API_CALLS_MAX = 1024
+_API_CALL_STALE = 300.0
+_STATE_KEY = "_perf_begin"
+
+
+def _prune_api_calls(now: float) -> None:
+    for key, begin in list(_api_calls.items()):
+        if now - begin > _API_CALL_STALE:
+            del _api_calls[key]
+    # 仍然超出上限时按开始时间丢弃最早的（dict 保持插入顺序）
+    for key in list(_api_calls)[: max(0, len(_api_calls) - _API_CALLS_MAX)]:
+        del _api_calls[key]
+
+
+@Bot.on_calling_api
+async def _on_calling_api(bot: Bot, api: str, data: dict[str, Any]):
+    now = time.perf_counter()
+    if len(_api_calls) >= _API_CALLS_MAX:
+        _prune_api_calls(now)
+    _api_calls[id(data)] = now
+
+
+@Bot.on_called_api
+async def _on_called_api(bot: Bot, exception: Exception | None, api: str, data: dict[str, Any], result: Any):
+    begin = _api_calls.pop(id(data), None)
+    if begin is not None:
+        perf.record(f"api.{api}", time.perf_counter() - begin)
+
+
+@run_preprocessor
+async def _before_handler(matcher: Matcher):
+    matcher.state[_STATE_KEY] = time.perf_counter()
+
+
+@run_postprocessor
+async def _after_handler(matcher: Matcher):
+    begin = matcher.state.get(_STATE_KEY)
+    if begin is not None:
+        perf.record(f"handler.{matcher.plugin_name or 'unknown'}", time.perf_counter() - begin)
+
+
+def perf_report(prefix: str = "") -> dict[str, Any]:
+    pool = get_browser_pool()
+    cache = get_render_cache()
+    member_cache = get_member_cache()
+    pic_cache = get_pic_cache()
+    service = get_render_service()
+    return {
+        "spans": {k: v for k, v in perf.snapshot().items() if k.startswith(prefix)},
+        "browser_pool": pool.snapshot() if pool else None,
+        "render_cache": cache.snapshot() if cache else None,
+        "member_cache": member_cache.snapshot() if member_cache else None,
+        "image_output": output_stats.snapshot(),
+        "pic_cache": pic_cache.snapshot() if pic_cache else None,
+        "render_service": service.snapshot() if service else None,
+    }
+
+
+@perf_cmd.handle()
+async def handle_perf(message: Message = CommandArg()):
+    text = message.extract_plain_text().strip()
+
+    if text == "reset":
+        perf.reset()
+        output_stats.reset()
+        await perf_cmd.finish("已清空耗时统计")
+
+    lines = [perf.format(text)]
+    pool = get_browser_pool()
+    if pool is not None:
+        lines.append("浏览器池: " + json.dumps(pool.snapshot(), ensure_ascii=False))
+    service = get_render_service()
+    if service is not None:
+        lines.append("渲染进程: " + json.dumps(service.snapshot(), ensure_ascii=False))
+    cache = get_render_cache()
+    if cache is not None:
+        lines.append("渲染缓存: " + json.dumps(cache.snapshot(), ensure_ascii=False))
+    member_cache = get_member_cache()
+    if member_cache is not None:
+        lines.append("成员列表缓存: " + json.dumps(member_cache.snapshot(), ensure_ascii=False))
+    pic_cache = get_pic_cache()
+    if pic_cache is not None:
+        lines.append("缓存图片: " + json.dumps(pic_cache.snapshot(), ensure_ascii=False))
+    if output_stats.formats:
+        lines.append("图片输出: " + json.dumps(output_stats.snapshot(), ensure_ascii=False))
+    await perf_cmd.finish("\n".join(lines))
+
+
+# 可选的 HTTP 端点（需要 FastAPI 驱动，并在 .env 中开启 mbtistats_perf_http、设置 mbtistats_perf_token）
+_config = nonebot.get_driver().config
+_token = str(getattr(_config, "mbtistats_perf_token", "") or "")
+if getattr(_config, "mbtistats_perf_http", False) and not _token:
+    print("⚠️ 未设置 mbtistats_perf_token，不注册 /mbtistats/perf 端点")
+elif getattr(_config, "mbtistats_perf_http", False):
+    try:
+        from fastapi import FastAPI, Header, HTTPException
+
+        app = nonebot.get_app()
+        if not isinstance(app, FastAPI):
+            raise TypeError("当前驱动不是 FastAPI")
+    except (ImportError, ValueError, TypeError) as e:
+        print(f"⚠️ 无法注册 /mbtistats/perf 端点: {e}")
+    else:
+
+        @app.get("/mbtistats/perf")
+        async def perf_endpoint(prefix: str = "", x_perf_token: str = Header(default="")):
+            if not hmac.compare_digest(x_perf_token.encode(), _token.encode()):
+                raise HTTPException(status_code=403, detail="invalid token")
+            return perf_report(prefix)
@@ -10,6 +10,7 @@ from nonebot.adapters.onebot.v11 import (
     MessageSegment as OneBotMessageSegment,
     Message as OneBotMessage,
 )
+from nonebot.adapters.onebot.v11.exception import ActionFailed
 from nonebot.adapters.console import MessageEvent as ConsoleMessageEvent
 from typing import List
 import asyncio
@@ -24,42 +25,122 @@ __plugin_meta__ = PluginMetadata(
 recall_cmd = on_command("recall", priority=1, block=True)
 
 
+# 分页拉取历史消息
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGES = 10
+
+# 并发撤回与自适应退避
+RECALL_CONCURRENCY = 5
+RECALL_MAX_RETRIES = 4
+BACKOFF_INITIAL = 0.02
+BACKOFF_MAX = 2.0
+BACKOFF_DECAY = 0.9
+RATE_LIMIT_KEYWORDS = ("频繁", "频率", "rate", "limit", "too many")
+
+
 async def get_bot_messages(bot: Bot, event: GroupMessageEvent, count: int, time_to: int) -> List[int]:
-    """获取机器人最近发送的消息ID列表"""
+    """获取机器人最近发送的消息ID列表（从新到旧分页向前翻，直到凑够 count 条）"""
     messages = []
+    seen = set()
+    message_seq = None
     try:
-        # 获取群消息历史
-        history = await bot.get_group_msg_history(
-            group_id=event.group_id,
-            count=100  # 获取最近100条消息
-        )
-        
-        # 筛选出机器人发送的消息
-        for msg in reversed(history['messages']):
-            if int(msg.get("user_id")) == int(bot.self_id) and msg["time"] <= time_to:
+        for _ in range(HISTORY_MAX_PAGES):
+            params = {"group_id": event.group_id, "count": HISTORY_PAGE_SIZE}
+            if message_seq is not None:
+                params["message_seq"] = message_seq
+            history = await bot.get_group_msg_history(**params)
+            page = history.get("messages") or []
+            if not page:
+                break
+
+            # 筛选出机器人发送的消息（页内按时间升序，倒序遍历即从新到旧）
+            for msg in reversed(page):
                 msg_id = msg.get("message_id")
-                if msg_id is not None:
+                if msg_id is None or msg_id in seen:
+                    continue
+                seen.add(msg_id)
+                if int(msg.get("user_id")) == int(bot.self_id) and msg["time"] <= time_to:
                     messages.append(int(msg_id))
-                if len(messages) >= count:
-                    break
+                    if len(messages) >= count:
+                        return messages
+
+            # 下一页从本页最旧的一条开始（不同实现的边界是否包含该条不一致，已用 seen 去重）
+            oldest = page[0]
+            next_seq = oldest.get("message_seq", oldest.get("message_id"))
+            if next_seq is None or next_seq == message_seq:
+                break
+            message_seq = next_seq
     except Exception as e:
         print(f"获取消息历史失败: {e}")
-    
+
     return messages
 
 
-async def recall_messages(bot: Bot, message_ids: List[int]) -> int:
-    """撤回消息列表，返回成功撤回的数量"""
-    success_count = 0
-    for msg_id in message_ids:
-        try:
-            await bot.delete_msg(message_id=msg_id)
-            success_count += 1
-            # 避免触发频率限制
-            await asyncio.sleep(0.1)
-        except Exception as e:
-            print(f"撤回消息 {msg_id} 失败: {e}")
-    return success_count
+def _is_rate_limited(e: Exception) -> bool:
+    text = str(e).lower()
+    return any(keyword in text for keyword in RATE_LIMIT_KEYWORDS)
+
+
+class _Pacer:
+    """
+    所有撤回任务共享的发送节奏：相邻两次调用至少间隔 interval 秒。
+    遇到限流时间隔加倍并整体暂停，成功后逐步缩短，从而收敛到服务端允许的速率。
+    """
+
+    def __init__(self):
+        self.interval = 0.0
+        self.next_at = 0.0
+        self.adjusted_at = 0.0
+
+    async def wait(self) -> float:
+        """等待轮到本次调用，返回调用开始时间"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self.next_at)
+        self.next_at = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+        return start
+
+    def on_rate_limited(self, started_at: float):
+        # 同一批并发请求一起被限流时只退避一次
+        if started_at < self.adjusted_at:
+            return
+        loop = asyncio.get_running_loop()
+        self.interval = min(BACKOFF_MAX, max(BACKOFF_INITIAL, self.interval * 2))
+        self.adjusted_at = loop.time()
+        self.next_at = max(self.next_at, self.adjusted_at + self.interval)
+
+    def on_success(self):
+        self.interval *= BACKOFF_DECAY
+
+
+async def recall_messages(bot: Bot, message_ids: List[int], concurrency: int = RECALL_CONCURRENCY) -> int:
+    """并发撤回消息列表（有界并发，限流时退避重试），返回成功撤回的数量"""
+    slots = asyncio.Semaphore(concurrency)
+    pacer = _Pacer()
+
+    async def recall(msg_id: int) -> bool:
+        async with slots:
+            for attempt in range(RECALL_MAX_RETRIES + 1):
+                started_at = await pacer.wait()
+                try:
+                    await bot.delete_msg(message_id=msg_id)
+                except ActionFailed as e:
+                    if _is_rate_limited(e) and attempt < RECALL_MAX_RETRIES:
+                        pacer.on_rate_limited(started_at)
+                        continue
+                    print(f"撤回消息 {msg_id} 失败: {e}")
+                    return False
+                except Exception as e:
+                    print(f"撤回消息 {msg_id} 失败: {e}")
+                    return False
+                pacer.on_success()
+                return True
+        return False
+
+    results = await asyncio.gather(*(recall(msg_id) for msg_id in message_ids))
+    return sum(results)
 
 
 @recall_cmd.handle()
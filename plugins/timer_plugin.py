@@ -1,8 +1,24 @@
-from nonebot import on_command
-from nonebot.adapters import Message
+from nonebot import get_bot, get_driver, on_command, require
+from nonebot.adapters import Bot, Event, Message
 from nonebot.params import CommandArg
 from nonebot.plugin import PluginMetadata
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
 import asyncio
+import heapq
+import json
+import re
+import time
+import uuid
+
+require("nonebot_plugin_apscheduler")
+require("nonebot_plugin_saa")
+from nonebot_plugin_apscheduler import scheduler  # noqa: E402
+from nonebot_plugin_saa import MessageFactory, PlatformTarget, Text, extract_target  # noqa: E402
+
+from common.async_storage import run_io  # noqa: E402
+from common.stats_store import atomic_write_bytes  # noqa: E402
 
 __plugin_meta__ = PluginMetadata(
     name="timer",
@@ -12,36 +28,226 @@ __plugin_meta__ = PluginMetadata(
 
 timer_cmd = on_command("timer", priority=1, block=True)
 
+# 提醒持久化到本地文件，重启 / 重新部署后恢复
+TIMER_FILE = Path("data/timer/timers.json")
+# 所有提醒共用一个 APScheduler 任务，只在最早到期的时间点触发
+NEXT_JOB_ID = "timer_plugin_next"
+# Bot 尚未连接或发送失败时，到期提醒的重试间隔（秒）
+RETRY_DELAY = 30
+# 发送失败超过该次数后放弃
+MAX_SEND_ATTEMPTS = 10
+
+
+@dataclass
+class Timer:
+    id: str
+    fire_at: float          # 到期时间（Unix 秒）
+    reminder: str
+    bot_id: str
+    target: dict | None     # saa PlatformTarget 序列化结果；None 表示无法持久化的会话
+    attempts: int = 0       # 已失败的发送次数
+
+
+class TimerStore:
+    """
+    提醒存储：按 id 保存全部提醒，另维护 (到期时间, id) 的最小堆作为索引，
+    取最早到期 / 弹出已到期都是 O(log n)，上千个待触发的提醒也几乎没有开销。
+
+    写文件在 I/O 线程中执行；写入进行中又有变化时合并为下一次写入。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.timers: dict[str, Timer] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._dirty = False
+        self._save_lock = asyncio.Lock()
+
+    def load(self) -> int:
+        if not self.path.exists():
+            return 0
+        try:
+            items = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"读取提醒数据失败: {e}")
+            return 0
+        if not isinstance(items, list):
+            print(f"提醒数据格式错误: {self.path}")
+            return 0
+        count = 0
+        for item in items:
+            try:
+                timer = Timer(**item)
+            except (TypeError, ValueError) as e:
+                # 旧版本或损坏的条目：跳过，不影响其他提醒的恢复
+                print(f"跳过无效的提醒数据 {item!r}: {e}")
+                continue
+            self.add(timer)
+            count += 1
+        return count
+
+    async def save(self):
+        """把可持久化的提醒写入文件（并发调用合并为至多一次额外写入）"""
+        self._dirty = True
+        async with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            items = [asdict(t) for t in self.timers.values() if t.target is not None]
+            data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+            await run_io(atomic_write_bytes, self.path, data)
+
+    def add(self, timer: Timer):
+        """加入内存索引（需要持久化时调用方再 await save()）"""
+        self.timers[timer.id] = timer
+        heapq.heappush(self._heap, (timer.fire_at, timer.id))
+
+    def peek(self) -> Timer | None:
+        """最早到期的提醒（顺带清理堆中已被移除的条目）"""
+        while self._heap:
+            _, timer_id = self._heap[0]
+            if timer_id in self.timers:
+                return self.timers[timer_id]
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> list[Timer]:
+        """从内存中取出已到期的提醒（不写文件：发送完成后由调用方 save()，中途崩溃时重启后重新发送）"""
+        due = []
+        while (timer := self.peek()) is not None and timer.fire_at <= now:
+            heapq.heappop(self._heap)
+            due.append(self.timers.pop(timer.id))
+        return due
+
+
+store = TimerStore(TIMER_FILE)
+# 无法持久化的会话（平台不支持 saa）只保存在内存中：timer id -> event
+_volatile_events: dict[str, Event] = {}
+
+
+def schedule_next():
+    """把共享的调度任务设置到最早到期的提醒上；没有提醒时移除任务"""
+    timer = store.peek()
+    if timer is None:
+        if scheduler.get_job(NEXT_JOB_ID):
+            scheduler.remove_job(NEXT_JOB_ID)
+        return
+    scheduler.add_job(
+        fire_due_timers,
+        "date",
+        # 带时区的时间：不带时区时 APScheduler 按调度器时区（默认 Asia/Shanghai）解释，UTC 主机上会提前 8 小时
+        run_date=datetime.fromtimestamp(max(timer.fire_at, time.time()), tz=timezone.utc),
+        id=NEXT_JOB_ID,
+        replace_existing=True,
+        misfire_grace_time=None,
+    )
+
+
+async def fire_due_timers():
+    due = store.pop_due(time.time())
+    for timer in due:
+        try:
+            bot = get_bot(timer.bot_id)
+        except (KeyError, ValueError):
+            # Bot 尚未连接（例如刚重启），稍后重试；Bot 连接时也会重新调度
+            timer.fire_at = time.time() + RETRY_DELAY
+            store.add(timer)
+            continue
+
+        try:
+            await send_reminder(bot, timer)
+        except Exception as e:
+            timer.attempts += 1
+            if timer.attempts >= MAX_SEND_ATTEMPTS:
+                print(f"发送提醒 {timer.id} 失败 {timer.attempts} 次，放弃: {e}")
+                _volatile_events.pop(timer.id, None)
+                continue
+            print(f"发送提醒 {timer.id} 失败，{RETRY_DELAY} 秒后重试: {e}")
+            timer.fire_at = time.time() + RETRY_DELAY
+            store.add(timer)
+    # 全部发送（或重新排队）后才把移除写入文件
+    if due:
+        await store.save()
+    schedule_next()
+
+
+async def send_reminder(bot: Bot, timer: Timer):
+    text = f"⏰ {timer.reminder}"
+    if timer.target is None:
+        event = _volatile_events.get(timer.id)
+        if event is not None:
+            await bot.send(event, text)
+            _volatile_events.pop(timer.id, None)
+        return
+    await MessageFactory(Text(text)).send_to(PlatformTarget.deserialize(timer.target), bot)
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def restore_timers():
+    count = await run_io(store.load)
+    if count:
+        print(f"已恢复 {count} 个提醒")
+    schedule_next()
+
+
+@driver.on_bot_connect
+async def retry_pending_timers():
+    schedule_next()
+
+
+def dump_target(target: PlatformTarget) -> dict:
+    """PlatformTarget 转为可 JSON 序列化的 dict（兼容 pydantic v1 / v2）"""
+    if hasattr(target, "model_dump"):
+        return target.model_dump(mode="json")
+    return json.loads(target.json())
+
+
+def parse_duration(time_str: str) -> int:
+    """解析 30s / 5m / 1h，无法解析时返回 0"""
+    match = re.match(r'(\d+)([smh])', time_str.lower())
+    if not match:
+        return 0
+    num = int(match.group(1))
+    unit = match.group(2)
+    return num * {"s": 1, "m": 60, "h": 3600}[unit]
+
 
 @timer_cmd.handle()
-async def handle_timer(message: Message = CommandArg()):
+async def handle_timer(bot: Bot, event: Event, message: Message = CommandArg()):
     text = message.extract_plain_text().strip()
-    
+
     if not text:
         await timer_cmd.finish("请输入倒计时时间，如: /timer 30s 测试")
-    
+
     parts = text.split(maxsplit=1)
     time_str = parts[0]
     reminder = parts[1] if len(parts) > 1 else "时间到！"
-    
-    # 简单解析
-    seconds = 0
-    import re
-    match = re.match(r'(\d+)([smh])', time_str.lower())
-    if match:
-        num = int(match.group(1))
-        unit = match.group(2)
-        if unit == 's':
-            seconds = num
-        elif unit == 'm':
-            seconds = num * 60
-        elif unit == 'h':
-            seconds = num * 3600
-    
+
+    seconds = parse_duration(time_str)
     if seconds <= 0 or seconds > 86400:
         await timer_cmd.finish("时间格式错误，支持: 30s, 5m, 1h")
-    
+
+    try:
+        target = dump_target(extract_target(event, bot))
+    except Exception:
+        # 不支持的平台：仍然提醒，但不会在重启后恢复
+        target = None
+
+    timer = Timer(
+        id=uuid.uuid4().hex,
+        fire_at=time.time() + seconds,
+        reminder=reminder,
+        bot_id=bot.self_id,
+        target=target,
+    )
+    if target is None:
+        _volatile_events[timer.id] = event
+    store.add(timer)
+    schedule_next()
+    if target is not None:
+        await store.save()
+
     await timer_cmd.send(f"已设置 {seconds} 秒后提醒: {reminder}")
-    
-    await asyncio.sleep(seconds)
-    await timer_cmd.send(f"⏰ {reminder}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+离线批量渲染：从已存储的统计数据为所有群重新生成图片
+
+用法：
+    uv run scripts/batch_render.py [--data-root data/mbtistats] [--groups 123 456]
+                                   [--workers N] [--pool-size 2] [--mode mbti-stats] [--force]
+
+说明：
+    - 直接读取 data/mbtistats/data/v1/{group_id}/ 下的统计数据（旧格式 JSON 与 JSON Lines 均可），
+      不需要运行中的 Bot，也不访问网络 / OneBot API
+    - 数据转换 (transform_to_render_data + 降采样) 在进程池中并行执行
+    - 截图共享一个浏览器池，并发数即池大小
+    - 以「渲染数据 + 模板版本」为键写入内容寻址渲染缓存，输出未变化的群不再启动 Chromium，
+      只导出为 data/mbtistats/cache/v1/{group_id}/mbti-stats-pic-{timestamp}.png
+    - 模板修改后或部署前运行，可预热渲染缓存
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# 计算路径
+# scripts/batch_render.py -> project_root/scripts/ -> project_root/
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.browser_pool import BrowserPool  # noqa: E402
+from common.downsample import attach_history_windows  # noqa: E402
+from common.render_cache import RenderCache, render_key, template_version  # noqa: E402
+from common.renderer import DEFAULT_MODE, PageRenderer, transform_to_render_data  # noqa: E402
+from common.stats_format import expand, latest_timestamp  # noqa: E402
+from common.stats_store import StatsStore  # noqa: E402
+
+DEFAULT_DATA_ROOT = Path("data/mbtistats")
+CACHE_FILE_TEMPLATE = "mbti-stats-pic-{timestamp}.png"
+
+
+@dataclass
+class GroupResult:
+    group_id: str
+    status: str = "pending"     # rendered / cached / empty / failed
+    error: str | None = None
+    output: Path | None = None
+
+
+def build_render_data(records: list[dict[str, Any]]) -> dict[str, Any]:
+    """在子进程中执行：展开游程记录 → 插件数据转换 → 附加降采样的历史窗口"""
+    history = expand(records)
+    render_data = transform_to_render_data(history)
+    # 以最新观测时间为「当前时间」，保证同一份数据每次得到相同的渲染输入（缓存键稳定）
+    attach_history_windows(render_data, history, now=history[-1]["timestamp"])
+    return render_data
+
+
+async def render_all(args: argparse.Namespace) -> list[GroupResult]:
+    store = StatsStore(args.data_root / "data" / "v1")
+    export_root = args.data_root / "cache" / "v1"
+    cache = RenderCache(args.data_root / "cache" / "objects", max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    cache.load()
+
+    try:
+        renderer = PageRenderer()
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    version = template_version(renderer.template_base_dir)
+
+    group_ids = args.groups or store.group_ids()
+    results = {group_id: GroupResult(group_id) for group_id in group_ids}
+    print(f"📂 共 {len(group_ids)} 个群, 模板版本 {version}")
+
+    pool = BrowserPool(size=args.pool_size)
+    loop = asyncio.get_running_loop()
+    # 限制同时在内存中的群数量（读取的记录与转换结果），避免群很多时占用过高
+    in_flight = asyncio.Semaphore(args.workers + args.pool_size)
+
+    async def process(executor: ProcessPoolExecutor, group_id: str) -> None:
+        async with in_flight:
+            await render_group(executor, group_id)
+
+    async def render_group(executor: ProcessPoolExecutor, group_id: str) -> None:
+        result = results[group_id]
+        try:
+            records = store.read_records(group_id)
+            if not records:
+                result.status = "empty"
+                return
+            timestamp = latest_timestamp(records[-1])
+            render_data = await loop.run_in_executor(executor, build_render_data, records)
+            key = render_key({"mode": args.mode, "render_data": render_data}, version)
+
+            if args.force or cache.get_path(key) is None:
+                html = renderer.render_html(args.mode, render_data)
+                cache.put(key, await renderer.screenshot(pool, args.mode, html))
+                result.status = "rendered"
+            else:
+                result.status = "cached"
+
+            dest = export_root / group_id / CACHE_FILE_TEMPLATE.format(timestamp=timestamp)
+            result.output = cache.export(key, dest)
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+            print(f"  ❌ {group_id}: {result.error}")
+        else:
+            print(f"  ✅ {group_id}: {result.status}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            await asyncio.gather(*(process(executor, group_id) for group_id in group_ids))
+    finally:
+        await pool.close()
+
+    return list(results.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线批量渲染所有群的统计图片")
+    parser.add_argument(
+        "--data-root", type=Path, default=DEFAULT_DATA_ROOT,
+        help=f"mbtistats 数据根目录（默认 {DEFAULT_DATA_ROOT}）"
+    )
+    parser.add_argument("--groups", nargs="*", help="只渲染指定的群号（默认全部）")
+    parser.add_argument("--mode", default=DEFAULT_MODE, help=f"页面模式（默认 {DEFAULT_MODE}）")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="数据转换进程数（默认 CPU 核数）"
+    )
+    parser.add_argument("--pool-size", type=int, default=2, help="浏览器池页面数，即并发截图数（默认 2）")
+    parser.add_argument("--cache-max-mb", type=float, default=200, help="渲染缓存大小上限 MB（默认 200）")
+    parser.add_argument("--force", action="store_true", help="忽略渲染缓存，全部重新截图")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    print("🚀 开始批量渲染")
+    results = asyncio.run(render_all(args))
+
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+    print(f"🏁 完成: {summary or '没有可渲染的群'}, 耗时 {time.perf_counter() - begin:.2f}s")
+
+    if counts.get("failed"):
+        sys.exit(1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+MBTI 昵称分类器微基准
+
+注意：测量的是 common/mbti_classifier.py 这份独立原型（规则为推测），不是插件线上使用的分类器。
+
+用法：
+    uv run scripts/bench/bench_classifier.py [--size 100000] [--seed 0] [--json out.json]
+    uv run scripts/bench/bench_classifier.py --reference path/to/module.py:函数名 [--names names.txt]
+
+在合成的昵称语料（默认 10 万个）上测量：
+    - cold:   清空 LRU 缓存后批量分类（首次统计）
+    - warm:   缓存已热时再次批量分类（后续统计 / 其他群的重复名字）
+    - single: 不使用缓存、逐个名字调用未编译正则的基线写法
+
+--reference 时不计时，而是把合成语料（以及 --names 文件中每行一个的真实昵称）交给
+本仓库的分类器与 reference（插件的解析函数）分别解析，列出结果不一致的名字；有不一致时退出码为 1。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common import mbti_classifier  # noqa: E402
+from synthetic import generate_corpus  # noqa: E402
+
+
+def _baseline_classify(name: str) -> str | None:
+    """基线：每次调用都现场编译正则，不做缓存"""
+    matches = re.findall(r"(?<![A-Za-z])[EIX][SNX][TFX][JPX](?![A-Za-z])", name, re.IGNORECASE)
+    return matches[0].upper() if matches else None
+
+
+def _timed(func, *args) -> float:
+    begin = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - begin
+
+
+def run(size: int, seed: int) -> dict:
+    corpus = generate_corpus(size, seed)
+
+    mbti_classifier.cache_clear()
+    cold = _timed(mbti_classifier.classify, corpus)
+    warm = _timed(mbti_classifier.classify, corpus)
+    re.purge()
+    single = _timed(lambda names: [_baseline_classify(n) for n in names], corpus)
+
+    labels = mbti_classifier.classify(corpus)
+    info = mbti_classifier.cache_info()
+    return {
+        "benchmark": "classifier",
+        "size": size,
+        "seed": seed,
+        "cold_s": cold,
+        "warm_s": warm,
+        "baseline_s": single,
+        "cold_ns_per_name": cold / size * 1e9,
+        "warm_ns_per_name": warm / size * 1e9,
+        "classified": sum(1 for label in labels if label is not None),
+        "ambiguous": sum(1 for label in labels if label == mbti_classifier.AMBIGUOUS_TYPE),
+        "cache_size": info.currsize,
+    }
+
+
+def run_compare(reference: str, size: int, seed: int, names_file: Path | None) -> int:
+    names = generate_corpus(size, seed)
+    if names_file is not None:
+        names += [line for line in names_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+    mismatches = mbti_classifier.compare(names, mbti_classifier.load_reference(reference))
+    total = len(set(names))
+    if not mismatches:
+        print(f"✅ {total} 个名字的解析结果与 {reference} 完全一致")
+        return 0
+    print(f"❌ {total} 个名字中有 {len(mismatches)} 个解析结果不一致（本仓库 / reference）:")
+    for name, ours, theirs in mismatches[:50]:
+        print(f"   {name!r}: {ours} / {theirs}")
+    if len(mismatches) > 50:
+        print(f"   ... 另有 {len(mismatches) - 50} 个")
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 昵称分类器微基准")
+    parser.add_argument("--size", type=int, default=100_000, help="语料大小（默认 100000）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", type=Path, help="把结果写入 JSON 文件")
+    parser.add_argument("--reference", help="与该解析函数比对结果（模块路径.py:函数名 或 包.模块:函数名），不计时")
+    parser.add_argument("--names", type=Path, help="比对时额外使用的昵称文件（每行一个）")
+    args = parser.parse_args()
+
+    if args.reference:
+        sys.exit(run_compare(args.reference, args.size, args.seed, args.names))
+
+    result = run(args.size, args.seed)
+    print(f"📊 语料 {result['size']} 个名字, 识别 {result['classified']} 个 (模糊 {result['ambiguous']})")
+    print(f"   cold:     {result['cold_s'] * 1000:8.1f} ms  ({result['cold_ns_per_name']:.0f} ns/名)")
+    print(f"   warm:     {result['warm_s'] * 1000:8.1f} ms  ({result['warm_ns_per_name']:.0f} ns/名)")
+    print(f"   baseline: {result['baseline_s'] * 1000:8.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ 结果已写入 {args.json}")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+stats → transform → render 流水线基准
+
+用法：
+    uv run scripts/bench/run.py [--quick] [--screenshot] [--output results.json]
+    uv run scripts/bench/run.py --compare baseline.json [--threshold 1.2]
+
+分别计时以下阶段（合成数据，见 synthetic.py）：
+    classify       昵称分类（冷缓存），群规模 100 ~ 5000
+    aggregate      全量统计 / 成员差分增量统计
+    transform      插件 transform_to_render_data，历史长度 10 / 1k / 100k
+    downsample     服务端多尺度降采样 (common/downsample.py)
+    jinja          模板渲染
+    screenshot     Playwright 截图（需 --screenshot，使用浏览器池）
+
+结果以 JSON 输出，可用 --compare 与另一次提交的结果对比（最短耗时的比值超过阈值记为回归，
+最短耗时受机器噪声影响最小）。
+插件 submodule 不存在或 Playwright 未安装时，相关阶段会被跳过并记录原因。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+project_root = Path(__file__).parent.parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common import mbti_classifier  # noqa: E402
+from common.downsample import build_history_windows  # noqa: E402
+from common.member_stats import GroupMemberStats  # noqa: E402
+from synthetic import generate_history, generate_members, mutate_members  # noqa: E402
+
+MEMBER_SIZES = (100, 500, 2000, 5000)
+HISTORY_SIZES = (10, 1_000, 100_000)
+QUICK_MEMBER_SIZES = (100, 2000)
+QUICK_HISTORY_SIZES = (10, 1_000)
+
+
+class Bench:
+    """收集计时结果"""
+
+    def __init__(self, repeats: int, budget: float):
+        self.repeats = repeats
+        self.budget = budget
+        self.results: list[dict[str, Any]] = []
+        self.skipped: list[dict[str, str]] = []
+
+    def _record(self, stage: str, case: str, samples: list[float]) -> None:
+        result = {
+            "stage": stage,
+            "case": case,
+            "runs": len(samples),
+            "min_s": min(samples),
+            "median_s": statistics.median(samples),
+            "mean_s": statistics.fmean(samples),
+        }
+        self.results.append(result)
+        print(f"  {stage:<12} {case:<24} median {result['median_s'] * 1000:10.2f} ms  (n={len(samples)})")
+
+    def measure(self, stage: str, case: str, func: Callable[..., Any], setup: Callable[[], tuple] | None = None) -> Any:
+        """重复执行 func（setup 不计时），达到次数上限或时间预算后停止，至少执行一次"""
+        samples = []
+        result = None
+        spent = 0.0
+        while len(samples) < self.repeats and (not samples or spent < self.budget):
+            args = setup() if setup else ()
+            begin = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - begin
+            samples.append(elapsed)
+            spent += elapsed
+        self._record(stage, case, samples)
+        return result
+
+    async def measure_async(self, stage: str, case: str, func: Callable[[], Any]) -> Any:
+        samples = []
+        result = None
+        spent = 0.0
+        while len(samples) < self.repeats and (not samples or spent < self.budget):
+            begin = time.perf_counter()
+            result = await func()
+            elapsed = time.perf_counter() - begin
+            samples.append(elapsed)
+            spent += elapsed
+        self._record(stage, case, samples)
+        return result
+
+    def skip(self, stage: str, reason: str) -> None:
+        self.skipped.append({"stage": stage, "reason": reason})
+        print(f"  {stage:<12} ⏭️ 跳过: {reason}")
+
+
+def bench_members(bench: Bench, sizes: tuple[int, ...]) -> None:
+    for size in sizes:
+        members = generate_members(size, seed=size)
+        names = [m["card"] or m["nickname"] for m in members]
+
+        def classify_cold(names=names):
+            mbti_classifier.cache_clear()
+            return mbti_classifier.classify(names)
+
+        bench.measure("classify", f"members={size}", classify_cold)
+
+        def full(members=members):
+            stats = GroupMemberStats()
+            stats.update(members)
+            return stats
+
+        bench.measure("aggregate", f"full members={size}", full)
+
+        changed = mutate_members(members, changes=max(1, size // 100), seed=size + 1)
+
+        def incremental_setup(members=members):
+            stats = GroupMemberStats()
+            stats.update(members)
+            return (stats,)
+
+        bench.measure(
+            "aggregate",
+            f"incremental members={size}",
+            lambda stats, changed=changed: stats.update(changed),
+            setup=incremental_setup,
+        )
+
+
+def bench_render(bench: Bench, sizes: tuple[int, ...], screenshot: bool) -> None:
+    try:
+        from common.renderer import DEFAULT_MODE, PageRenderer, load_transform_module
+        load_transform_module()
+        renderer = PageRenderer()
+    except (FileNotFoundError, ImportError) as e:
+        renderer = None
+        reason = str(e)
+
+    histories = {size: generate_history(size, seed=size) for size in sizes}
+    for size, history in histories.items():
+        bench.measure("downsample", f"points={size}", lambda history=history: build_history_windows(history))
+
+    if renderer is None:
+        for stage in ("transform", "jinja", "screenshot"):
+            bench.skip(stage, reason)
+        return
+
+    render_data = {}
+    for size, history in histories.items():
+        render_data[size] = bench.measure(
+            "transform", f"points={size}", lambda history=history: renderer.transform(history)
+        )
+    htmls = {}
+    for size, data in render_data.items():
+        htmls[size] = bench.measure(
+            "jinja", f"points={size}", lambda data=data: renderer.render_html(DEFAULT_MODE, data)
+        )
+
+    if not screenshot:
+        bench.skip("screenshot", "未指定 --screenshot")
+        return
+
+    async def shoot() -> None:
+        from common.browser_pool import BrowserPool
+
+        pool = BrowserPool(size=1)
+        await pool.start()
+        try:
+            for size, html in htmls.items():
+                await bench.measure_async(
+                    "screenshot",
+                    f"points={size}",
+                    lambda html=html: renderer.screenshot(pool, DEFAULT_MODE, html),
+                )
+        finally:
+            await pool.close()
+
+    asyncio.run(shoot())
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """打印与基线的对比，返回回归项数量"""
+    base = {(r["stage"], r["case"]): r for r in baseline["results"]}
+    regressions = 0
+    print()
+    print(f"对比基线 {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}（阈值 x{threshold}）")
+    for result in current["results"]:
+        old = base.get((result["stage"], result["case"]))
+        if old is None or old["min_s"] <= 0:
+            continue
+        ratio = result["min_s"] / old["min_s"]
+        mark = "❌" if ratio > threshold else ("✅" if ratio < 1 / threshold else "  ")
+        if ratio > threshold:
+            regressions += 1
+        print(
+            f"  {mark} {result['stage']:<12} {result['case']:<24} "
+            f"{old['min_s'] * 1000:10.2f} -> {result['min_s'] * 1000:10.2f} ms  x{ratio:.2f}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="stats → transform → render 流水线基准")
+    parser.add_argument("--quick", action="store_true", help="只跑小规模用例")
+    parser.add_argument("--screenshot", action="store_true", help="包含 Playwright 截图阶段")
+    parser.add_argument("--repeats", type=int, default=5, help="每个用例最多重复次数（默认 5）")
+    parser.add_argument("--budget", type=float, default=3.0, help="每个用例的时间预算秒数，超出后不再重复（默认 3）")
+    parser.add_argument("--output", type=Path, help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", type=Path, help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=1.2, help="最短耗时比值超过该值记为回归（默认 1.2）")
+    args = parser.parse_args()
+
+    bench = Bench(args.repeats, args.budget)
+    print("🚀 开始基准测试")
+    bench_members(bench, QUICK_MEMBER_SIZES if args.quick else MEMBER_SIZES)
+    bench_render(bench, QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES, args.screenshot)
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "time": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": bench.results,
+        "skipped": bench.skipped,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(output, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ 结果已写入 {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if compare(output, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,132 @@
+"""
+基准用的合成数据
+
+- 群成员列表（OneBot get_group_member_list 格式）
+- stats-data 时间序列（时间点数据格式，见 docs/data-specs.md）
+- 昵称语料
+"""
+
+import random
+from typing import Any
+
+from common.stats_format import AMBIGUOUS_TYPE, MBTI_TYPES
+
+MBTI_LETTERS = ("EIX", "SNX", "TFX", "JPX")
+CJK_SAMPLES = "小明红刚丽华芳伟静敏强磊洋艳勇军杰娟涛超秀霞平"
+DECORATIONS = ("", " ", "-", "|", "/", "【", "】", "～", "♪", "🐱")
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+
+
+def random_code(rng: random.Random, ambiguous_rate: float = 0.1) -> str:
+    letters = []
+    for dim in MBTI_LETTERS:
+        if rng.random() < ambiguous_rate:
+            letters.append("X")
+        else:
+            letters.append(rng.choice(dim[:2]))
+    code = "".join(letters)
+    return code.lower() if rng.random() < 0.3 else code
+
+
+def random_name(rng: random.Random) -> str:
+    """合成一个群名片：约 60% 带 MBTI，少量带两个 MBTI 或英文单词干扰"""
+    nick = "".join(rng.choice(CJK_SAMPLES) for _ in range(rng.randint(1, 6)))
+    roll = rng.random()
+    if roll < 0.5:
+        return f"{random_code(rng)}{rng.choice(DECORATIONS)}{nick}"
+    if roll < 0.6:
+        return f"{nick}{rng.choice(DECORATIONS)}{random_code(rng)}/{random_code(rng)}"
+    if roll < 0.7:
+        return f"{nick} intjoker {rng.randint(0, 999)}"
+    return nick
+
+
+def generate_corpus(size: int, seed: int = 0, unique_ratio: float = 0.7) -> list[str]:
+    """生成昵称语料；unique_ratio 控制不重复名字的比例（群之间的重名会命中缓存）"""
+    rng = random.Random(seed)
+    unique = [random_name(rng) for _ in range(max(1, int(size * unique_ratio)))]
+    return [rng.choice(unique) if i >= len(unique) else unique[i] for i in range(size)]
+
+
+def generate_members(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    """生成群成员列表（约一半成员只有昵称、没有群名片）"""
+    rng = random.Random(seed)
+    return [
+        {
+            "user_id": 10000 + i,
+            "card": random_name(rng) if rng.random() < 0.5 else "",
+            "nickname": random_name(rng),
+        }
+        for i in range(count)
+    ]
+
+
+def mutate_members(members: list[dict[str, Any]], changes: int, seed: int = 0) -> list[dict[str, Any]]:
+    """模拟两次统计之间的成员变化：退群、入群、改名各约三分之一"""
+    rng = random.Random(seed)
+    result = [dict(m) for m in members]
+    next_id = max((m["user_id"] for m in result), default=10000) + 1
+    for _ in range(changes):
+        roll = rng.random()
+        if roll < 0.33 and result:
+            result.pop(rng.randrange(len(result)))
+        elif roll < 0.66:
+            result.append({"user_id": next_id, "card": random_name(rng), "nickname": random_name(rng)})
+            next_id += 1
+        elif result:
+            result[rng.randrange(len(result))]["card"] = random_name(rng)
+    return result
+
+
+def _stats_point(timestamp: int, counts: dict[str, int]) -> dict[str, Any]:
+    ambiguous = counts[AMBIGUOUS_TYPE]
+    total = sum(counts.values())
+    trait_data = {}
+    for index, dim in enumerate(("EI", "SN", "TF", "JP")):
+        first = sum(v for name, v in counts.items() if name in MBTI_TYPES and name[index] == dim[0])
+        second = sum(v for name, v in counts.items() if name in MBTI_TYPES and name[index] == dim[1])
+        # 模糊类型成员按固定比例分配到各维度（相同计数得到相同的 trait_data）
+        unknown = ambiguous * (index + 1) // 5
+        split = (ambiguous - unknown) // 2
+        trait_data[dim] = {dim[0]: first + split, dim[1]: second + ambiguous - unknown - split, "X": unknown}
+    type_data = sorted(
+        ({"name": name, "value": counts[name]} for name in MBTI_TYPES),
+        key=lambda entry: -entry["value"],
+    )
+    type_data.append({"name": AMBIGUOUS_TYPE, "value": ambiguous})
+    return {
+        "timestamp": timestamp,
+        "group_name": "基准测试群",
+        "total_count": total,
+        "type_data": type_data,
+        "trait_data": trait_data,
+    }
+
+
+def generate_history(
+    points: int,
+    members: int = 300,
+    seed: int = 0,
+    start: int = 1735660800000,
+    unchanged_rate: float = 0.6,
+) -> list[dict[str, Any]]:
+    """生成时间序列：大致每天 1~3 个观测，偶尔停机数天；约 unchanged_rate 的观测与上一次相同"""
+    rng = random.Random(seed)
+    names = list(MBTI_TYPES) + [AMBIGUOUS_TYPE]
+    counts = {name: max(0, members // len(names) + rng.randint(-5, 5)) for name in names}
+
+    history = []
+    timestamp = start
+    for _ in range(points):
+        if rng.random() < 0.02:
+            timestamp += rng.randint(2, 10) * DAY_MS
+        else:
+            timestamp += rng.randint(6, 24) * HOUR_MS
+        if history and rng.random() >= unchanged_rate:
+            for _ in range(rng.randint(1, 3)):
+                name = rng.choice(names)
+                counts[name] = max(0, counts[name] + rng.choice((-1, 1)))
+        history.append(_stats_point(timestamp, counts))
+    return history
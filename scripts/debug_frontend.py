@@ -2,91 +2,106 @@
 前端页面开发调试工具
 
 用法：
-    uv run scripts/debug_frontend.py [mode]
+    uv run scripts/debug_frontend.py [mode] [--port 8000]
 
 说明：
     - 从 dev-plugins/mbtistats/src/nonebot_plugin_mbtistats/template/ 加载模板
     - 从 template/{mode}/mock.json 加载后端格式的数据
-    - 即时转换为前端渲染格式
-    - 监听文件变化并自动重绘
+    - 即时转换为前端渲染格式（结果缓存到 mock.json 本身变化为止）
+    - 基于文件系统事件 (watchfiles / inotify) 监听整个模板目录（含 images/ 与公共片段）
+    - 内置 HTTP 服务预览页面，通过 websocket 推送刷新，无需 Live Server
 """
 
 import argparse
-import time
+import asyncio
+import functools
+import io
 import json
 import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
 
 # 计算路径
 # scripts/debug_frontend.py -> project_root/scripts/ -> project_root/
 project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.downsample import attach_history_windows  # noqa: E402
+from common.renderer import (  # noqa: E402
+    DEFAULT_MODE,
+    INDEX_FILE_NAME,
+    PageRenderer,
+    load_transform_module,
+    template_dir,
+)
+from common.stats_format import expand, is_record  # noqa: E402
 
-
-# 导入数据转换函数
-# 由于插件 __init__.py 会初始化 NoneBot，我们需要直接加载模块
-def _load_transform_module():
-    """直接加载 transform_render_data 模块，避免触发插件初始化"""
-    import importlib.util
-
-    transform_py_path = (
-        project_root
-        / "dev-plugins"
-        / "mbtistats"
-        / "src"
-        / "nonebot_plugin_mbtistats"
-        / "transform_render_data.py"
-    )
-
-    if not transform_py_path.exists():
-        return None
-
-    spec = importlib.util.spec_from_file_location(
-        "transform_render_data", transform_py_path
-    )
-    module = importlib.util.module_from_spec(spec)
-    sys.modules["transform_render_data"] = module
-    spec.loader.exec_module(module)
-    return module
-
-
-_transform_module = _load_transform_module()
-if _transform_module is None:
-    print("❌ 无法加载 transform_render_data 模块")
+# 插件 __init__.py 会初始化 NoneBot，这里按文件路径直接加载 transform_render_data 模块
+try:
+    transform_to_render_data = load_transform_module().transform_to_render_data
+except FileNotFoundError as e:
+    print(f"❌ 无法加载 transform_render_data 模块: {e}")
     sys.exit(1)
 
-transform_to_render_data = _transform_module.transform_to_render_data
-
 
 # 配置
-TEMPLATE_DIR_NAME = "template"
 MOCK_FILE_NAME = "mock.json"
-INDEX_FILE_NAME = "index.html"
 PREVIEW_FILE_NAME = "preview.html"
+POLL_INTERVAL = 0.5          # 未安装 watchfiles 时的轮询间隔（秒）
+DEBOUNCE_MS = 50             # 合并编辑器保存时的连续事件
 
 # 插件模板目录: dev-plugins/mbtistats/src/nonebot_plugin_mbtistats/template/
-template_base_dir = (
-    project_root
-    / "dev-plugins"
-    / "mbtistats"
-    / "src"
-    / "nonebot_plugin_mbtistats"
-    / TEMPLATE_DIR_NAME
-)
-
-env = Environment(loader=FileSystemLoader(template_base_dir))
+template_base_dir = template_dir()
+renderer = PageRenderer(template_base_dir, compiled_dir=None, auto_reload=True)   # 调试时始终使用模板源文件
+
+# 注入到预览页面中的刷新脚本（只在 HTTP 响应中注入，不写入 preview.html）
+RELOAD_SCRIPT = """
+<script>
+(() => {
+  const connect = () => {
+    const ws = new WebSocket("ws://" + location.hostname + ":__WS_PORT__");
+    ws.onmessage = (event) => { if (event.data === "reload") location.reload(); };
+    ws.onclose = () => setTimeout(connect, 1000);
+  };
+  connect();
+})();
+</script>
+"""
 
 
 def get_available_modes():
     """扫描 template 目录，返回所有包含 index.html 的子目录名"""
-    modes = []
-    if not template_base_dir.exists():
-        return modes
+    return renderer.modes()
 
-    for path in template_base_dir.iterdir():
-        if path.is_dir() and (path / INDEX_FILE_NAME).exists():
-            modes.append(path.name)
-    return modes
+
+class MockDataCache:
+    """
+    缓存 mock.json 转换后的渲染数据。
+
+    只有 mock.json 本身的修改时间或大小变化时才重新读取与转换，
+    模板 / 样式 / 脚本的修改直接复用缓存，大体积的真实数据也能即时重绘。
+    """
+
+    def __init__(self, mock_path: Path):
+        self.mock_path = mock_path
+        self._signature = None
+        self._data = None
+
+    def invalidate(self):
+        self._signature = None
+
+    def get(self) -> dict:
+        try:
+            stat = self.mock_path.stat()
+        except OSError:
+            print(f"❌ 未找到 Mock 数据文件: {self.mock_path}")
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            self._data = load_mock_data(self.mock_path)
+            self._signature = signature if self._data is not None else None
+        return self._data
 
 
 def load_mock_data(mock_path: Path) -> dict:
@@ -105,8 +120,13 @@ def load_mock_data(mock_path: Path) -> dict:
 
         # 后端格式是列表（时间序列数据）
         if isinstance(backend_data, list):
+            # 游程记录格式 (timestamps: number[]) 先展开为逐次观测的时间点数据
+            if any(is_record(item) for item in backend_data):
+                backend_data = expand(backend_data)
             print(f"📊 正在转换为前端渲染格式...")
             render_data = transform_to_render_data(history_data=backend_data)
+            # 各时间窗口预先降采样的趋势序列（页面只负责绘制）
+            attach_history_windows(render_data, backend_data)
             print(f"✅ 数据转换完成: {len(backend_data)} 条历史记录")
             return render_data
 
@@ -122,33 +142,23 @@ def load_mock_data(mock_path: Path) -> dict:
         return None
 
 
-def render_preview(mode):
+def render_preview(mode, mock_cache: MockDataCache):
     """渲染指定模式的页面"""
-    mode_dir = template_base_dir / mode
-    template_path = f"{mode}/{INDEX_FILE_NAME}"
-    mock_path = mode_dir / MOCK_FILE_NAME
-    output_path = mode_dir / PREVIEW_FILE_NAME
+    output_path = template_base_dir / mode / PREVIEW_FILE_NAME
 
-    # 1. 加载并转换 Mock 数据
-    data = load_mock_data(mock_path)
+    # 1. 加载并转换 Mock 数据（命中缓存时跳过）
+    data = mock_cache.get()
     if data is None:
         return False
 
-    # 2. 加载模板
+    # 2. 渲染 HTML（Jinja2 Environment 会按修改时间自动重新加载模板与公共片段）
     try:
-        template = env.get_template(template_path)
-    except Exception as e:
-        print(f"❌ 找不到模板文件 ({template_path}): {e}")
-        return False
-
-    # 3. 渲染 HTML
-    try:
-        html_content = template.render(**data)
+        html_content = renderer.render_html(mode, data)
     except Exception as e:
         print(f"❌ Jinja2 渲染出错: {e}")
         return False
 
-    # 4. 输出文件
+    # 3. 输出文件
     try:
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(html_content)
@@ -160,93 +170,149 @@ def render_preview(mode):
     return True
 
 
-def watch_mode(mode: str):
-    """监听文件变化并自动重绘"""
-    mode_dir = template_base_dir / mode
-    if not mode_dir.exists():
-        print(f"❌ 目录不存在: {mode_dir}")
-        return
+# --- 预览服务 ---
 
-    print(f"🚀 启动调试模式: {mode}")
-    print(f"📂 监听目录: {mode_dir}")
-    print(f"   - {INDEX_FILE_NAME}")
-    print(f"   - {MOCK_FILE_NAME}")
-    print(f"   - script.mjs (如果存在)")
-    print(f"   - style.css (如果存在)")
-    print(f"💡 请确保已启动 Live Server 监听 {mode}/{PREVIEW_FILE_NAME}")
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """以模板目录为根提供静态文件，并在 HTML 响应中注入刷新脚本"""
 
-    # 初始渲染
-    render_preview(mode)
-
-    # 需要观察的文件列表
-    files_to_watch = {
-        "index": mode_dir / INDEX_FILE_NAME,
-        "mock": mode_dir / MOCK_FILE_NAME,
-        "js": mode_dir / "script.mjs",  # 如果存在的话
-        "css": mode_dir / "style.css"       # 如果存在的话
-    }
-
-    # 存在状态
-    last_exists = {
-        "index": None,
-        "mock": None,
-        "js": None,
-        "css": None
-    }
-    # 最后修改时间
-    last_mtimes = {
-        "index": None,
-        "mock": None,
-        "js": None,
-        "css": None
-    }
+    reload_script = b""
 
-    try:
-        while True:
-            needs_render = False
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        if path.suffix != ".html" or not path.is_file():
+            return super().send_head()
+        body = path.read_bytes()
+        marker = body.lower().rfind(b"</body>")
+        if marker == -1:
+            body += self.reload_script
+        else:
+            body = body[:marker] + self.reload_script + body[marker:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
 
-            for key, file_path in files_to_watch.items():
-                detected_change = False
-                try:
-                    # 存在状态
-                    current_exist = file_path.exists()
-                    last_exist = last_exists.get(key)
+    def end_headers(self):
+        # 禁止浏览器缓存，保证刷新后拿到最新的 html / css / js / 图片
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
 
-                    if last_exist is None:
-                        last_exists[key] = current_exist
-                        last_exist = current_exist
+    def log_message(self, format, *args):
+        pass
 
-                    # 最后修改时间
-                    current_mtime = file_path.stat().st_mtime
-                    last_mtime = last_mtimes.get(key)
 
-                    if last_mtime is None:
-                        last_mtimes[key] = current_mtime
-                        last_mtime = current_mtime
+def start_http_server(port: int, ws_port: int) -> ThreadingHTTPServer:
+    PreviewRequestHandler.reload_script = RELOAD_SCRIPT.replace("__WS_PORT__", str(ws_port)).encode()
+    handler = functools.partial(PreviewRequestHandler, directory=str(template_base_dir))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
 
-                    # 对比检查
-                    if last_exist != current_exist:
-                        last_exists[key] = current_exist
-                        detected_change = True
 
-                    if current_mtime != last_mtime:
-                        last_mtimes[key] = current_mtime
-                        detected_change = True
+class LiveReloadHub:
+    """维护浏览器的 websocket 连接，文件变化时广播 reload"""
 
-                    if detected_change:
-                        print(f"⚡ 检测到 {file_path.name} 变化...")
-                        needs_render = True
+    def __init__(self):
+        self.clients = set()
 
-                except OSError:
-                    pass
+    async def handler(self, connection):
+        self.clients.add(connection)
+        try:
+            await connection.wait_closed()
+        finally:
+            self.clients.discard(connection)
 
-            if needs_render:
-                render_preview(mode)
+    def reload(self):
+        from websockets.asyncio.server import broadcast
 
-            time.sleep(0.5)
+        broadcast(self.clients, "reload")
 
-    except KeyboardInterrupt:
-        print("\n🛑 已停止监听")
+
+# --- 文件监听 ---
+
+def _is_generated(path: Path) -> bool:
+    """预览文件与截图临时文件由工具自身生成，忽略以免循环触发"""
+    return path.name == PREVIEW_FILE_NAME or path.name.startswith(".render-")
+
+
+async def _poll_changes(root: Path):
+    """未安装 watchfiles 时的回退实现：定期扫描整个目录的修改时间"""
+
+    def scan():
+        snapshot = {}
+        for path in root.rglob("*"):
+            try:
+                if path.is_file():
+                    snapshot[path] = path.stat().st_mtime_ns
+            except OSError:
+                pass
+        return snapshot
+
+    last = scan()
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        current = scan()
+        changed = {p for p in current.keys() | last.keys() if current.get(p) != last.get(p)}
+        last = current
+        if changed:
+            yield changed
+
+
+async def watch_changes(root: Path):
+    """产出每一批变化的文件路径集合"""
+    try:
+        from watchfiles import awatch
+    except ImportError:
+        print(f"⚠️ 未安装 watchfiles，回退到每 {POLL_INTERVAL}s 轮询")
+        async for changed in _poll_changes(root):
+            yield changed
+        return
+
+    async for changes in awatch(root, debounce=DEBOUNCE_MS):
+        yield {Path(path) for _, path in changes}
+
+
+async def watch_mode(mode: str, port: int):
+    """监听模板目录变化，重绘预览并通知浏览器刷新"""
+    mode_dir = template_base_dir / mode
+    if not mode_dir.exists():
+        print(f"❌ 目录不存在: {mode_dir}")
+        return
+
+    from websockets.asyncio.server import serve
+
+    mock_path = mode_dir / MOCK_FILE_NAME
+    mock_cache = MockDataCache(mock_path)
+    hub = LiveReloadHub()
+    ws_port = port + 1
+
+    print(f"🚀 启动调试模式: {mode}")
+    print(f"📂 监听目录: {template_base_dir}（含 images/ 与公共片段）")
+
+    # 初始渲染
+    render_preview(mode, mock_cache)
+
+    http_server = start_http_server(port, ws_port)
+    print(f"🌐 预览地址: http://127.0.0.1:{port}/{mode}/{PREVIEW_FILE_NAME}")
+
+    try:
+        async with serve(hub.handler, "127.0.0.1", ws_port):
+            async for changed in watch_changes(template_base_dir):
+                changed = {p for p in changed if not _is_generated(p)}
+                if not changed:
+                    continue
+                for path in sorted(changed):
+                    print(f"⚡ 检测到 {path.relative_to(template_base_dir)} 变化...")
+
+                if mock_path in changed:
+                    mock_cache.invalidate()
+                # 模板 / mock 变化需要重新渲染；css / js / 图片只需刷新浏览器
+                if any(p.suffix in (".html", ".jinja", ".j2") or p == mock_path for p in changed):
+                    render_preview(mode, mock_cache)
+                hub.reload()
+    finally:
+        http_server.shutdown()
 
 
 if __name__ == "__main__":
@@ -260,6 +326,10 @@ if __name__ == "__main__":
         "mode", nargs="?",
         help=f"页面模式 (template/ 模板目录下的子目录名，可用模式: {', '.join(available_modes)})"
     )
+    parser.add_argument(
+        "--port", type=int, default=8000,
+        help="预览 HTTP 服务端口，websocket 使用 port+1（默认 8000）"
+    )
 
     args = parser.parse_args()
 
@@ -271,14 +341,17 @@ if __name__ == "__main__":
             print("❌ 在 template/ 目录下未找到任何包含 index.html 的子目录，没有可用模式")
             sys.exit(1)
         # 默认选择 mbti-stats
-        if "mbti-stats" in available_modes:
-            target_mode = "mbti-stats"
+        if DEFAULT_MODE in available_modes:
+            target_mode = DEFAULT_MODE
         else:
             target_mode = available_modes[0]
         print(f"ℹ️ 未指定模式，自动选择: {target_mode}")
     elif target_mode not in available_modes:
-        print(f"❌ 模式 '{target_mode}' 不存在 (找不到 {target_mode}/index.html)")
+        print(f"❌ 模式 '{target_mode}' 不存在 (找不到 {target_mode}/{INDEX_FILE_NAME})")
         print(f"可用模式: {', '.join(available_modes)}")
         sys.exit(1)
 
-    watch_mode(target_mode)
+    try:
+        asyncio.run(watch_mode(target_mode, args.port))
+    except KeyboardInterrupt:
+        print("\n🛑 已停止监听")
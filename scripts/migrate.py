@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+数据迁移（非交互）：依次执行 common/migrations/ 中所有未完成的迁移步骤
+
+用法:
+  python scripts/migrate.py [--data-root data/mbtistats] [--legacy-root data/v1] [--workers 8]
+  python scripts/migrate.py --dry-run      # 只列出待执行的步骤与单元数
+
+说明:
+  - 各步骤按编号顺序执行，步骤内按群并行；复制 / 转换后的文件都会校验
+  - 进度记录在 data/mbtistats/migrations/journal.jsonl，中断后重新运行会从断点继续
+  - 某个步骤有失败的群时停止，退出码非零；修复后重新运行即可
+  - Bot 启动时也会自动执行未完成的步骤（mbtistats_migrate_on_startup=false 可关闭）
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.migrations import MigrationRunner  # noqa: E402
+
+# 默认路径（相对当前工作目录）
+DATA_ROOT = Path("data/mbtistats")
+
+
+def dry_run(runner: MigrationRunner):
+    """列出待执行的迁移（不实际执行）"""
+    plan = runner.plan()
+    if not plan:
+        print("✅ 没有待执行的迁移")
+        return
+    for migration, units in plan:
+        print(f"[{migration.id}] {migration.description}: {len(units)} 个单元待处理")
+
+
+def migrate(runner: MigrationRunner) -> bool:
+    results = runner.run()
+    if not results:
+        print("✅ 没有待执行的迁移")
+        return True
+    for result in results:
+        mark = "✅" if result.ok else "❌"
+        print(
+            f"{mark} [{result.id}] 完成 {result.done}, 跳过 {result.skipped}, "
+            f"失败 {len(result.failed)}, 耗时 {result.elapsed:.2f}s"
+        )
+        for unit, error in result.failed.items():
+            print(f"    {unit}: {error}")
+    return all(result.ok for result in results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="执行未完成的数据迁移")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT, help=f"数据根目录（默认 {DATA_ROOT}）")
+    parser.add_argument("--legacy-root", type=Path, help="旧版数据目录（默认为数据根目录同级的 v1/）")
+    parser.add_argument("--workers", type=int, default=8, help="并行线程数（默认 8）")
+    parser.add_argument("--dry-run", action="store_true", help="只列出待执行的迁移")
+    args = parser.parse_args()
+
+    runner = MigrationRunner(args.data_root, legacy_root=args.legacy_root, workers=args.workers)
+    if args.dry_run:
+        dry_run(runner)
+    else:
+        sys.exit(0 if migrate(runner) else 1)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+数据迁移脚本：把时间序列数据从 JSON 数组转换为 JSON Lines（只追加、游程记录格式）
+
+旧格式:
+  data/mbtistats/data/v1/{group_id}/stats-data.json    -> 整个时间序列是一个 JSON 数组
+
+新格式:
+  data/mbtistats/data/v1/{group_id}/stats-data.jsonl   -> 每行一条游程记录 (timestamps: number[])
+
+说明:
+  - 默认保留旧文件（插件仍在读写 stats-data.json），读取时 .jsonl 中与旧文件重复的部分会被忽略
+  - 加 --drop-legacy 时转换后删除旧文件，仅在插件已改为读取 .jsonl 后使用
+  - 相邻且统计内容一致的时间点会合并为一条记录（见 common/stats_format.py）
+  - 转换是原子的（写临时文件后替换），可以重复运行
+
+使用方法:
+  1. 停止 Bot
+  2. 备份数据目录
+  3. 运行: python scripts/migrate_data_jsonl.py [--drop-legacy]
+  4. 检查迁移结果
+  5. 启动 Bot
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.stats_format import migrate_history  # noqa: E402
+from common.stats_store import LEGACY_FILE_NAME, LOG_FILE_NAME, StatsStore  # noqa: E402
+
+# 默认路径（相对当前工作目录）
+DATA_DIR = Path("data/mbtistats/data/v1")
+
+
+def find_legacy_groups(store: StatsStore) -> list[str]:
+    """找出仍存在旧格式文件的群"""
+    return [group_id for group_id in store.group_ids() if store.legacy_path(group_id).exists()]
+
+
+def migrate(drop_legacy: bool = False):
+    """执行迁移"""
+    print("=" * 60)
+    print("MBTI Stats 数据迁移脚本 (JSON -> JSON Lines)")
+    print("=" * 60)
+    print()
+
+    if not DATA_DIR.exists():
+        print(f"错误: 数据目录不存在: {DATA_DIR}")
+        print("请确认当前目录是否正确。")
+        return False
+
+    store = StatsStore(DATA_DIR)
+    groups = find_legacy_groups(store)
+    if not groups:
+        print("没有需要转换的群，数据已经是新格式。")
+        return True
+
+    print(f"将转换 {len(groups)} 个群的数据:")
+    print(f"  目录: {DATA_DIR}")
+    print(f"  {LEGACY_FILE_NAME} -> {LOG_FILE_NAME}")
+    print()
+
+    response = input("确认开始迁移? [y/N]: ")
+    if response.lower() != 'y':
+        print("已取消")
+        return False
+
+    print()
+    print("开始迁移...")
+    print("-" * 60)
+
+    group_count = 0
+    failed = []
+    for group_id in groups:
+        try:
+            records, merged = migrate_history(store.read_records(group_id))
+            store.write_records(group_id, records)
+            if drop_legacy:
+                store.compact(group_id, drop_legacy=True)
+        except Exception as e:
+            print(f"  ❌ 群 {group_id}: {e}")
+            failed.append(group_id)
+            continue
+        print(f"  [数据] 群 {group_id}: {len(records)} 条记录 (合并 {merged} 次重复观测) -> {store.log_path(group_id)}")
+        group_count += 1
+
+    print()
+    print("-" * 60)
+    print(f"迁移完成! 共转换 {group_count} 个群的数据")
+    if failed:
+        print(f"失败 {len(failed)} 个群（旧文件已保留）: {', '.join(failed)}")
+    if not drop_legacy:
+        print(f"旧文件 {LEGACY_FILE_NAME} 已保留；插件改为读取 {LOG_FILE_NAME} 后可加 --drop-legacy 删除")
+
+    return not failed
+
+
+def dry_run():
+    """预览迁移（不实际执行）"""
+    print("=" * 60)
+    print("MBTI Stats 数据迁移预览 (Dry Run)")
+    print("=" * 60)
+    print()
+
+    if not DATA_DIR.exists():
+        print(f"数据目录不存在: {DATA_DIR}")
+        return
+
+    store = StatsStore(DATA_DIR)
+    groups = find_legacy_groups(store)
+    if not groups:
+        print("没有需要转换的群。")
+        return
+
+    print("将执行以下操作:")
+    for group_id in groups:
+        legacy = store.legacy_path(group_id)
+        appended = store.log_path(group_id).exists()
+        print(f"\n群 {group_id}:")
+        print(f"  [数据] {legacy} ({legacy.stat().st_size} bytes)")
+        print(f"       -> {store.log_path(group_id)}{' (合并已有新格式数据)' if appended else ''}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--dry-run":
+        dry_run()
+    else:
+        success = migrate(drop_legacy="--drop-legacy" in sys.argv[1:])
+        sys.exit(0 if success else 1)
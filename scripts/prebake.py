@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+镜像构建时的预处理（Dockerfile 中调用）
+
+用法：
+    python scripts/prebake.py [--data-root data/mbtistats] [--seed-dir seed] [--compiled-dir build/jinja]
+
+步骤：
+    1. 把插件模板预编译为 Python 模块（运行时 PageRenderer 自动优先使用）
+    2. 把构建上下文中现有的数据打包为只读种子：每个群的时间序列 + 最新一张缓存图片
+       （实例启动时由 bot.py 铺设到 /tmp 中的数据目录，见 common/seed.py）
+
+字节码编译由 Dockerfile 中的 `python -m compileall` 完成。
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.renderer import COMPILED_TEMPLATE_DIR, compile_templates, template_dir  # noqa: E402
+from common.seed import build_seed  # noqa: E402
+
+DATA_ROOT = Path("data/mbtistats")
+SEED_DIR = project_root / "seed"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="镜像构建时预编译模板并打包数据种子")
+    parser.add_argument("--data-root", type=Path, default=DATA_ROOT, help=f"数据根目录（默认 {DATA_ROOT}）")
+    parser.add_argument("--seed-dir", type=Path, default=SEED_DIR, help="种子输出目录（默认 ./seed）")
+    parser.add_argument("--compiled-dir", type=Path, default=COMPILED_TEMPLATE_DIR, help="预编译模板输出目录")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    try:
+        version = compile_templates(template_dir(), args.compiled_dir)
+        print(f"✅ 模板已预编译: {args.compiled_dir} (版本 {version})")
+    except FileNotFoundError as e:
+        print(f"⚠️ 跳过模板预编译: {e}")
+
+    if args.data_root.exists():
+        count = build_seed(args.data_root, args.seed_dir)
+        print(f"✅ 数据种子已打包: {count} 个群 -> {args.seed_dir}")
+    else:
+        print(f"ℹ️ 数据目录不存在，不打包种子: {args.data_root}")
+
+    print(f"🏁 预处理完成，耗时 {time.perf_counter() - begin:.2f}s")
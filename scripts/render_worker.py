@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+渲染进程（由 common/render_service.py 启动，一般不需要手动运行）
+
+用法：
+    python scripts/render_worker.py --socket /tmp/mbtistats-render/worker-0.sock
+                                    [--pool-size 2] [--timeout 30] [--max-renders 50]
+                                    [--viewport-width 1050] [--viewport-height 2500]
+                                    [--template-dir DIR] [--parent-pid PID]
+
+说明：
+    - 持有一个浏览器池，在 Unix socket 上接收「模式 + 页面 HTML + 输出格式」，返回截图
+    - 每个连接可依次发送多个请求，不同连接并发处理（超出池大小时在浏览器池中排队）
+    - 收到 SIGTERM / SIGINT 或父进程退出时关闭浏览器池后退出
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from pathlib import Path
+
+# 计算路径
+# scripts/render_worker.py -> project_root/scripts/ -> project_root/
+project_root = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(project_root))
+
+from common.browser_pool import BrowserPool  # noqa: E402
+from common.image_output import ImageFormat  # noqa: E402
+from common.render_service import read_message, write_message  # noqa: E402
+from common.renderer import PageRenderer  # noqa: E402
+
+PARENT_CHECK_INTERVAL = 1.0
+
+
+async def serve(args: argparse.Namespace) -> None:
+    pool = BrowserPool(
+        size=args.pool_size,
+        max_renders_per_page=args.max_renders,
+        viewport_width=args.viewport_width,
+        viewport_height=args.viewport_height,
+        render_timeout=args.timeout,
+    )
+    renderer = PageRenderer(args.template_dir)
+    await pool.start()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header, body = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if header.get("op") == "render":
+                    try:
+                        image = await renderer.screenshot(
+                            pool, header["mode"], body.decode("utf-8"), ImageFormat.parse(header["format"])
+                        )
+                    except Exception as e:
+                        await write_message(writer, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+                    else:
+                        await write_message(writer, {"ok": True}, image)
+                elif header.get("op") == "stats":
+                    await write_message(writer, {"ok": True, "pool": pool.snapshot()})
+                else:
+                    await write_message(writer, {"ok": False, "error": f"未知操作: {header.get('op')}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def watch_parent() -> None:
+        # 父进程（Bot）退出后 ppid 会变化，避免留下孤儿渲染进程
+        while os.getppid() == args.parent_pid:
+            await asyncio.sleep(PARENT_CHECK_INTERVAL)
+        stop.set()
+
+    watcher = asyncio.create_task(watch_parent()) if args.parent_pid else None
+    server = await asyncio.start_unix_server(handle, path=args.socket)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        await pool.close()
+        Path(args.socket).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="mbtistats 渲染进程")
+    parser.add_argument("--socket", required=True, help="监听的 Unix socket 路径")
+    parser.add_argument("--pool-size", type=int, default=2, help="浏览器池大小（默认 2）")
+    parser.add_argument("--timeout", type=float, default=30, help="页面操作超时（秒，默认 30）")
+    parser.add_argument("--max-renders", type=int, default=50, help="单个页面渲染多少次后回收（默认 50）")
+    parser.add_argument("--viewport-width", type=int, default=1050)
+    parser.add_argument("--viewport-height", type=int, default=2500)
+    parser.add_argument("--template-dir", type=Path, default=None, help="模板目录（默认插件模板目录）")
+    parser.add_argument("--parent-pid", type=int, default=0, help="父进程 pid，父进程退出时本进程随之退出")
+    args = parser.parse_args()
+
+    asyncio.run(serve(args))